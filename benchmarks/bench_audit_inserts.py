@@ -0,0 +1,115 @@
+"""
+Benchmark de inserciones de logs de auditoría: antes y después del gestor de conexiones.
+
+- Antes: una conexión nueva por log (connect + INSERT + commit + close), como hacía
+  el antiguo DatabaseConnection.
+- Después: add_log encola en memoria y el escritor en segundo plano inserta por
+  lotes sobre una conexión WAL de larga duración.
+
+En ambos casos un hilo lector consulta la tabla en bucle, como haría el panel web.
+
+Uso: python benchmarks/bench_audit_inserts.py [numero_de_logs]
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+CREATE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS audit_logs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        event_type TEXT NOT NULL,
+        author_id INTEGER,
+        channel_id INTEGER,
+        message TEXT,
+        details TEXT
+    )
+"""
+
+
+class ReaderThread(threading.Thread):
+    """Lee la tabla en bucle y cuenta cuántas consultas consigue completar."""
+
+    def __init__(self, read):
+        super().__init__(daemon=True)
+        self.read = read
+        self.reads = 0
+        self.stop_event = threading.Event()
+
+    def run(self):
+        while not self.stop_event.is_set():
+            self.read()
+            self.reads += 1
+
+
+def bench_before(db_file: str, n: int) -> tuple[float, int]:
+    conn = sqlite3.connect(db_file)
+    conn.execute(CREATE_TABLE_SQL)
+    conn.commit()
+    conn.close()
+
+    def read():
+        c = sqlite3.connect(db_file)
+        c.execute("SELECT COUNT(*) FROM audit_logs").fetchone()
+        c.close()
+
+    reader = ReaderThread(read)
+    reader.start()
+    start = time.perf_counter()
+    for i in range(n):
+        c = sqlite3.connect(db_file)
+        c.execute(
+            "INSERT INTO audit_logs (timestamp, event_type, author_id, channel_id, message, details) VALUES (?, ?, ?, ?, ?, ?)",
+            (datetime.now(timezone.utc).isoformat(), "MESSAGE_DELETE", 1, 2, f"mensaje {i}", None)
+        )
+        c.commit()
+        c.close()
+    elapsed = time.perf_counter() - start
+    reader.stop_event.set()
+    reader.join()
+    return elapsed, reader.reads
+
+
+def bench_after(n: int) -> tuple[float, int]:
+    from database import database_manager as db
+    db.init_db()
+
+    def read():
+        with db.connections.reader() as cur:
+            cur.execute("SELECT COUNT(*) FROM audit_logs").fetchone()
+
+    reader = ReaderThread(read)
+    reader.start()
+    start = time.perf_counter()
+    for i in range(n):
+        db.add_log("MESSAGE_DELETE", 1, 2, f"mensaje {i}")
+    db.shutdown()  # Incluye el tiempo de vaciar la cola: todas las filas quedan en disco
+    elapsed = time.perf_counter() - start
+    reader.stop_event.set()
+    reader.join()
+    return elapsed, reader.reads
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with tempfile.TemporaryDirectory() as tmp:
+        before, before_reads = bench_before(os.path.join(tmp, "before.db"), n)
+        # database_manager crea su base de datos en el directorio actual (en init_db)
+        os.chdir(tmp)
+        after, after_reads = bench_after(n)
+        os.chdir(ROOT)
+
+    print(f"Logs insertados: {n}")
+    print(f"Antes:   {n / before:10.0f} inserciones/s ({before:.2f}s, {before_reads} lecturas concurrentes)")
+    print(f"Después: {n / after:10.0f} inserciones/s ({after:.2f}s, {after_reads} lecturas concurrentes)")
+
+
+if __name__ == "__main__":
+    main()
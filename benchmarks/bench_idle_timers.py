@@ -0,0 +1,109 @@
+"""
+Benchmark de los plazos de inactividad con muchos servidores simulados.
+
+Compara el sistema anterior (una tarea con asyncio.sleep por servidor, cancelada y
+recreada en cada cambio) con TimerWheel (una entrada por servidor en una rueda y una
+sola corrutina). Mide:
+  - el coste de reprogramar: cada servidor reprograma su plazo varias veces, como al
+    empezar y acabar canciones o usar /skip;
+  - la memoria de los plazos pendientes (tracemalloc);
+  - la puntualidad al vencer todos a la vez (retraso medio y máximo).
+
+Uso: python benchmarks/bench_idle_timers.py [servidores] [reprogramaciones_por_servidor]
+"""
+import asyncio
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.timer_wheel import TimerWheel  # noqa: E402
+
+IDLE_TIMEOUT = 10  # Segundos del plazo al medir reprogramaciones (no llega a vencer)
+FIRE_DELAY = 1.0  # Segundos del plazo al medir la puntualidad
+RESOLUTION = 0.05  # Resolución de la rueda en el benchmark
+
+
+class TaskTimers:
+    """El sistema anterior: una tarea por servidor, cancelada y recreada en cada reprogramación."""
+
+    def __init__(self):
+        self.tasks = {}
+
+    def schedule(self, key, delay, callback):
+        task = self.tasks.get(key)
+        if task is not None and not task.done():
+            task.cancel()
+        self.tasks[key] = asyncio.get_running_loop().create_task(self._wait(key, delay, callback))
+
+    async def _wait(self, key, delay, callback):
+        await asyncio.sleep(delay)
+        self.tasks.pop(key, None)
+        callback(key)
+
+    def cancel_all(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+
+async def measure_reschedule(name, timers, guilds, reschedules):
+    tracemalloc.start()
+    started = time.perf_counter()
+    for _ in range(reschedules):
+        for guild_id in range(guilds):
+            timers.schedule(guild_id, IDLE_TIMEOUT, lambda key: None)
+        # Deja correr al bucle entre rondas, como pasaría entre eventos reales
+        await asyncio.sleep(0)
+    elapsed = time.perf_counter() - started
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    operations = guilds * reschedules
+    print(f"{name:<12} reprogramar: {elapsed * 1000:8.1f} ms ({elapsed / operations * 1e6:5.2f} µs/op)  "
+          f"memoria pendiente: {current / 1024:8.0f} KiB")
+
+
+async def measure_firing(name, timers, guilds):
+    lateness = []
+    done = asyncio.Event()
+    deadline = time.monotonic() + FIRE_DELAY
+
+    def fired(key):
+        lateness.append(time.monotonic() - deadline)
+        if len(lateness) == guilds:
+            done.set()
+
+    for guild_id in range(guilds):
+        timers.schedule(guild_id, FIRE_DELAY, fired)
+    await done.wait()
+    print(f"{name:<12} vencimiento: retraso medio {statistics.mean(lateness) * 1000:6.1f} ms, "
+          f"máximo {max(lateness) * 1000:6.1f} ms")
+
+
+async def main():
+    guilds = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    reschedules = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    print(f"{guilds} servidores, {reschedules} reprogramaciones por servidor\n")
+
+    tasks = TaskTimers()
+    await measure_reschedule("tareas", tasks, guilds, reschedules)
+    tasks.cancel_all()
+    await asyncio.sleep(0)
+
+    wheel = TimerWheel(RESOLUTION)
+    runner = asyncio.create_task(wheel.run())
+    await measure_reschedule("rueda", wheel, guilds, reschedules)
+    for guild_id in range(guilds):
+        wheel.cancel(guild_id)
+
+    print()
+    await measure_firing("tareas", TaskTimers(), guilds)
+    await measure_firing("rueda", wheel, guilds)
+    runner.cancel()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
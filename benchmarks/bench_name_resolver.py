@@ -0,0 +1,97 @@
+"""
+Benchmark de la resolución de nombres del visor de logs con un bot falso.
+
+Compara el bucle original (un fetch_user secuencial por fila) con NameResolver
+(IDs sin repetir, cachés del bot primero y REST con concurrencia limitada) y
+cuenta las llamadas REST de cada uno. La latencia REST se simula con un sleep.
+
+Uso: python benchmarks/bench_name_resolver.py [filas] [autores_distintos]
+"""
+import asyncio
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.name_resolver import NameResolver  # noqa: E402
+
+REST_LATENCY = 0.02  # Segundos por llamada REST simulada
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = f"usuario{user_id}"
+
+
+class FakeGuild:
+    def __init__(self, members):
+        self.members = {member.id: member for member in members}
+
+    def get_member(self, user_id):
+        return self.members.get(user_id)
+
+
+class FakeBot:
+    """Bot mínimo: una parte de los usuarios está en la caché y el resto requiere REST."""
+
+    def __init__(self, cached_users, cached_members):
+        self.users = {user.id: user for user in cached_users}
+        self.guilds = [FakeGuild(cached_members)]
+        self.rest_calls = 0
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    def get_channel(self, channel_id):
+        return None
+
+    async def fetch_user(self, user_id):
+        self.rest_calls += 1
+        await asyncio.sleep(REST_LATENCY)
+        return FakeUser(user_id)
+
+
+def make_bot(author_ids):
+    ids = list(author_ids)
+    third = len(ids) // 3
+    return FakeBot([FakeUser(i) for i in ids[:third]], [FakeUser(i) for i in ids[third:2 * third]])
+
+
+async def serial_fetch(bot, rows):
+    """Comportamiento original de process_logs_for_display."""
+    for row in rows:
+        row['author_name'] = (await bot.fetch_user(row['author_id'])).name
+
+
+async def main():
+    n_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    n_authors = int(sys.argv[2]) if len(sys.argv) > 2 else 150
+    author_ids = range(1, n_authors + 1)
+    rows = [{'author_id': random.choice(author_ids), 'channel_id': 1} for _ in range(n_rows)]
+
+    bot = make_bot(author_ids)
+    start = time.perf_counter()
+    await serial_fetch(bot, [dict(row) for row in rows])
+    serial_time, serial_calls = time.perf_counter() - start, bot.rest_calls
+
+    bot = make_bot(author_ids)
+    resolver = NameResolver(bot, concurrency=5)
+    start = time.perf_counter()
+    await resolver.resolve_users(row['author_id'] for row in rows)
+    first_time, first_calls = time.perf_counter() - start, bot.rest_calls
+    start = time.perf_counter()
+    await resolver.resolve_users(row['author_id'] for row in rows)
+    second_time, second_calls = time.perf_counter() - start, bot.rest_calls - first_calls
+
+    print(f"Filas: {n_rows}, autores distintos: {n_authors}, latencia REST simulada: {REST_LATENCY * 1000:.0f}ms")
+    print(f"Secuencial:               {serial_time:7.2f}s, {serial_calls} llamadas REST")
+    print(f"NameResolver (1ª página): {first_time:7.2f}s, {first_calls} llamadas REST")
+    print(f"NameResolver (caché):     {second_time:7.2f}s, {second_calls} llamadas REST")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
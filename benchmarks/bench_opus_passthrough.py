@@ -0,0 +1,107 @@
+"""
+Benchmark de CPU por stream de las formas de preparar el audio de una canción.
+
+Genera un clip Opus en WebM (como los que sirve YouTube) y lo reproduce con N streams
+a la vez, leyendo las tramas lo más rápido posible, de tres maneras:
+  - sondeo + copia: FFmpegOpusAudio.from_probe (ffprobe y después ffmpeg -c:a copy),
+    lo que se hacía antes con cada canción;
+  - copia directa: FFmpegOpusAudio con codec="opus", usando el códec que da yt-dlp;
+  - transcodificación: FFmpegOpusAudio sin códec (decodificar y codificar a Opus),
+    lo que toca con los streams que no son Opus.
+Mide el tiempo de CPU de los procesos hijos (ffmpeg/ffprobe) por stream y por minuto
+de audio. Requiere ffmpeg y ffprobe en el PATH y un sistema Unix (módulo resource).
+
+Uso: python benchmarks/bench_opus_passthrough.py [streams_simultáneos] [segundos_de_clip]
+"""
+import asyncio
+import os
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import discord
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from utils.tracks import FFMPEG_OPTIONS  # noqa: E402
+
+# Las opciones de reconexión sólo tienen sentido con URLs HTTP; aquí se lee de un archivo local
+LOCAL_OPTIONS = {'options': FFMPEG_OPTIONS['options']}
+
+
+def make_clip(directory: str, seconds: int) -> str:
+    """Clip estéreo a 48 kHz en Opus/WebM, como el formato 251 de YouTube."""
+    path = os.path.join(directory, "clip.webm")
+    subprocess.run(
+        ["ffmpeg", "-loglevel", "error", "-y", "-f", "lavfi",
+         "-i", f"sine=frequency=440:sample_rate=48000:duration={seconds}",
+         "-ac", "2", "-c:a", "libopus", "-b:a", "160k", path],
+        check=True,
+    )
+    return path
+
+
+def drain(source: discord.AudioSource):
+    """Lee todas las tramas de 20 ms de la fuente, como haría el reproductor de voz (sin esperar)."""
+    try:
+        while source.read():
+            pass
+    finally:
+        source.cleanup()
+
+
+def probe_and_copy(path: str):
+    source = asyncio.run(discord.FFmpegOpusAudio.from_probe(path, **LOCAL_OPTIONS))
+    drain(source)
+
+
+def direct_copy(path: str):
+    drain(discord.FFmpegOpusAudio(path, codec="opus", **LOCAL_OPTIONS))
+
+
+def transcode(path: str):
+    drain(discord.FFmpegOpusAudio(path, codec=None, bitrate=128, **LOCAL_OPTIONS))
+
+
+def children_cpu() -> float:
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def run(name: str, func, path: str, streams: int, clip_seconds: int):
+    threads = [threading.Thread(target=func, args=(path,)) for _ in range(streams)]
+    cpu_before = children_cpu()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - started
+    cpu = children_cpu() - cpu_before
+    per_stream = cpu / streams
+    per_audio_minute = per_stream / (clip_seconds / 60)
+    print(f"{name:<20} {wall:8.2f}s reales  {cpu:8.2f}s CPU  "
+          f"{per_stream * 1000:8.1f} ms CPU/stream  {per_audio_minute * 1000:8.1f} ms CPU/min de audio")
+
+
+def main():
+    streams = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    clip_seconds = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    if not shutil.which("ffmpeg") or not shutil.which("ffprobe"):
+        sys.exit("Este benchmark necesita ffmpeg y ffprobe en el PATH.")
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = make_clip(directory, clip_seconds)
+        print(f"{streams} streams simultáneos de un clip Opus/WebM de {clip_seconds}s\n")
+        run("sondeo + copia", probe_and_copy, path, streams, clip_seconds)
+        run("copia directa", direct_copy, path, streams, clip_seconds)
+        run("transcodificación", transcode, path, streams, clip_seconds)
+
+
+if __name__ == "__main__":
+    main()
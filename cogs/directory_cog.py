@@ -0,0 +1,92 @@
+import discord
+from discord.ext import commands
+import logging
+
+from database import database_manager as db
+from utils.guild_directory import guild_directory
+
+log = logging.getLogger(__name__)
+
+
+class DirectoryCog(commands.Cog):
+    """
+    Mantiene la tabla `directory` (usuarios y canales) al día a partir de los eventos
+    del gateway, para que las vistas de logs resuelvan nombres sin llamar a la API.
+    También actualiza `guild_directory`, la instantánea de servidores y canales que usan
+    los selectores del panel web.
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+
+    @staticmethod
+    def _channel_entries(guild: discord.Guild):
+        return [(channel.id, 'channel', guild.id, channel.name) for channel in guild.channels]
+
+    @staticmethod
+    def _user_entry(user: discord.abc.User):
+        return (user.id, 'user', None, user.name)
+
+    # --- SIEMBRA INICIAL ---
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """Vuelca al directorio las cachés de usuarios y canales (también tras cada reconexión)."""
+        entries = [self._user_entry(user) for user in self.bot.users]
+        for guild in self.bot.guilds:
+            entries.extend(self._channel_entries(guild))
+        db.update_directory(entries)
+        guild_directory.rebuild(self.bot.guilds)
+        log.info(f"📇 Directorio sembrado con {len(entries)} usuarios y canales.")
+
+    # --- SERVIDORES ---
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        entries = [self._user_entry(member) for member in guild.members] + self._channel_entries(guild)
+        db.update_directory(entries)
+        guild_directory.update_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild):
+        guild_directory.remove_guild(guild.id)
+
+    @commands.Cog.listener()
+    async def on_guild_update(self, before: discord.Guild, after: discord.Guild):
+        if before.name != after.name:
+            guild_directory.update_guild(after)
+
+    # --- USUARIOS ---
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        db.update_directory([self._user_entry(member)])
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        if before.name != after.name:
+            db.update_directory([self._user_entry(after)])
+
+    @commands.Cog.listener()
+    async def on_user_update(self, before: discord.User, after: discord.User):
+        if before.name != after.name:
+            db.update_directory([self._user_entry(after)])
+
+    # --- CANALES ---
+    @commands.Cog.listener()
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        db.update_directory([(channel.id, 'channel', channel.guild.id, channel.name)])
+        guild_directory.update_guild(channel.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_update(self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+        if before.name != after.name:
+            db.update_directory([(after.id, 'channel', after.guild.id, after.name)])
+            guild_directory.update_guild(after.guild)
+
+    @commands.Cog.listener()
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        # Se conserva el último nombre para que los logs antiguos no muestren un ID suelto
+        db.mark_directory_deleted(channel.id)
+        guild_directory.update_guild(channel.guild)
+
+
+def setup(bot):
+    bot.add_cog(DirectoryCog(bot))
@@ -1,5 +1,6 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
+import asyncio
 import re
 import os
 import datetime
@@ -8,6 +9,8 @@ import logging
 # --- IMPORTACIONES LOCALES ---
 from config import Config
 from database import database_manager as db
+from database import retention
+from utils import metrics
 
 # Obtenemos un logger específico para este módulo
 log = logging.getLogger(__name__)
@@ -16,13 +19,48 @@ log = logging.getLogger(__name__)
 class EventsCog(commands.Cog):
     def __init__(self, bot: discord.Bot):
         self.bot = bot
+        self.voice_sessions_reconciled = False  # El primer on_ready de este proceso es un arranque
+        self.retention_task.start()
+
+    def cog_unload(self):
+        self.retention_task.cancel()
+
+    # --- RETENCIÓN DE LOGS ---
+    @tasks.loop(hours=Config.AUDIT_RETENTION_INTERVAL_HOURS)
+    async def retention_task(self):
+        """Archiva y borra periódicamente los logs caducados sin bloquear el bucle de eventos."""
+        archived = await asyncio.to_thread(retention.run_retention)
+        log.info(f"Retención de logs completada: {archived} registros archivados.")
+
+    @retention_task.before_loop
+    async def before_retention_task(self):
+        await self.bot.wait_until_ready()
 
     async def get_audit_log_channel(self):
         """Obtiene el canal de logs de auditoría configurado en el bot."""
         return self.bot.get_channel(Config.AUDIT_LOG_CHANNEL_ID)
 
+    # --- SESIONES DE VOZ ---
+    @commands.Cog.listener()
+    async def on_ready(self):
+        """
+        Ajusta las sesiones de voz abiertas a quién está realmente en voz: tras un reinicio o
+        una reconexión pueden faltar VOICE_LEAVE, y su sesión contaría todo el tiempo sin datos.
+        """
+        present = {
+            member.id: channel.id
+            for guild in self.bot.guilds
+            for channel in (*guild.voice_channels, *guild.stage_channels)
+            for member in channel.members
+            if not member.bot
+        }
+        db.reconcile_voice_sessions(present, restarted=not self.voice_sessions_reconciled)
+        self.voice_sessions_reconciled = True
+        log.info(f"🎙️ Sesiones de voz ajustadas: {len(present)} usuarios en voz ahora mismo.")
+
     # --- LISTENERS DE AUDITORÍA ---
     @commands.Cog.listener()
+    @metrics.timed_listener
     async def on_message_delete(self, message: discord.Message):
         """Registra y reporta la eliminación de mensajes."""
         if message.author.bot or not message.content:
@@ -44,6 +82,7 @@ class EventsCog(commands.Cog):
         await log_channel.send(embed=embed)
 
     @commands.Cog.listener()
+    @metrics.timed_listener
     async def on_message_edit(self, before: discord.Message, after: discord.Message):
         """Registra y reporta la edición de mensajes."""
         if before.author.bot or before.content == after.content:
@@ -67,6 +106,7 @@ class EventsCog(commands.Cog):
         await log_channel.send(embed=embed)
 
     @commands.Cog.listener()
+    @metrics.timed_listener
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState,
                                     after: discord.VoiceState):
         """Registra y reporta cambios de estado en canales de voz."""
@@ -4,6 +4,7 @@ import logging
 import aiohttp
 import time  # Para el comando ping
 import re  # Necesario para la detección de la palabra "down"
+from utils import metrics
 
 log = logging.getLogger(__name__)
 
@@ -20,7 +21,7 @@ class FunCog(commands.Cog):
         """
         if self.http_session is None:
             log.info("Creando nueva sesión de aiohttp para FunCog.")
-            self.http_session = aiohttp.ClientSession()
+            self.http_session = aiohttp.ClientSession(trace_configs=[metrics.http_trace_config()])
         return self.http_session
 
     def cog_unload(self):
@@ -48,6 +49,7 @@ class FunCog(commands.Cog):
 
     # --- Listener para el Easter Egg "down" ---
     @commands.Cog.listener()
+    @metrics.timed_listener
     async def on_message(self, message):
         """
         Maneja los mensajes para el Easter Egg 'down'.
@@ -5,6 +5,7 @@ import random
 import logging
 import os
 from dotenv import load_dotenv
+from utils import metrics
 
 load_dotenv()
 
@@ -34,7 +35,7 @@ class DownGifCog(commands.Cog):
             return None
 
         if self.http_session is None:
-            self.http_session = aiohttp.ClientSession()
+            self.http_session = aiohttp.ClientSession(trace_configs=[metrics.http_trace_config()])
 
         # Usar el endpoint v1 que es más compatible con la clave pública
         url = f"https://g.tenor.com/v1/search?q={query}&key={TENOR_API_KEY}&limit=20"
@@ -57,6 +58,7 @@ class DownGifCog(commands.Cog):
         return None
 
     @commands.Cog.listener()
+    @metrics.timed_listener
     async def on_message(self, message: discord.Message):
         """Se activa con cada mensaje para buscar las palabras clave."""
         if message.author.bot:
@@ -0,0 +1,53 @@
+import discord
+from discord.ext import commands
+import time
+import logging
+
+from utils import metrics
+
+log = logging.getLogger(__name__)
+
+
+class MetricsCog(commands.Cog):
+    """
+    Alimenta las métricas de /metrics que dependen del bot: duración de los comandos de barra,
+    latencia del gateway y tamaño de las colas de música.
+    """
+
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+        metrics.GATEWAY_LATENCY.set_collector(lambda: self.bot.latency)
+        metrics.MUSIC_QUEUE_DEPTH.set_collector(self._music_queue_depths)
+
+    def _music_queue_depths(self) -> dict:
+        music_cog = self.bot.get_cog("MusicCog")
+        if music_cog is None:
+            return {}
+        return {(guild_id,): len(queue) for guild_id, queue in list(music_cog.queues.items())}
+
+    def _observe(self, ctx: discord.ApplicationContext, outcome: str):
+        started = getattr(ctx, "_metrics_started", None)
+        if started is not None and ctx.command:
+            metrics.COMMAND_DURATION.observe(time.perf_counter() - started, ctx.command.qualified_name, outcome)
+
+    @commands.Cog.listener()
+    async def on_application_command(self, ctx: discord.ApplicationContext):
+        # El inicio se guarda en el propio contexto (py-cord pasa el mismo objeto a los eventos
+        # de fin y de error): si el comando no termina nunca, se libera con él
+        ctx._metrics_started = time.perf_counter()
+
+    @commands.Cog.listener()
+    async def on_application_command_completion(self, ctx: discord.ApplicationContext):
+        self._observe(ctx, "ok")
+
+    @commands.Cog.listener()
+    async def on_application_command_error(self, ctx: discord.ApplicationContext, error: discord.DiscordException):
+        self._observe(ctx, "error")
+        # Con un listener registrado py-cord ya no imprime el error por defecto: se registra aquí
+        # salvo que el propio comando o su cog lo gestionen
+        if not (ctx.command and ctx.command.has_error_handler()) and not (ctx.cog and ctx.cog.has_error_handler()):
+            log.error(f"Error no gestionado en el comando /{ctx.command}.", exc_info=error)
+
+
+def setup(bot):
+    bot.add_cog(MetricsCog(bot))
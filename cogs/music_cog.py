@@ -1,15 +1,19 @@
 import discord
 from discord.ext import commands
 import asyncio
-from collections import deque
 import datetime
+import math
 import logging
-import random
-import os
 
 # --- IMPORTACIONES LOCALES ---
 # Asegúrate de que 'utils.downloader' y 'config' sean accesibles desde donde ejecutas tu main.py
-from utils.downloader import search_youtube
+from utils.audio_cache import audio_cache
+from utils.clip_library import ClipLibrary, MemoryOpusAudio
+from utils.timer_wheel import TimerWheel
+from utils.downloader import is_playlist_url
+from utils.extraction import ExtractionService, ExtractionCancelled
+from utils.tracks import Track, StreamResolver
+from utils.track_queue import TrackQueue
 from config import Config
 
 log = logging.getLogger(__name__)
@@ -19,100 +23,128 @@ log = logging.getLogger(__name__)
 # en tu archivo config.py
 RANDOM_AUDIO_DIR = Config.RANDOM_AUDIO_PATH
 
+PLAYLIST_LOADING = "⏳ Cargando el resto..."
+QUEUE_PAGE_SIZE = 10  # Canciones por página en /queue
+
 
 class MusicCog(commands.Cog):
     def __init__(self, bot: discord.Bot):
         self.bot = bot
         self.queues = {}
         self.current_song = {}
-        self.inactivity_tasks = {}  # Tareas para la inactividad por gremio
-
-    def get_queue(self, guild_id: int):
+        self.play_locks = {}  # Una sola play_next_song a la vez por gremio
+        # Plazos de inactividad de todos los gremios en una sola rueda de temporizadores
+        self.idle_timers = TimerWheel(Config.IDLE_TIMER_RESOLUTION)
+        self.idle_timers_task = bot.loop.create_task(self.idle_timers.run())
+        self.idle_actions = {}  # Easter eggs en curso tras vencer el plazo, por gremio
+        # Las búsquedas de yt-dlp se hacen en procesos aparte, por turnos entre servidores
+        self.extractor = ExtractionService(bot.loop, Config.EXTRACTION_WORKERS, Config.EXTRACTION_PER_GUILD,
+                                           Config.EXTRACTION_TIMEOUT)
+        # Resuelve las URLs de stream de las próximas canciones mientras suena la actual
+        self.resolver = StreamResolver(bot.loop, self.extractor.search, Config.MUSIC_PREFETCH_COUNT,
+                                       Config.STREAM_URL_MARGIN, Config.MUSIC_TRANSCODE_BITRATE)
+        self.playlist_tasks = {}  # Listas que se siguen cargando en segundo plano, por gremio
+        # Clips del easter egg, transcodificados una vez y recargados cuando cambia la carpeta
+        self.clips = ClipLibrary(RANDOM_AUDIO_DIR, Config.RANDOM_AUDIO_BITRATE)
+        self.clips_task = bot.loop.create_task(self.clips.watch(Config.RANDOM_AUDIO_RESCAN_INTERVAL))
+        # El índice de la caché de audio se carga en un hilo al arrancar, no en la primera canción
+        self.audio_cache_task = bot.loop.create_task(audio_cache.load())
+
+    def cog_unload(self):
+        self.clips_task.cancel()
+        self.audio_cache_task.cancel()
+        self.idle_timers_task.cancel()
+        for task in self.idle_actions.values():
+            task.cancel()
+        for tasks in self.playlist_tasks.values():
+            for task in tasks:
+                task.cancel()
+        self.extractor.shutdown()
+        self.bot.loop.create_task(audio_cache.close())
+
+    def prefetch(self, guild_id: int):
+        """Prepara los streams de las próximas canciones de la cola que no están en la caché de audio."""
+        upcoming = self.get_queue(guild_id).slice(0, self.resolver.lookahead)
+        self.resolver.prefetch(guild_id, [track for track in upcoming if not audio_cache.contains(track.video_id)])
+
+    def get_queue(self, guild_id: int) -> TrackQueue:
         """Obtiene o crea la cola de reproducción para un gremio."""
         if guild_id not in self.queues:
-            self.queues[guild_id] = deque()
+            self.queues[guild_id] = TrackQueue()
         return self.queues[guild_id]
 
     # --- LÓGICA DE INACTIVIDAD Y EASTER EGG ---
 
     def start_inactivity_check(self, guild: discord.Guild):
-        """Inicia o reinicia el chequeo de inactividad para un gremio."""
-        guild_id = guild.id
-
-        # Cancela cualquier tarea de inactividad existente para este gremio
-        if guild_id in self.inactivity_tasks and not self.inactivity_tasks[guild_id].done():
-            self.inactivity_tasks[guild_id].cancel()
-            log.info(f"[{guild.name}] Cancelada tarea de inactividad previa.")
-
-        log.info(f"[{guild.name}] Iniciando chequeo de inactividad para easter egg (10s).")
-        # Crea una nueva tarea para el bucle de inactividad
-        self.inactivity_tasks[guild_id] = self.bot.loop.create_task(self.inactivity_loop(guild))
+        """Inicia o reinicia el plazo de inactividad de un gremio (sin crear tareas)."""
+        log.info(f"[{guild.name}] Iniciando chequeo de inactividad para easter egg ({Config.MUSIC_IDLE_TIMEOUT}s).")
+        self.idle_timers.schedule(guild.id, Config.MUSIC_IDLE_TIMEOUT, self.on_idle_timeout)
 
     def stop_inactivity_check(self, guild_id: int):
-        """Detiene y elimina el chequeo de inactividad para un gremio."""
-        if guild_id in self.inactivity_tasks and not self.inactivity_tasks[guild_id].done():
-            self.inactivity_tasks[guild_id].cancel()
-            log.info(f"[{guild_id}] Chequeo de inactividad detenido y limpiado.")
-        self.inactivity_tasks.pop(guild_id, None)  # Asegurarse de limpiar el diccionario
+        """Anula el plazo de inactividad de un gremio y, si ya había vencido, su easter egg en curso."""
+        if self.idle_timers.cancel(guild_id):
+            log.debug(f"[{guild_id}] Chequeo de inactividad detenido.")
+        task = self.idle_actions.pop(guild_id, None)
+        if task is not None and not task.done():
+            task.cancel()
+
+    def on_idle_timeout(self, guild_id: int):
+        """Llamado por la rueda de temporizadores al vencer el plazo: sólo entonces se crea una tarea."""
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        self.idle_actions[guild_id] = self.bot.loop.create_task(self.inactivity_action(guild))
 
-    async def inactivity_loop(self, guild: discord.Guild):
+    async def inactivity_action(self, guild: discord.Guild):
         """
-        Bucle de inactividad: espera 10s, reproduce el easter egg y desconecta.
+        Tras el plazo de inactividad: reproduce el easter egg y desconecta.
         """
         voice_client = guild.voice_client
-        if not voice_client or not voice_client.is_connected():
-            log.warning(f"[{guild.name}] inactivity_loop llamado sin un cliente de voz conectado. Terminando.")
-            self.stop_inactivity_check(guild.id)  # Asegurar limpieza
-            return
-
         try:
-            log.debug(f"[{guild.name}] Esperando 10 segundos de inactividad...")
-            # Esperamos 10 segundos. Si la tarea es cancelada (por una nueva canción, stop, etc.), se interrumpe.
-            await asyncio.sleep(10)
-
-            # Re-verificar el estado después de la espera
-            if not voice_client.is_connected():
+            # Re-verificar el estado al vencer el plazo
+            if not voice_client or not voice_client.is_connected():
                 log.info(f"[{guild.name}] Bot desconectado durante la espera de inactividad. Terminando.")
                 return
             if voice_client.is_playing():
                 log.info(f"[{guild.name}] Se inició una reproducción durante la espera de inactividad. Terminando.")
                 return
 
-            log.info(f"[{guild.name}] 10 segundos de inactividad confirmados. Activando easter egg.")
+            log.info(f"[{guild.name}] {Config.MUSIC_IDLE_TIMEOUT} segundos de inactividad confirmados. Activando easter egg.")
             await self.play_random_audio(voice_client)  # Reproduce el easter egg y espera a que termine
 
             # Después de reproducir el easter egg, desconectar si sigue conectado
             if voice_client.is_connected():
-                log.info(f"[{guild.name}] Easter egg terminado. Desconectando por inactividad del loop.")
+                log.info(f"[{guild.name}] Easter egg terminado. Desconectando por inactividad.")
                 await voice_client.disconnect()
 
         except asyncio.CancelledError:
             log.info(f"[{guild.name}] Chequeo de inactividad cancelado (nueva canción, stop, etc.).")
         except Exception as e:
-            log.error(f"[{guild.name}] Error inesperado en inactivity_loop: {e}", exc_info=True)
+            log.error(f"[{guild.name}] Error inesperado tras la inactividad: {e}", exc_info=True)
             if voice_client and voice_client.is_connected():  # Intentar desconectar en caso de error grave
                 await voice_client.disconnect()
         finally:
-            self.stop_inactivity_check(guild.id)  # Asegurarse de limpiar la tarea al finalizar (éxito o error)
+            if self.idle_actions.get(guild.id) is asyncio.current_task():
+                del self.idle_actions[guild.id]
 
     async def play_random_audio(self, voice_client: discord.VoiceClient):
         """
-        Reproduce un audio aleatorio del directorio RANDOM_AUDIO_DIR y espera a que termine.
+        Reproduce un audio aleatorio de RANDOM_AUDIO_DIR y espera a que termine.
+        Los clips ya están en memoria codificados en Opus (ver self.clips): no se lanza ffmpeg.
         """
         if not voice_client or not voice_client.is_connected():
             log.warning(f"[{voice_client.guild.name}] No hay cliente de voz conectado para reproducir audio aleatorio.")
             return
 
-        try:
-            audio_files = [f for f in os.listdir(RANDOM_AUDIO_DIR) if f.endswith(('.mp3', '.wav', '.ogg'))]
-            if not audio_files:
-                log.warning(f"[{voice_client.guild.name}] No se encontraron archivos de audio en {RANDOM_AUDIO_DIR}.")
-                return
+        clip = self.clips.random_clip()
+        if clip is None:
+            log.warning(f"[{voice_client.guild.name}] No hay clips de audio cargados de {RANDOM_AUDIO_DIR}.")
+            return
 
-            random_file = os.path.join(RANDOM_AUDIO_DIR, random.choice(audio_files))
-            log.info(f"[{voice_client.guild.name}] Reproduciendo easter egg: {random_file}")
+        try:
+            log.info(f"[{voice_client.guild.name}] Reproduciendo easter egg: {clip.name}")
 
-            source = discord.FFmpegPCMAudio(random_file)
+            source = MemoryOpusAudio(clip)
             finished = asyncio.Event()
 
             voice_client.play(source, after=lambda e: self.bot.loop.call_soon_threadsafe(finished.set))
@@ -127,7 +159,7 @@ class MusicCog(commands.Cog):
                 voice_client.stop()
 
         except Exception as e:
-            log.error(f"[{voice_client.guild.name}] Error al intentar reproducir el easter egg '{random_file}'.",
+            log.error(f"[{voice_client.guild.name}] Error al intentar reproducir el easter egg '{clip.name}'.",
                       exc_info=e)
             if voice_client.is_playing():
                 voice_client.stop()
@@ -135,7 +167,19 @@ class MusicCog(commands.Cog):
     # --- LÓGICA DEL REPRODUCTOR PRINCIPAL ---
 
     async def play_next_song(self, ctx: discord.ApplicationContext):
-        """Maneja la reproducción de la siguiente canción en la cola."""
+        """
+        Maneja la reproducción de la siguiente canción en la cola.
+        Preparar la fuente puede tardar (resolución del stream), así que las llamadas de un
+        mismo gremio se serializan: la que llega mientras otra prepara espera y, si al entrar ya
+        está sonando algo, no hace nada.
+        """
+        lock = self.play_locks.setdefault(ctx.guild.id, asyncio.Lock())
+        async with lock:
+            while not await self.play_queue_head(ctx):
+                pass  # Falló esa canción: se intenta con la siguiente
+
+    async def play_queue_head(self, ctx: discord.ApplicationContext) -> bool:
+        """Reproduce la primera canción de la cola. Devuelve False si falló y hay que probar la siguiente."""
         self.stop_inactivity_check(ctx.guild.id)  # Asegura que no haya chequeo de inactividad mientras suena la cola
 
         guild_id = ctx.guild.id
@@ -147,7 +191,11 @@ class MusicCog(commands.Cog):
             log.warning(
                 f"[{ctx.guild.name}] play_next_song llamado sin cliente de voz conectado. Terminando reproducción.")
             self.current_song.pop(guild_id, None)
-            return
+            return True
+
+        if voice_client.is_playing() or voice_client.is_paused():
+            # Otra llamada ya empezó la reproducción mientras esta esperaba
+            return True
 
         if not queue:
             log.info(f"[{ctx.guild.name}] La cola de reproducción ha terminado.")
@@ -155,27 +203,49 @@ class MusicCog(commands.Cog):
             self.current_song.pop(guild_id, None)
             # Iniciar chequeo de inactividad SÓLO si el bot sigue conectado y la cola está vacía
             self.start_inactivity_check(ctx.guild)
-            return
+            return True
 
-        song_info = queue.popleft()
-        self.current_song[guild_id] = song_info
-        log.info(f"[{ctx.guild.name}] Reproduciendo: {song_info['title']}")
+        track = queue.popleft()
+        self.current_song[guild_id] = track
+        log.info(f"[{ctx.guild.name}] Reproduciendo: {track.title}")
 
-        FFMPEG_OPTIONS = {'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
-                          'options': '-vn'}
         try:
-            source = await discord.FFmpegOpusAudio.from_probe(song_info['stream_url'], **FFMPEG_OPTIONS)
+            cached = await audio_cache.get(track.video_id)
+            if cached:
+                source = audio_cache.source(cached, Config.MUSIC_TRANSCODE_BITRATE)
+            else:
+                # Normalmente ya viene resuelta por la precarga; si no, se resuelve aquí
+                source = await self.resolver.prepare(guild_id, track)
+                # La primera vez que suena se guarda en la caché de audio para las siguientes
+                audio_cache.store_in_background(track.video_id, track.stream_url, track.codec)
             # El 'after' lambda necesita un loop.create_task para ejecutar la siguiente canción en el bucle de eventos
             voice_client.play(source, after=lambda e: self.bot.loop.create_task(self.handle_after_play(e, ctx)))
+            # Mientras suena, se preparan las siguientes
+            self.prefetch(guild_id)
             embed = discord.Embed(title="🎵 Ahora Suena",
-                                  description=f"**{song_info['title']}**\npor *{song_info['uploader']}*",
+                                  description=f"**{track.title}**\npor *{track.uploader}*",
                                   color=discord.Color.green())
             # Usa ctx.send() para enviar la actualización de la canción
             await ctx.send(embed=embed)
+            return True
+        except discord.ClientException as e:
+            # Problema del cliente de voz (p. ej. ya está reproduciendo), no de la canción:
+            # probar con la siguiente fallaría igual y vaciaría la cola de una en una
+            log.error(f"[{ctx.guild.name}] El cliente de voz no pudo reproducir {track.title}: {e}")
+            queue.insert(0, track)
+            self.current_song.pop(guild_id, None)
+            return True
+        except asyncio.CancelledError:
+            # La resolución compartida se canceló (p. ej. /remove o /jump la descartaron): la canción
+            # queda sin resolver y se pasa a la siguiente. Sólo se propaga si se cancela esta tarea.
+            if asyncio.current_task().cancelling():
+                raise
+            log.info(f"[{ctx.guild.name}] Se canceló la resolución de {track.title}; se pasa a la siguiente.")
+            return False
         except Exception as e:
-            log.error(f"[{ctx.guild.name}] Error al intentar reproducir {song_info['title']}", exc_info=e)
-            await ctx.send(f"🔥 No se pudo reproducir la canción: `{song_info['title']}`. Saltando a la siguiente.")
-            await self.play_next_song(ctx)  # Intenta la siguiente canción en la cola
+            log.error(f"[{ctx.guild.name}] Error al intentar reproducir {track.title}", exc_info=e)
+            await ctx.send(f"🔥 No se pudo reproducir la canción: `{track.title}`. Saltando a la siguiente.")
+            return False
 
     async def handle_after_play(self, error, ctx: discord.ApplicationContext):
         """Callback ejecutado después de que una canción termina o hay un error."""
@@ -210,24 +280,110 @@ class MusicCog(commands.Cog):
 
         await ctx.defer()  # Aplaza la respuesta para dar tiempo a la búsqueda
 
-        loop = asyncio.get_running_loop()
-        song_info = await loop.run_in_executor(None, lambda: search_youtube(cancion))
+        if is_playlist_url(cancion):
+            return await self.play_playlist(ctx, cancion)
+
+        try:
+            song_info = await self.extractor.search(ctx.guild.id, cancion)
+        except ExtractionCancelled:
+            return await ctx.followup.send("⏹️ Búsqueda cancelada.")
+        except asyncio.TimeoutError:
+            return await ctx.followup.send("⌛ La búsqueda ha tardado demasiado. Inténtalo de nuevo.")
 
         if not song_info or not song_info.get('stream_url'):
             log.warning(f"No se pudo encontrar la canción: '{cancion}'")
             return await ctx.followup.send("❌ No se pudo encontrar la canción o su URL.")
 
+        track = Track.from_info(song_info)
         queue = self.get_queue(ctx.guild.id)
-        queue.append(song_info)
-        log.info(f"[{ctx.guild.name}] Añadido a la cola por {ctx.author}: {song_info['title']}")
+        queue.append(track)
+        log.info(f"[{ctx.guild.name}] Añadido a la cola por {ctx.author}: {track.title}")
 
-        if not voice_client.is_playing():
-            # Si no está sonando, empezamos la reproducción
-            await ctx.followup.send(f"▶️ **{song_info['title']}** añadido. Iniciando reproducción...")
+        if not voice_client.is_playing() and ctx.guild.id not in self.current_song:
+            # Si no está sonando (ni preparándose otra canción), empezamos la reproducción
+            await ctx.followup.send(f"▶️ **{track.title}** añadido. Iniciando reproducción...")
             await self.play_next_song(ctx)
         else:
-            # Si ya está sonando, solo añadimos a la cola
-            await ctx.followup.send(f"✅ Añadido a la cola: **{song_info['title']}**.")
+            # Si ya está sonando, solo añadimos a la cola (y se prepara si es de las próximas)
+            self.prefetch(ctx.guild.id)
+            await ctx.followup.send(f"✅ Añadido a la cola: **{track.title}**.")
+
+    # --- LISTAS DE REPRODUCCIÓN ---
+
+    @staticmethod
+    def playlist_embed(title: str, added: int, status: str) -> discord.Embed:
+        embed = discord.Embed(title="📃 Lista añadida a la cola", description=f"**{title}**",
+                              color=discord.Color.purple())
+        embed.add_field(name="Canciones añadidas", value=str(added))
+        embed.add_field(name="Estado", value=status)
+        return embed
+
+    async def play_playlist(self, ctx: discord.ApplicationContext, url: str):
+        """
+        Encola una lista o mix: la primera página (pequeña) se espera para empezar a sonar
+        cuanto antes y el resto se va añadiendo en segundo plano, actualizando el mensaje.
+        """
+        pages = self.extractor.playlist_pages(ctx.guild.id, url, Config.PLAYLIST_FIRST_BATCH,
+                                              Config.PLAYLIST_BATCH, Config.PLAYLIST_MAX_TRACKS)
+        try:
+            first_page = await anext(pages, None)
+        except ExtractionCancelled:
+            return await ctx.followup.send("⏹️ Carga de la lista cancelada.")
+        except asyncio.TimeoutError:
+            return await ctx.followup.send("⌛ La lista ha tardado demasiado en cargar. Inténtalo de nuevo.")
+        if not first_page or not first_page['entries']:
+            log.warning(f"No se pudo cargar la lista: '{url}'")
+            await pages.aclose()
+            return await ctx.followup.send("❌ No se pudo cargar la lista de reproducción.")
+
+        added = self.enqueue_tracks(ctx, first_page['entries'])
+        log.info(f"[{ctx.guild.name}] Lista '{first_page['title']}' añadida por {ctx.author}; cargando el resto.")
+        message = await ctx.followup.send(embed=self.playlist_embed(first_page['title'], added, PLAYLIST_LOADING))
+
+        task = self.bot.loop.create_task(self.load_playlist_rest(ctx, pages, message, first_page['title'], added))
+        tasks = self.playlist_tasks.setdefault(ctx.guild.id, set())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    def enqueue_tracks(self, ctx: discord.ApplicationContext, entries: list[dict]) -> int:
+        """Añade entradas a la cola y, si no sonaba nada, empieza a reproducir. Devuelve cuántas se añadieron."""
+        queue = self.get_queue(ctx.guild.id)
+        queue.extend(Track.from_info(entry) for entry in entries)
+        voice_client = ctx.voice_client
+        if voice_client and voice_client.is_connected() and not voice_client.is_playing() \
+                and ctx.guild.id not in self.current_song:
+            self.bot.loop.create_task(self.play_next_song(ctx))
+        else:
+            self.prefetch(ctx.guild.id)
+        return len(entries)
+
+    async def load_playlist_rest(self, ctx: discord.ApplicationContext, pages, message, title: str, added: int):
+        """Sigue extrayendo páginas de la lista y encolándolas hasta terminar o hasta /stop."""
+        status = "✅ Completa"
+        try:
+            async for page in pages:
+                added += self.enqueue_tracks(ctx, page['entries'])
+                await message.edit(embed=self.playlist_embed(title, added, PLAYLIST_LOADING))
+        except (ExtractionCancelled, asyncio.CancelledError):
+            # /stop: la tarea termina aquí, tras dejar el mensaje en su estado final
+            log.info(f"[{ctx.guild.name}] Carga de la lista '{title}' cancelada con {added} canciones.")
+            status = "⏹️ Cancelada"
+        except asyncio.TimeoutError:
+            log.warning(f"[{ctx.guild.name}] Una página de la lista '{title}' tardó demasiado; se deja como está.")
+            status = "⚠️ Cargada en parte"
+        except Exception as e:
+            log.error(f"[{ctx.guild.name}] Error al cargar la lista '{title}'.", exc_info=e)
+            status = "⚠️ Cargada en parte"
+        finally:
+            await pages.aclose()
+        try:
+            await message.edit(embed=self.playlist_embed(title, added, status))
+        except discord.HTTPException as e:
+            log.warning(f"[{ctx.guild.name}] No se pudo actualizar el mensaje de la lista: {e}")
+
+    def cancel_playlists(self, guild_id: int):
+        for task in self.playlist_tasks.pop(guild_id, ()):
+            task.cancel()
 
     @commands.slash_command(name="stop", description="Detiene la música, vacía la cola y desconecta el bot.")
     async def stop(self, ctx: discord.ApplicationContext):
@@ -235,7 +391,11 @@ class MusicCog(commands.Cog):
             return await ctx.respond("No estoy en un canal de voz.", ephemeral=True)
 
         self.stop_inactivity_check(ctx.guild.id)  # Asegura detener cualquier tarea de inactividad
-        self.get_queue(ctx.guild.id).clear()  # Vaciar la cola
+        queue = self.get_queue(ctx.guild.id)
+        self.resolver.discard(queue)  # Cancelar lo que se estuviera preparando
+        self.extractor.cancel_guild(ctx.guild.id)  # y las búsquedas de este servidor aún en curso
+        self.cancel_playlists(ctx.guild.id)  # y las listas que se estuvieran cargando
+        queue.clear()  # Vaciar la cola
         self.current_song.pop(ctx.guild.id, None)  # Limpiar la canción actual
         ctx.voice_client.stop()  # Detener la reproducción actual
 
@@ -254,7 +414,8 @@ class MusicCog(commands.Cog):
         await ctx.respond("⏭️ Canción saltada.")
 
     @commands.slash_command(name="queue", description="Muestra la cola de canciones.")
-    async def queue(self, ctx: discord.ApplicationContext):
+    async def queue(self, ctx: discord.ApplicationContext,
+                    pagina: discord.Option(int, "Página de la cola", required=False, default=1, min_value=1)):
         guild_id = ctx.guild.id
         queue = self.get_queue(guild_id)
         current = self.current_song.get(guild_id)
@@ -264,22 +425,82 @@ class MusicCog(commands.Cog):
         embed = discord.Embed(title="📜 Cola de Reproducción", color=discord.Color.purple())
 
         if current:
-            duration = str(datetime.timedelta(seconds=current.get('duration', 0)))
+            duration = str(datetime.timedelta(seconds=current.duration))
             embed.add_field(name="▶️ Sonando Ahora",
-                            value=f"**{current['title']}**\n*{current['uploader']}* ({duration})", inline=False)
+                            value=f"**{current.title}**\n*{current.uploader}* ({duration})", inline=False)
 
         if queue:
-            queue_text = ""
-            for i, song in enumerate(list(queue)[:10]):  # Mostrar solo las primeras 10 canciones
-                queue_text += f"\n`{i + 1}.` {song['title']}"
-            if len(queue) > 10:
-                queue_text += f"\n... y {len(queue) - 10} más."
-
-            if queue_text:  # Asegurarse de que hay texto para añadir el campo
-                embed.add_field(name="⬇️ A Continuación", value=queue_text, inline=False)
+            pages = math.ceil(len(queue) / QUEUE_PAGE_SIZE)
+            pagina = min(pagina, pages)
+            start = (pagina - 1) * QUEUE_PAGE_SIZE
+            # Sólo se recorre la página pedida, no la cola entera
+            queue_text = "".join(f"\n`{start + i + 1}.` {song.title}"
+                                 for i, song in enumerate(queue.slice(start, start + QUEUE_PAGE_SIZE)))
+            embed.add_field(name="⬇️ A Continuación", value=queue_text, inline=False)
+            total = str(datetime.timedelta(seconds=queue.total_duration))
+            embed.set_footer(text=f"Página {pagina}/{pages} · {len(queue)} canciones · {total} en total")
 
         await ctx.respond(embed=embed)
 
+    @staticmethod
+    def queue_position(queue: TrackQueue, posicion: int) -> int | None:
+        """Convierte una posición de /queue (desde 1) en un índice de la cola, o None si no existe."""
+        return posicion - 1 if 1 <= posicion <= len(queue) else None
+
+    @commands.slash_command(name="remove", description="Quita una canción de la cola.")
+    async def remove(self, ctx: discord.ApplicationContext,
+                     posicion: discord.Option(int, "Posición en la cola (ver /queue)", min_value=1)):
+        queue = self.get_queue(ctx.guild.id)
+        index = self.queue_position(queue, posicion)
+        if index is None:
+            return await ctx.respond(f"❌ No hay ninguna canción en la posición {posicion}.", ephemeral=True)
+
+        track = queue.pop(index)
+        self.resolver.discard([track])  # Si se estaba preparando, ya no hace falta
+        self.prefetch(ctx.guild.id)  # Puede haber entrado otra entre las próximas
+        log.info(f"[{ctx.guild.name}] {ctx.author} quitó de la cola: {track.title}")
+        await ctx.respond(f"🗑️ Quitada de la cola: **{track.title}**.")
+
+    @commands.slash_command(name="move", description="Mueve una canción a otra posición de la cola.")
+    async def move(self, ctx: discord.ApplicationContext,
+                   desde: discord.Option(int, "Posición actual (ver /queue)", min_value=1),
+                   hasta: discord.Option(int, "Nueva posición", min_value=1)):
+        queue = self.get_queue(ctx.guild.id)
+        index = self.queue_position(queue, desde)
+        if index is None:
+            return await ctx.respond(f"❌ No hay ninguna canción en la posición {desde}.", ephemeral=True)
+
+        target = min(hasta, len(queue)) - 1
+        track = queue.move(index, target)
+        self.prefetch(ctx.guild.id)
+        await ctx.respond(f"↕️ **{track.title}** movida a la posición {target + 1}.")
+
+    @commands.slash_command(name="shuffle", description="Mezcla las canciones de la cola.")
+    async def shuffle(self, ctx: discord.ApplicationContext):
+        queue = self.get_queue(ctx.guild.id)
+        if len(queue) < 2:
+            return await ctx.respond("No hay suficientes canciones en la cola para mezclar.", ephemeral=True)
+
+        queue.shuffle()
+        self.prefetch(ctx.guild.id)
+        await ctx.respond(f"🔀 Cola mezclada ({len(queue)} canciones).")
+
+    @commands.slash_command(name="jump", description="Salta directamente a una canción de la cola.")
+    async def jump(self, ctx: discord.ApplicationContext,
+                   posicion: discord.Option(int, "Posición en la cola (ver /queue)", min_value=1)):
+        if not ctx.voice_client or not (ctx.voice_client.is_playing() or ctx.voice_client.is_paused()):
+            return await ctx.respond("No hay ninguna canción sonando.", ephemeral=True)
+        queue = self.get_queue(ctx.guild.id)
+        index = self.queue_position(queue, posicion)
+        if index is None:
+            return await ctx.respond(f"❌ No hay ninguna canción en la posición {posicion}.", ephemeral=True)
+
+        skipped = queue.drop_front(index)  # Las anteriores se descartan
+        self.resolver.discard(skipped)
+        self.stop_inactivity_check(ctx.guild.id)
+        ctx.voice_client.stop()  # Esto activará handle_after_play, que reproducirá la elegida
+        await ctx.respond(f"⏩ Saltando a **{queue[0].title}**.")
+
     @commands.slash_command(name="nowplaying", description="Muestra la canción que está sonando.")
     async def nowplaying(self, ctx: discord.ApplicationContext):
         guild_id = ctx.guild.id
@@ -287,9 +508,9 @@ class MusicCog(commands.Cog):
         if not ctx.voice_client or not ctx.voice_client.is_playing() or not current:
             return await ctx.respond("No hay ninguna canción sonando.", ephemeral=True)
 
-        duration = str(datetime.timedelta(seconds=current.get('duration', 0)))
+        duration = str(datetime.timedelta(seconds=current.duration))
         embed = discord.Embed(title="🎵 Sonando Ahora",
-                              description=f"**{current['title']}**\npor *{current['uploader']}*",
+                              description=f"**{current.title}**\npor *{current.uploader}*",
                               color=discord.Color.blue())
         embed.add_field(name="Duración", value=duration)
         await ctx.respond(embed=embed)
@@ -0,0 +1,43 @@
+import discord
+from discord.ext import commands
+import asyncio
+import datetime
+import logging
+
+from database import database_manager as db
+
+log = logging.getLogger(__name__)
+
+
+class StatsCog(commands.Cog):
+    def __init__(self, bot: discord.Bot):
+        self.bot = bot
+
+    @commands.slash_command(name="stats", description="Muestra la actividad de voz y mensajes de un usuario.")
+    async def stats(self, ctx: discord.ApplicationContext,
+                    usuario: discord.Option(discord.Member, "Usuario a consultar", required=False),
+                    dias: discord.Option(int, "Días hacia atrás", required=False, default=7, min_value=1, max_value=365)):
+        miembro = usuario or ctx.author
+        log.info(f"Comando /stats usado por {ctx.author} para {miembro} ({dias} días).")
+        # Lectura de los agregados: unas pocas filas, pero fuera del bucle de eventos
+        summary = await asyncio.to_thread(db.get_user_activity, miembro.id, dias)
+        if summary is None:
+            return await ctx.respond("🔥 No se pudieron consultar las estadísticas.", ephemeral=True)
+
+        embed = discord.Embed(title=f"📈 Actividad de {miembro.display_name}",
+                              description=f"Últimos {dias} días",
+                              color=discord.Color.teal())
+        embed.set_thumbnail(url=miembro.display_avatar.url)
+        embed.add_field(name="Tiempo en voz", value=str(datetime.timedelta(seconds=summary['voice_seconds'])), inline=True)
+        embed.add_field(name="Sesiones de voz", value=summary['voice_sessions'], inline=True)
+        if summary['top_voice_channel_id']:
+            embed.add_field(name="Canal de voz favorito", value=f"<#{summary['top_voice_channel_id']}>", inline=True)
+        if summary['current_voice_channel_id']:
+            embed.add_field(name="Ahora mismo en", value=f"<#{summary['current_voice_channel_id']}>", inline=True)
+        embed.add_field(name="Mensajes eliminados", value=summary['deletes'], inline=True)
+        embed.add_field(name="Mensajes editados", value=summary['edits'], inline=True)
+        await ctx.respond(embed=embed)
+
+
+def setup(bot):
+    bot.add_cog(StatsCog(bot))
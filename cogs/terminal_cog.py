@@ -3,7 +3,9 @@ from discord.ext import commands
 import asyncio
 import os
 import logging
-from utils.downloader import download_video
+from database import database_manager as db
+from utils.audio_cache import audio_cache
+from utils.downloader import download_video, youtube_video_id
 
 log = logging.getLogger(__name__)
 
@@ -40,6 +42,8 @@ class TerminalCog(commands.Cog):
                     await self.handle_audio(args)
                 elif command == "salir":
                     await self.handle_salir()
+                elif command == "compactar":
+                    await self.handle_compactar()
                 elif command == "terminar":
                     await self.handle_terminar()
                     break
@@ -57,6 +61,7 @@ class TerminalCog(commands.Cog):
             "entrar <ID_canal_voz>           - Se une a un canal de voz.\n"
             "audio <ruta_local_o_url>        - Reproduce un audio en el canal de voz.\n"
             "salir                           - Se desconecta del canal de voz.\n"
+            "compactar                       - VACUUM completo único para activar auto_vacuum incremental.\n"
             "terminar                        - Apaga el bot.\n"
             "--------------------------------------\n"
         )
@@ -100,11 +105,22 @@ class TerminalCog(commands.Cog):
 
         path = " ".join(args)
         source = None
-        if os.path.exists(path):
+        is_local = os.path.exists(path)
+        if is_local:
             source = discord.FFmpegPCMAudio(path)
             log.info(f"Reproduciendo audio local: {path}")
-        else:  # Asume que es una URL
-            video_path = download_video(path)
+        elif youtube_video_id(path) and audio_cache.enabled:
+            # Vídeos de YouTube: sólo el audio, guardado en (o leído de) la caché de audio
+            entry = await audio_cache.fetch(path)
+            if entry:
+                source = audio_cache.source(entry)
+                log.info(f"Reproduciendo desde la caché de audio: {entry['video_id']}")
+            else:
+                # Demasiado grande para la caché, error de descarga, etc.: se descarga como antes
+                log.warning(f"No se pudo usar la caché de audio para {path}; se descarga el vídeo.")
+
+        if source is None and not is_local:  # Asume que es una URL
+            video_path = await asyncio.to_thread(download_video, path)
             if video_path:
                 source = discord.FFmpegPCMAudio(video_path)
                 log.info(f"Descargado y reproduciendo vídeo: {video_path}")
@@ -124,6 +140,13 @@ class TerminalCog(commands.Cog):
             log.info("Desconectado del canal de voz.")
             print("✅ Desconectado.")
 
+    async def handle_compactar(self):
+        print("🗜️ Compactando la base de datos (puede tardar y bloquea las escrituras)...")
+        if await asyncio.to_thread(db.compact_database):
+            print("✅ Base de datos compactada; auto_vacuum incremental activado.")
+        else:
+            print("✅ auto_vacuum incremental ya estaba activado; no hace falta compactar.")
+
     async def handle_terminar(self):
         log.info("Apagando el bot por comando de terminal.")
         print("🔌 Apagando el bot...")
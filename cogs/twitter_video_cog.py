@@ -5,6 +5,7 @@ import os
 import logging
 
 from utils.downloader import download_video
+from utils import metrics
 
 log = logging.getLogger(__name__)
 
@@ -13,6 +14,7 @@ class TwitterVideoCog(commands.Cog):
         self.bot = bot
 
     @commands.Cog.listener()
+    @metrics.timed_listener
     async def on_message(self, message: discord.Message):
         """Detecta enlaces de Twitter/X y procesa el video si existe."""
         if message.author.bot:
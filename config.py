@@ -17,6 +17,79 @@ class Config:
     DOWNLOADS_PATH = "downloads"
 
     RANDOM_AUDIO_PATH = os.path.join(os.getcwd(), 'random_audio')
+    RANDOM_AUDIO_BITRATE = 96  # kbps de los clips del easter egg, transcodificados a Opus y guardados en memoria
+    RANDOM_AUDIO_RESCAN_INTERVAL = 30  # Segundos entre revisiones de la carpeta de clips en busca de cambios
+
+    # --- Música ---
+    MUSIC_IDLE_TIMEOUT = 10  # Segundos sin música antes del easter egg y la desconexión
+    IDLE_TIMER_RESOLUTION = 0.5  # Precisión en segundos de la rueda de temporizadores de inactividad
+    MUSIC_PREFETCH_COUNT = 2  # Canciones siguientes de la cola cuyo stream se prepara mientras suena la actual
+    STREAM_URL_TTL = 3600  # Segundos de validez supuestos para una URL de stream que no indica su caducidad
+    STREAM_URL_MARGIN = 600  # Una URL que caduca antes de estos segundos se vuelve a resolver antes de usarla
+    MUSIC_TRANSCODE_BITRATE = 128  # kbps al transcodificar a Opus los streams que no lo son (los Opus se copian)
+    SEARCH_CACHE_DAYS = 30  # Días que se reutilizan los resultados y metadatos de una búsqueda de YouTube
+    EXTRACTION_WORKERS = 2  # Procesos dedicados a las extracciones de yt-dlp
+    EXTRACTION_PER_GUILD = 2  # Extracciones de un mismo servidor en curso a la vez como máximo
+    EXTRACTION_TIMEOUT = 30  # Segundos máximos que se espera una extracción (incluido su turno)
+    PLAYLIST_MAX_TRACKS = 200  # Canciones como máximo que se encolan de una lista o mix
+    PLAYLIST_FIRST_BATCH = 5  # Entradas de la primera página de una lista (lo que se espera antes de sonar)
+    PLAYLIST_BATCH = 50  # Entradas por página al cargar el resto de la lista en segundo plano
+    AUDIO_CACHE_PATH = "audio_cache"  # Carpeta de la caché de audio en disco
+    AUDIO_CACHE_MAX_BYTES = 2 * 1024 ** 3  # Tamaño máximo de la caché de audio (0 = desactivada)
+    AUDIO_CACHE_MAX_TRACK_BYTES = 50 * 1024 ** 2  # Las canciones más grandes no se guardan en la caché
+    AUDIO_CACHE_DOWNLOADS = 2  # Canciones descargándose a la caché a la vez
 
     # ID del canal donde se registrarán los eventos (logs de auditoría)
-    AUDIT_LOG_CHANNEL_ID = 1394673936385576991
\ No newline at end of file
+    AUDIT_LOG_CHANNEL_ID = 1394673936385576991
+
+    # --- Escritura de logs de auditoría por lotes ---
+    AUDIT_BATCH_SIZE = 200  # Filas máximas por transacción
+    AUDIT_FLUSH_INTERVAL = 1.0  # Segundos máximos que un log espera en memoria antes de escribirse
+    AUDIT_QUEUE_MAXSIZE = 10000  # Tamaño máximo de la cola en memoria (lo que no cabe se descarta y se cuenta)
+    AUDIT_QUEUE_WRITE_LIMIT = 5000  # Con esta cola, se descartan las escrituras que no son logs (directorio, cachés)
+
+    # --- Conexiones a la base de datos SQLite ---
+    DB_MMAP_SIZE = 256 * 1024 * 1024  # Bytes de la base de datos mapeados en memoria (PRAGMA mmap_size)
+    DB_STATEMENT_CACHE_SIZE = 256  # Sentencias preparadas en caché por conexión
+    DB_READER_POOL_SIZE = 8  # Conexiones de lectura inactivas que se conservan para reutilizar
+
+    # --- Retención y archivo de logs de auditoría ---
+    # Días que se conserva cada tipo de evento en la base de datos (None = para siempre)
+    AUDIT_RETENTION_DAYS = {
+        "VOICE_JOIN": 90,
+        "VOICE_LEAVE": 90,
+        "VOICE_MOVE": 90,
+        "MESSAGE_EDIT": 180,
+        "MESSAGE_DELETE": 365,
+    }
+    AUDIT_RETENTION_DEFAULT_DAYS = 365  # Para tipos de evento no listados arriba
+    AUDIT_ARCHIVE_PATH = "archive"  # Carpeta de archivos mensuales .ndjson.gz
+    AUDIT_RETENTION_CHUNK_SIZE = 500  # Filas archivadas y borradas por transacción
+    AUDIT_VACUUM_PAGES = 1000  # Páginas liberadas por cada bloque (PRAGMA incremental_vacuum)
+    AUDIT_RETENTION_INTERVAL_HOURS = 6  # Frecuencia con la que se aplica la retención
+
+    # --- Panel web ---
+    # "flask": servidor de desarrollo de Flask en un hilo aparte (por defecto).
+    # "async": servidor aiohttp dentro del bucle de eventos del bot.
+    WEB_SERVER_MODE = os.getenv("WEB_SERVER_MODE", "flask")
+    WEB_HOST = os.getenv("WEB_HOST", "0.0.0.0")
+    WEB_PORT = int(os.getenv("WEB_PORT", "5000"))
+    WEB_MAX_REQUEST_SIZE = 100 * 1024 * 1024  # Bytes máximos por petición (y por archivo subido) en el panel web
+    WEB_JOB_CONCURRENCY = 4  # Envíos y acciones de voz del panel ejecutándose a la vez
+    WEB_JOB_MAX_PENDING = 50  # Trabajos sin terminar admitidos antes de rechazar nuevos envíos
+    WEB_JOB_HISTORY_SIZE = 200  # Trabajos terminados cuyo estado se puede seguir consultando
+    WEB_JOB_MAX_WAIT = 30  # Segundos máximos de espera al consultar un trabajo con ?wait=
+    WEB_UPLOAD_SPOOL_SIZE = 1024 * 1024  # Bytes de un archivo subido que se guardan en memoria antes de pasar a disco
+    WEB_UPLOAD_MAX_IN_FLIGHT = 64 * 1024 * 1024  # Bytes de archivos subiéndose a Discord a la vez, en total
+    BROADCAST_MAX_CHANNELS = 100  # Canales como máximo en una difusión desde el panel
+    BROADCAST_RATE = 10  # Envíos por segundo entre todas las difusiones (el límite global de Discord es 50)
+    BROADCAST_BURST = 5  # Envíos seguidos permitidos antes de aplicar el ritmo
+    BROADCAST_CONCURRENCY = 5  # Envíos de difusión en curso a la vez
+    BROADCAST_MAX_RETRIES = 3  # Reintentos por canal tras un 429 o un error 5xx
+    LOGS_PAGE_SIZE = 100  # Registros por página en el visor de logs
+    EXPORT_CHUNK_SIZE = 1000  # Registros leídos de la base de datos por consulta al exportar
+    LIVE_TAIL_MAX_PENDING = 500  # Logs en cola por cliente del visor en vivo antes de obligarle a reconectar
+    LIVE_TAIL_KEEPALIVE = 15  # Segundos entre comentarios keep-alive del stream de eventos
+    NAME_CACHE_SIZE = 10000  # Nombres de usuario guardados en la caché del panel
+    NAME_CACHE_TTL = 3600  # Segundos que un nombre resuelto se mantiene en caché
+    NAME_RESOLVER_CONCURRENCY = 5  # Peticiones REST simultáneas como máximo al resolver nombres
@@ -0,0 +1,202 @@
+# Agregados de actividad mantenidos de forma incremental por el escritor de auditoría.
+# Las funciones reciben un cursor y se ejecutan dentro de la transacción de cada lote,
+# de modo que los resúmenes siempre están al día con los logs guardados.
+from datetime import datetime, timedelta
+
+
+def create_tables(cur):
+    """Crea las tablas de sesiones de voz y contadores diarios si no existen."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS voice_sessions_open (
+            user_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            started_at TEXT NOT NULL
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS voice_sessions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            channel_id INTEGER NOT NULL,
+            started_at TEXT NOT NULL,
+            ended_at TEXT NOT NULL,
+            duration_seconds INTEGER NOT NULL
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_voice_sessions_user ON voice_sessions (user_id, ended_at)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS voice_daily (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            channel_id INTEGER NOT NULL,
+            seconds INTEGER NOT NULL DEFAULT 0,
+            sessions INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, channel_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_voice_daily_day ON voice_daily (day)")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS message_daily (
+            user_id INTEGER NOT NULL,
+            day TEXT NOT NULL,
+            channel_id INTEGER NOT NULL,
+            deletes INTEGER NOT NULL DEFAULT 0,
+            edits INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, day, channel_id)
+        ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_message_daily_day ON message_daily (day)")
+
+
+def _open_session(cur, user_id: int, channel_id: int, timestamp: str):
+    # Si quedó una sesión abierta (p. ej. se perdió un VOICE_LEAVE), se cierra antes
+    _close_session(cur, user_id, timestamp)
+    cur.execute(
+        "INSERT INTO voice_sessions_open (user_id, channel_id, started_at) VALUES (?, ?, ?)",
+        (user_id, channel_id, timestamp)
+    )
+
+
+def _close_session(cur, user_id: int, timestamp: str):
+    row = cur.execute(
+        "SELECT channel_id, started_at FROM voice_sessions_open WHERE user_id = ?", (user_id,)
+    ).fetchone()
+    if row is None:
+        return
+    channel_id, started_at = row[0], row[1]
+    start, end = datetime.fromisoformat(started_at), datetime.fromisoformat(timestamp)
+    duration = max(0, int((end - start).total_seconds()))
+    cur.execute("DELETE FROM voice_sessions_open WHERE user_id = ?", (user_id,))
+    cur.execute(
+        "INSERT INTO voice_sessions (user_id, channel_id, started_at, ended_at, duration_seconds) VALUES (?, ?, ?, ?, ?)",
+        (user_id, channel_id, started_at, timestamp, duration)
+    )
+
+    # Se reparte la duración entre los días (UTC) que abarca la sesión
+    daily = []
+    cursor_time, first = start, True
+    while cursor_time < end or first:
+        next_day = datetime.combine(cursor_time.date() + timedelta(days=1), datetime.min.time(), cursor_time.tzinfo)
+        chunk_end = min(end, next_day)
+        seconds = max(0, int((chunk_end - cursor_time).total_seconds()))
+        daily.append((user_id, cursor_time.date().isoformat(), channel_id, seconds, 1 if first else 0))
+        cursor_time, first = chunk_end, False
+    cur.executemany(
+        """INSERT INTO voice_daily (user_id, day, channel_id, seconds, sessions) VALUES (?, ?, ?, ?, ?)
+           ON CONFLICT (user_id, day, channel_id)
+           DO UPDATE SET seconds = seconds + excluded.seconds, sessions = sessions + excluded.sessions""",
+        daily
+    )
+
+
+def reconcile_sessions(cur, present: dict[int, int], now: str, restarted: bool):
+    """
+    Ajusta las sesiones abiertas a los estados de voz reales (`present`: user_id -> canal)
+    al conectar con el gateway. Se cierran las de quien ya no está en ese canal y, tras
+    arrancar el bot, todas (no se sabe si siguió conectado durante la caída); el cierre es en
+    el último evento registrado antes de `now`, para no contar como voz el tiempo sin datos.
+    Quien está en voz sin sesión abierta empieza una en `now`.
+    """
+    last_seen = cur.execute("SELECT MAX(timestamp) FROM audit_logs WHERE timestamp < ?", (now,)).fetchone()[0]
+    open_sessions = cur.execute("SELECT user_id, channel_id, started_at FROM voice_sessions_open").fetchall()
+    for user_id, channel_id, started_at in open_sessions:
+        if not restarted and present.get(user_id) == channel_id:
+            continue
+        _close_session(cur, user_id, max(started_at, last_seen or started_at))
+    cur.executemany(
+        "INSERT OR IGNORE INTO voice_sessions_open (user_id, channel_id, started_at) VALUES (?, ?, ?)",
+        [(user_id, channel_id, now) for user_id, channel_id in present.items()]
+    )
+
+
+def apply_batch(cur, batch: list[tuple]):
+    """
+    Actualiza los agregados con un lote de filas de auditoría
+    (timestamp, event_type, author_id, channel_id, message, details).
+    """
+    message_counts = {}
+    for timestamp, event_type, author_id, channel_id, _message, _details in batch:
+        if author_id is None or channel_id is None:
+            continue
+        if event_type == "VOICE_JOIN" or event_type == "VOICE_MOVE":
+            _open_session(cur, author_id, channel_id, timestamp)
+        elif event_type == "VOICE_LEAVE":
+            _close_session(cur, author_id, timestamp)
+        elif event_type in ("MESSAGE_DELETE", "MESSAGE_EDIT"):
+            key = (author_id, timestamp[:10], channel_id)
+            deletes, edits = message_counts.get(key, (0, 0))
+            if event_type == "MESSAGE_DELETE":
+                deletes += 1
+            else:
+                edits += 1
+            message_counts[key] = (deletes, edits)
+
+    if message_counts:
+        cur.executemany(
+            """INSERT INTO message_daily (user_id, day, channel_id, deletes, edits) VALUES (?, ?, ?, ?, ?)
+               ON CONFLICT (user_id, day, channel_id)
+               DO UPDATE SET deletes = deletes + excluded.deletes, edits = edits + excluded.edits""",
+            [(*key, deletes, edits) for key, (deletes, edits) in message_counts.items()]
+        )
+
+
+def user_summary(cur, user_id: int, since_day: str, now: datetime) -> dict:
+    """Resumen de actividad de un usuario desde `since_day` (AAAA-MM-DD, UTC)."""
+    voice = cur.execute(
+        "SELECT COALESCE(SUM(seconds), 0), COALESCE(SUM(sessions), 0) FROM voice_daily WHERE user_id = ? AND day >= ?",
+        (user_id, since_day)
+    ).fetchone()
+    top_channel = cur.execute(
+        """SELECT channel_id, SUM(seconds) AS total FROM voice_daily WHERE user_id = ? AND day >= ?
+           GROUP BY channel_id ORDER BY total DESC LIMIT 1""",
+        (user_id, since_day)
+    ).fetchone()
+    messages = cur.execute(
+        "SELECT COALESCE(SUM(deletes), 0), COALESCE(SUM(edits), 0) FROM message_daily WHERE user_id = ? AND day >= ?",
+        (user_id, since_day)
+    ).fetchone()
+    open_session = cur.execute(
+        "SELECT channel_id, started_at FROM voice_sessions_open WHERE user_id = ?", (user_id,)
+    ).fetchone()
+
+    voice_seconds = voice[0]
+    current_channel_id = None
+    if open_session:
+        # La sesión en curso aún no está en voice_daily: se suma lo que lleva dentro del periodo
+        started_at = max(datetime.fromisoformat(open_session[1]), datetime.fromisoformat(since_day + "T00:00:00+00:00"))
+        voice_seconds += max(0, int((now - started_at).total_seconds()))
+        current_channel_id = open_session[0]
+
+    return {
+        'user_id': user_id,
+        'voice_seconds': voice_seconds,
+        'voice_sessions': voice[1],
+        'top_voice_channel_id': top_channel[0] if top_channel else None,
+        'current_voice_channel_id': current_channel_id,
+        'deletes': messages[0],
+        'edits': messages[1],
+    }
+
+
+def leaderboard(cur, since_day: str, limit: int) -> dict:
+    """Usuarios con más tiempo en voz y más mensajes eliminados/editados desde `since_day`."""
+    voice = cur.execute(
+        """SELECT totals.*, directory.name AS user_name FROM (
+               SELECT user_id, SUM(seconds) AS voice_seconds, SUM(sessions) AS voice_sessions
+               FROM voice_daily WHERE day >= ? GROUP BY user_id ORDER BY voice_seconds DESC LIMIT ?
+           ) AS totals LEFT JOIN directory ON directory.id = totals.user_id
+           ORDER BY totals.voice_seconds DESC""",
+        (since_day, limit)
+    ).fetchall()
+    churn = cur.execute(
+        """SELECT totals.*, directory.name AS user_name FROM (
+               SELECT user_id, SUM(deletes) AS deletes, SUM(edits) AS edits
+               FROM message_daily WHERE day >= ? GROUP BY user_id ORDER BY deletes + edits DESC LIMIT ?
+           ) AS totals LEFT JOIN directory ON directory.id = totals.user_id
+           ORDER BY totals.deletes + totals.edits DESC""",
+        (since_day, limit)
+    ).fetchall()
+    return {
+        'voice': [dict(row) for row in voice],
+        'messages': [dict(row) for row in churn],
+    }
@@ -0,0 +1,37 @@
+# Índice persistente de la caché de audio en disco: qué archivo guarda cada vídeo, su tamaño,
+# su hash (para comprobar la integridad) y cuándo se usó por última vez (para el LRU).
+# Las funciones reciben un cursor; las escrituras se encolan en el escritor por lotes.
+
+UPSERT_ENTRY_SQL = """
+    INSERT INTO audio_cache (video_id, filename, size, sha256, codec, last_used) VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT (video_id) DO UPDATE SET
+        filename = excluded.filename,
+        size = excluded.size,
+        sha256 = excluded.sha256,
+        codec = excluded.codec,
+        last_used = excluded.last_used
+"""
+
+TOUCH_ENTRY_SQL = "UPDATE audio_cache SET last_used = ? WHERE video_id = ?"
+
+DELETE_ENTRY_SQL = "DELETE FROM audio_cache WHERE video_id = ?"
+
+
+def create_tables(cur):
+    """Crea la tabla del índice de la caché de audio si no existe."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS audio_cache (
+            video_id TEXT PRIMARY KEY,
+            filename TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL,
+            codec TEXT,
+            last_used REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def load_entries(cur) -> list[dict]:
+    """Todas las entradas, de la usada hace más tiempo a la más reciente."""
+    cur.execute("SELECT video_id, filename, size, sha256, codec, last_used FROM audio_cache ORDER BY last_used")
+    return [dict(row) for row in cur.fetchall()]
@@ -0,0 +1,90 @@
+import asyncio
+import queue
+import threading
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class FeedSubscription:
+    """
+    Suscripción a los logs nuevos. Se puede consumir desde un hilo (`get`) o desde
+    un bucle de eventos (`wait`). Si el cliente no da abasto y la cola se llena, la
+    suscripción se marca como desbordada: el cliente debe reconectar y recuperar
+    lo perdido desde la base de datos con su último id.
+    """
+
+    def __init__(self, max_pending: int, loop: asyncio.AbstractEventLoop = None):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.overflowed = False
+        self._loop = loop
+        self._event = asyncio.Event() if loop else None
+
+    def push(self, rows: list[dict]):
+        if self.overflowed:
+            return
+        for row in rows:
+            try:
+                self.queue.put_nowait(row)
+            except queue.Full:
+                self.overflowed = True
+                break
+        if self._loop:
+            self._loop.call_soon_threadsafe(self._event.set)
+
+    def _drain(self) -> list[dict]:
+        rows = []
+        while True:
+            try:
+                rows.append(self.queue.get_nowait())
+            except queue.Empty:
+                return rows
+
+    def get(self, timeout: float) -> list[dict]:
+        """Espera (bloqueando el hilo) hasta `timeout` segundos y devuelve los logs recibidos."""
+        try:
+            first = self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        return [first] + self._drain()
+
+    async def wait(self, timeout: float) -> list[dict]:
+        """Espera (sin bloquear el bucle) hasta `timeout` segundos y devuelve los logs recibidos."""
+        # Se limpia antes de vaciar la cola para no perder un aviso que llegue entre medias
+        self._event.clear()
+        rows = self._drain()
+        if rows or self.overflowed:
+            return rows
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self._drain()
+
+
+class AuditFeed:
+    """Difunde a los suscriptores (p. ej. el visor de logs en vivo) los logs recién guardados."""
+
+    def __init__(self, max_pending: int = 500):
+        self.max_pending = max_pending
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self, loop: asyncio.AbstractEventLoop = None) -> FeedSubscription:
+        subscription = FeedSubscription(self.max_pending, loop)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: FeedSubscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def has_subscribers(self) -> bool:
+        return bool(self._subscribers)
+
+    def publish(self, rows: list[dict]):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscription in subscribers:
+            subscription.push(rows)
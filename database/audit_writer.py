@@ -0,0 +1,219 @@
+import queue
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+LOG_COLUMNS = ("id", "timestamp", "event_type", "author_id", "channel_id", "message", "details")
+INSERT_LOG_SQL = (
+    "INSERT INTO audit_logs (timestamp, event_type, author_id, channel_id, message, details) "
+    "VALUES (?, ?, ?, ?, ?, ?)"
+)
+
+
+class WriteStatement:
+    """Escritura arbitraria (sentencia + filas de parámetros) que el escritor ejecuta en orden."""
+    __slots__ = ("sql", "rows")
+
+    def __init__(self, sql: str, rows: list[tuple]):
+        self.sql = sql
+        self.rows = rows
+
+
+class WriteCall:
+    """Escritura con lógica propia: `func(cur, *args)` se ejecuta en orden, dentro de la transacción del lote."""
+    __slots__ = ("func", "args")
+
+    def __init__(self, func, args: tuple):
+        self.func = func
+        self.args = args
+
+
+class AuditLogWriter:
+    """
+    Escritor en segundo plano para los logs de auditoría.
+    Los listeners sólo encolan filas en memoria; un hilo dedicado las agrupa y las
+    escribe con `executemany` en una única transacción por lote.
+    Cada `batch_handler(cur, batch)` se ejecuta en esa misma transacción (p. ej. para
+    mantener agregados); si falla, se deshace sólo su parte y los logs se guardan igualmente.
+    Con `submit_write` y `submit_call` se pueden encolar otras escrituras pequeñas, que se
+    aplican en el orden de llegada.
+    No hay backpressure: encolar nunca bloquea y, si no cabe, lo encolado se descarta y se
+    cuenta. Las escrituras de `submit_write` (directorio, cachés) sólo se aceptan mientras la
+    cola tiene menos de `write_queue_limit` elementos; el resto de la cola queda para los logs
+    (y las llamadas de `submit_call`, que mantienen los agregados), que se descartan los últimos.
+    Ningún error de un lote detiene el hilo: si no, todo lo que se encolase después se perdería.
+    Tras confirmar cada lote, se llama a cada `commit_listener(rows)` con los logs guardados
+    (como diccionarios, ya con su id).
+    """
+    _STOP = object()
+
+    def __init__(self, connections, batch_size: int = 200, flush_interval: float = 1.0,
+                 max_queue_size: int = 10000, write_queue_limit: int = 5000, batch_handlers=(),
+                 commit_listeners=()):
+        self.connections = connections
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.batch_handlers = list(batch_handlers)
+        self.commit_listeners = list(commit_listeners)
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.write_queue_limit = min(write_queue_limit, max_queue_size)
+        self.dropped = 0  # logs (y llamadas) descartados
+        self.dropped_writes = 0  # escrituras de submit_write descartadas
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        """Arranca el hilo escritor si no está ya en marcha."""
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="AuditLogWriter", daemon=True)
+            self._thread.start()
+            log.info("Escritor de logs de auditoría iniciado.")
+
+    def submit(self, row: tuple) -> bool:
+        """
+        Encola una fila para su escritura. Nunca bloquea (se llama desde el bucle de eventos):
+        si la cola está llena, descarta la fila y la cuenta en `dropped`.
+        """
+        self.start()
+        try:
+            self.queue.put_nowait(row)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            # Con la cola llena se descartan muchas seguidas: se avisa de la primera y luego cada 1000
+            if self.dropped % 1000 == 1:
+                log.warning(f"Cola de logs de auditoría llena. Registro descartado (total descartados: {self.dropped}).")
+            return False
+
+    def submit_write(self, sql: str, rows: list[tuple]) -> bool:
+        """
+        Encola una escritura `executemany(sql, rows)`. Nunca bloquea; se descarta (y se cuenta en
+        `dropped_writes`) en cuanto la cola llega a `write_queue_limit`, antes de que falte sitio para los logs.
+        """
+        self.start()
+        if self.queue.qsize() < self.write_queue_limit:
+            try:
+                self.queue.put_nowait(WriteStatement(sql, rows))
+                return True
+            except queue.Full:
+                pass
+        self.dropped_writes += 1
+        if self.dropped_writes % 1000 == 1:
+            log.warning(f"Cola del escritor casi llena. Escritura descartada para dejar sitio a los logs "
+                        f"(total descartadas: {self.dropped_writes}).")
+        return False
+
+    def submit_call(self, func, *args) -> bool:
+        """Encola una llamada `func(cur, *args)` con la misma política que `submit`."""
+        return self.submit(WriteCall(func, args))
+
+    def stop(self, timeout: float | None = 10):
+        """Vacía la cola escribiendo todo lo pendiente y detiene el hilo."""
+        with self._lock:
+            thread = self._thread
+            if not thread or not thread.is_alive():
+                return
+            self.queue.put(self._STOP)
+            thread.join(timeout)
+            self._thread = None
+        log.info("Escritor de logs de auditoría detenido y cola vaciada.")
+
+    def _run(self):
+        batch = []
+        deadline = 0.0
+        stopping = False
+        while not stopping:
+            timeout = max(0.0, deadline - time.monotonic()) if batch else None
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                item = None
+
+            if item is self._STOP:
+                stopping = True
+            elif item is not None:
+                if not batch:
+                    deadline = time.monotonic() + self.flush_interval
+                batch.append(item)
+
+            # Se escribe el lote al llenarse, al vencer el plazo o al apagar
+            if batch and (stopping or item is None or len(batch) >= self.batch_size
+                          or time.monotonic() >= deadline):
+                self._safe_flush(batch)
+                batch = []
+
+        # Filas encoladas por otros hilos justo después de la señal de parada
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not self._STOP:
+                batch.append(item)
+        if batch:
+            self._safe_flush(batch)
+
+    def _safe_flush(self, batch: list):
+        try:
+            self._flush(batch)
+        except Exception as e:
+            log.error(f"Error inesperado al escribir un lote de {len(batch)} elementos.", exc_info=e)
+
+    def _flush(self, batch: list):
+        audit_rows, inserted_ids = [], []
+        try:
+            with self.connections.writer() as cur:
+                # Las filas de auditoría consecutivas se insertan juntas; las demás escrituras, en su sitio
+                pending = []
+                for item in batch:
+                    if isinstance(item, (WriteStatement, WriteCall)):
+                        if pending:
+                            inserted_ids.extend(self._insert_logs(cur, pending))
+                            pending = []
+                        if isinstance(item, WriteStatement):
+                            self._run_isolated(cur, "una escritura encolada", cur.executemany, item.sql, item.rows)
+                        else:
+                            self._run_isolated(cur, f"la escritura {item.func.__name__}", item.func, cur, *item.args)
+                    else:
+                        pending.append(item)
+                        audit_rows.append(item)
+                if pending:
+                    inserted_ids.extend(self._insert_logs(cur, pending))
+                for handler in self.batch_handlers if audit_rows else ():
+                    self._run_isolated(cur, f"el manejador de lotes {handler.__name__}", handler, cur, audit_rows)
+        except Exception as e:
+            log.error(f"Error al escribir un lote de {len(batch)} logs de auditoría.", exc_info=e)
+            return
+
+        if audit_rows and self.commit_listeners:
+            saved = [dict(zip(LOG_COLUMNS, (row_id, *row))) for row_id, row in zip(inserted_ids, audit_rows)]
+            for listener in self.commit_listeners:
+                try:
+                    listener(saved)
+                except Exception as e:
+                    log.error(f"Error al notificar logs guardados a {listener.__name__}.", exc_info=e)
+
+    @staticmethod
+    def _insert_logs(cur, rows: list[tuple]) -> range:
+        """Inserta las filas y devuelve sus ids (consecutivos: sólo este hilo escribe en audit_logs)."""
+        cur.executemany(INSERT_LOG_SQL, rows)
+        last_id = cur.execute("SELECT last_insert_rowid()").fetchone()[0]
+        return range(last_id - len(rows) + 1, last_id + 1)
+
+    @staticmethod
+    def _run_isolated(cur, description: str, func, *args):
+        """
+        Ejecuta `func` dentro de un savepoint: si falla (por cualquier excepción, no sólo de
+        SQLite, p. ej. un timestamp mal formado), sólo se deshace su parte del lote.
+        """
+        cur.execute("SAVEPOINT isolated_write")
+        try:
+            func(*args)
+        except Exception as e:
+            cur.execute("ROLLBACK TO isolated_write")
+            log.error(f"Error en {description}.", exc_info=e)
+        cur.execute("RELEASE isolated_write")
@@ -0,0 +1,99 @@
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+
+log = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Gestor de conexiones de larga duración a la base de datos SQLite.
+    Mantiene una única conexión de escritura (protegida por un cerrojo) y un pool de
+    conexiones de lectura reutilizables. Con WAL activado, las lecturas del panel web
+    no bloquean las inserciones de auditoría.
+    """
+
+    def __init__(self, db_file: str, mmap_size: int = 0, statement_cache_size: int = 128,
+                 reader_pool_size: int = 8, busy_timeout_ms: int = 5000):
+        self.db_file = db_file
+        self.mmap_size = mmap_size
+        self.statement_cache_size = statement_cache_size
+        self.reader_pool_size = reader_pool_size
+        self.busy_timeout_ms = busy_timeout_ms
+        self._writer_conn = None
+        self._writer_lock = threading.RLock()
+        self._idle_readers = []
+        self._readers_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        try:
+            conn = sqlite3.connect(
+                self.db_file,
+                check_same_thread=False,
+                cached_statements=self.statement_cache_size,
+            )
+        except sqlite3.Error as e:
+            log.error(f"Error al conectar con la base de datos: {e}")
+            raise
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        # Debe ir antes de activar WAL para aplicarse a una base de datos nueva; en una existente
+        # no cambia nada hasta el próximo VACUUM completo (ver database_manager.compact_database)
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """
+        Cede un cursor sobre la conexión de escritura dentro de una transacción.
+        Hace commit al salir o rollback si hay una excepción.
+        """
+        with self._writer_lock:
+            if self._writer_conn is None:
+                self._writer_conn = self._connect()
+            conn = self._writer_conn
+            cur = conn.cursor()
+            try:
+                yield cur
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+            finally:
+                cur.close()
+
+    @contextmanager
+    def reader(self):
+        """Cede un cursor de una conexión de lectura del pool y la devuelve al terminar."""
+        with self._readers_lock:
+            conn = self._idle_readers.pop() if self._idle_readers else None
+        if conn is None:
+            conn = self._connect()
+        cur = conn.cursor()
+        try:
+            yield cur
+        finally:
+            cur.close()
+            if conn.in_transaction:
+                conn.rollback()
+            with self._readers_lock:
+                if len(self._idle_readers) < self.reader_pool_size:
+                    self._idle_readers.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+
+    def close(self):
+        """Cierra la conexión de escritura y todas las conexiones de lectura inactivas."""
+        with self._writer_lock:
+            if self._writer_conn is not None:
+                self._writer_conn.close()
+                self._writer_conn = None
+        with self._readers_lock:
+            for conn in self._idle_readers:
+                conn.close()
+            self._idle_readers.clear()
@@ -1,35 +1,82 @@
-import sqlite3
+import atexit
+import secrets
+import time
 import logging
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+from database import activity
+from database import audio_cache
+from database import search_cache
+from database.audit_feed import AuditFeed
+from database.audit_writer import AuditLogWriter
+from database.connection_manager import ConnectionManager
+from utils import metrics
 
 log = logging.getLogger(__name__)
 
 DB_FILE = "clownpiece_data.db"
 
-class DatabaseConnection:
-    """Un gestor de contexto para manejar las conexiones a la base de datos de forma segura."""
-    def __init__(self, db_file):
-        self.db_file = db_file
-        self.conn = None
-
-    def __enter__(self):
-        try:
-            self.conn = sqlite3.connect(self.db_file)
-            self.conn.row_factory = sqlite3.Row
-            return self.conn.cursor()
-        except sqlite3.Error as e:
-            log.error(f"Error al conectar con la base de datos: {e}")
-            raise
-
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.conn:
-            self.conn.commit()
-            self.conn.close()
+# Tipos de evento que registran los listeners de auditoría
+EVENT_TYPES = ("MESSAGE_DELETE", "MESSAGE_EDIT", "VOICE_JOIN", "VOICE_LEAVE", "VOICE_MOVE")
+# Tipos de evento cuyo texto se indexa para la búsqueda de texto completo
+SEARCHABLE_EVENT_TYPES = ("MESSAGE_DELETE", "MESSAGE_EDIT")
+
+
+# Conexiones de larga duración (una de escritura y un pool de lectura) en modo WAL
+connections = ConnectionManager(
+    DB_FILE,
+    mmap_size=Config.DB_MMAP_SIZE,
+    statement_cache_size=Config.DB_STATEMENT_CACHE_SIZE,
+    reader_pool_size=Config.DB_READER_POOL_SIZE,
+)
+
+# Difusión de los logs recién guardados al visor en vivo
+audit_feed = AuditFeed(max_pending=Config.LIVE_TAIL_MAX_PENDING)
+
+def _publish_saved_logs(rows: list[dict]):
+    """Completa los nombres desde el directorio (una consulta por lote) y difunde los logs guardados."""
+    if not audit_feed.has_subscribers():
+        return
+    ids = {row['author_id'] for row in rows} | {row['channel_id'] for row in rows}
+    ids.discard(None)
+    names = {}
+    if ids:
+        with connections.reader() as cur:
+            cur.execute(f"SELECT id, name, deleted FROM directory WHERE id IN ({','.join('?' * len(ids))})", list(ids))
+            names = {row['id']: (row['name'], row['deleted']) for row in cur.fetchall()}
+    for row in rows:
+        row['author_name'] = names.get(row['author_id'], (None, 0))[0]
+        row['channel_name'], row['channel_deleted'] = names.get(row['channel_id'], (None, 0))
+    audit_feed.publish(rows)
+
+def _count_saved_logs(rows: list[dict]):
+    metrics.AUDIT_LOGS_WRITTEN.inc(len(rows))
+
+# Escritor por lotes en segundo plano: add_log nunca toca el disco desde el bucle de eventos
+audit_writer = AuditLogWriter(
+    connections,
+    batch_size=Config.AUDIT_BATCH_SIZE,
+    flush_interval=Config.AUDIT_FLUSH_INTERVAL,
+    max_queue_size=Config.AUDIT_QUEUE_MAXSIZE,
+    write_queue_limit=Config.AUDIT_QUEUE_WRITE_LIMIT,
+    batch_handlers=[activity.apply_batch],
+    commit_listeners=[_publish_saved_logs, _count_saved_logs],
+)
+metrics.AUDIT_LOGS_DROPPED.set_collector(lambda: audit_writer.dropped)
+metrics.DB_WRITES_DROPPED.set_collector(lambda: audit_writer.dropped_writes)
+metrics.AUDIT_QUEUE_DEPTH.set_collector(lambda: audit_writer.queue.qsize())
 
 def init_db():
     """Inicializa la base de datos y crea las tablas si no existen."""
     try:
-        with DatabaseConnection(DB_FILE) as cur:
+        with connections.writer() as cur:
+            # auto_vacuum incremental permite a la retención devolver espacio por bloques.
+            # Las bases de datos nuevas ya lo tienen (lo pide cada conexión); en una existente hace
+            # falta un VACUUM completo, que la bloquea: se hace aparte con compact_database().
+            if cur.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+                log.warning("La base de datos no tiene auto_vacuum incremental: la retención no devolverá "
+                            "espacio al disco hasta ejecutar 'compactar' en la terminal (una única vez).")
             cur.execute("""
                 CREATE TABLE IF NOT EXISTS audit_logs (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -41,31 +88,352 @@ def init_db():
                     details TEXT
                 )
             """)
+            # Índices compuestos para la paginación por clave (id) con cada filtro
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_event_type ON audit_logs (event_type, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_author ON audit_logs (author_id, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_channel ON audit_logs (channel_id, id)")
+            cur.execute("CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp ON audit_logs (timestamp)")
+            _init_fts(cur)
+            activity.create_tables(cur)
+            # Directorio persistente de usuarios y canales, alimentado por los eventos del gateway
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS directory (
+                    id INTEGER PRIMARY KEY,
+                    kind TEXT NOT NULL,
+                    guild_id INTEGER,
+                    name TEXT NOT NULL,
+                    deleted INTEGER NOT NULL DEFAULT 0,
+                    updated_at TEXT NOT NULL
+                )
+            """)
+            # Tamaño de cada archivo de la retención antes de añadirle un bloque que aún no se ha borrado
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS audit_archive_journal (
+                    filename TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL
+                )
+            """)
+            search_cache.create_tables(cur)
+            audio_cache.create_tables(cur)
         log.info(f"Base de datos '{DB_FILE}' inicializada correctamente.")
     except Exception as e:
         log.critical("¡¡¡ NO SE PUDO INICIALIZAR LA BASE DE DATOS !!!", exc_info=e)
 
+def compact_database() -> bool:
+    """
+    Mantenimiento puntual: activa auto_vacuum incremental con un VACUUM completo.
+    Bloquea la base de datos mientras dura. Devuelve False si ya estaba activado.
+    """
+    with connections.writer() as cur:
+        if cur.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        cur.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cur.execute("VACUUM")
+    log.info("Base de datos compactada; auto_vacuum incremental activado.")
+    return True
+
+def _init_fts(cur):
+    """
+    Crea el índice FTS5 de contenido externo sobre el texto de los mensajes y los
+    triggers que lo mantienen sincronizado con audit_logs (incluidos los borrados de la retención).
+    """
+    cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'audit_logs_fts'")
+    exists = cur.fetchone() is not None
+    types = ", ".join(f"'{t}'" for t in SEARCHABLE_EVENT_TYPES)
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS audit_logs_fts USING fts5(
+            message, details,
+            content = 'audit_logs', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2'
+        )
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS audit_logs_fts_insert AFTER INSERT ON audit_logs
+        WHEN new.event_type IN ({types}) BEGIN
+            INSERT INTO audit_logs_fts (rowid, message, details) VALUES (new.id, new.message, new.details);
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS audit_logs_fts_delete AFTER DELETE ON audit_logs
+        WHEN old.event_type IN ({types}) BEGIN
+            INSERT INTO audit_logs_fts (audit_logs_fts, rowid, message, details)
+            VALUES ('delete', old.id, old.message, old.details);
+        END
+    """)
+    cur.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS audit_logs_fts_update AFTER UPDATE ON audit_logs
+        WHEN old.event_type IN ({types}) BEGIN
+            INSERT INTO audit_logs_fts (audit_logs_fts, rowid, message, details)
+            VALUES ('delete', old.id, old.message, old.details);
+            INSERT INTO audit_logs_fts (rowid, message, details) VALUES (new.id, new.message, new.details);
+        END
+    """)
+    if not exists:
+        # Indexa los mensajes ya guardados antes de que existiera el índice
+        cur.execute(f"""
+            INSERT INTO audit_logs_fts (rowid, message, details)
+            SELECT id, message, details FROM audit_logs WHERE event_type IN ({types})
+        """)
+
 def add_log(event_type: str, author_id: int = None, channel_id: int = None, message: str = None, details: str = None):
-    """Añade un nuevo registro a la tabla de logs de auditoría."""
+    """
+    Encola un nuevo registro para la tabla de logs de auditoría.
+    La escritura real la hace `audit_writer` en su propio hilo, agrupada por lotes.
+    """
+    timestamp = datetime.now(timezone.utc).isoformat()
+    audit_writer.submit((timestamp, event_type, author_id, channel_id, message, details))
+
+UPSERT_DIRECTORY_SQL = """
+    INSERT INTO directory (id, kind, guild_id, name, deleted, updated_at) VALUES (?, ?, ?, ?, 0, ?)
+    ON CONFLICT (id) DO UPDATE SET
+        kind = excluded.kind,
+        guild_id = COALESCE(excluded.guild_id, guild_id),
+        name = excluded.name,
+        deleted = 0,
+        updated_at = excluded.updated_at
+"""
+
+def update_directory(entries):
+    """
+    Encola la inserción o actualización de entradas del directorio.
+    `entries` es un iterable de tuplas (id, kind, guild_id, name) con kind 'user' o 'channel'.
+    """
+    timestamp = datetime.now(timezone.utc).isoformat()
+    rows = [(entry_id, kind, guild_id, name, timestamp) for entry_id, kind, guild_id, name in entries]
+    if rows:
+        audit_writer.submit_write(UPSERT_DIRECTORY_SQL, rows)
+
+def mark_directory_deleted(entry_id: int):
+    """Marca una entrada del directorio como eliminada, conservando su último nombre conocido."""
+    timestamp = datetime.now(timezone.utc).isoformat()
+    audit_writer.submit_write("UPDATE directory SET deleted = 1, updated_at = ? WHERE id = ?", [(timestamp, entry_id)])
+
+def reconcile_voice_sessions(present: dict[int, int], restarted: bool):
+    """Encola el ajuste de las sesiones de voz abiertas a los estados de voz actuales (ver activity.reconcile_sessions)."""
+    now = datetime.now(timezone.utc).isoformat()
+    audit_writer.submit_call(activity.reconcile_sessions, present, now, restarted)
+
+def shutdown():
+    """Escribe los logs pendientes, detiene el escritor en segundo plano y cierra las conexiones."""
+    audit_writer.stop()
+    connections.close()
+
+# Primer id con timestamp >= ?: una sola búsqueda en el índice de timestamp
+FIRST_ID_FROM_SQL = "SELECT id FROM audit_logs WHERE timestamp >= ? ORDER BY timestamp LIMIT 1"
+MAX_ROWID = 2 ** 63 - 1
+
+def _build_log_filters(event_type: str = None, author_id: int = None, channel_id: int = None,
+                       since: str = None, until: str = None) -> tuple[list[str], list]:
+    """
+    Construye las condiciones WHERE comunes a las consultas de logs.
+    El rango de fechas se traduce a un rango de ids (los ids crecen con el timestamp),
+    de modo que cada filtro se resuelve con un único índice compuesto (columna, id).
+    """
+    conditions, params = [], []
+    if event_type:
+        conditions.append("audit_logs.event_type = ?")
+        params.append(event_type)
+    if author_id is not None:
+        conditions.append("audit_logs.author_id = ?")
+        params.append(author_id)
+    if channel_id is not None:
+        conditions.append("audit_logs.channel_id = ?")
+        params.append(channel_id)
+    if since:
+        conditions.append(f"audit_logs.id >= ({FIRST_ID_FROM_SQL})")
+        params.append(since)
+    if until:
+        conditions.append(f"audit_logs.id < COALESCE(({FIRST_ID_FROM_SQL}), {MAX_ROWID})")
+        params.append(until)
+    return conditions, params
+
+# Los nombres de autor y canal salen del directorio con un único JOIN, sin llamadas a Discord
+DIRECTORY_JOINS = """
+    LEFT JOIN directory AS author_dir ON author_dir.id = audit_logs.author_id
+    LEFT JOIN directory AS channel_dir ON channel_dir.id = audit_logs.channel_id"""
+LOGS_WITH_NAMES = f"audit_logs {DIRECTORY_JOINS}"
+LOG_COLUMNS_WITH_NAMES = (
+    "audit_logs.*, author_dir.name AS author_name, "
+    "channel_dir.name AS channel_name, channel_dir.deleted AS channel_deleted"
+)
+
+def query_logs(event_type: str = None, author_id: int = None, channel_id: int = None,
+               since: str = None, until: str = None, before_id: int = None, after_id: int = None,
+               limit: int = 50) -> list[dict]:
+    """
+    Recupera una página de logs de auditoría, del más reciente al más antiguo.
+    La paginación es por clave: para la siguiente página se pasa como `before_id`
+    el id del último registro recibido, así el coste no depende del tamaño de la tabla.
+    Con `after_id` devuelve en cambio los logs posteriores a ese id, del más antiguo al más reciente.
+    """
+    conditions, params = _build_log_filters(event_type, author_id, channel_id, since, until)
+    if before_id is not None:
+        conditions.append("audit_logs.id < ?")
+        params.append(before_id)
+    if after_id is not None:
+        conditions.append("audit_logs.id > ?")
+        params.append(after_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    order = "ASC" if after_id is not None else "DESC"
     try:
-        with DatabaseConnection(DB_FILE) as cur:
-            timestamp = datetime.now(timezone.utc).isoformat()
+        with connections.reader() as cur:
             cur.execute(
-                "INSERT INTO audit_logs (timestamp, event_type, author_id, channel_id, message, details) VALUES (?, ?, ?, ?, ?, ?)",
-                (timestamp, event_type, author_id, channel_id, message, details)
+                f"SELECT {LOG_COLUMNS_WITH_NAMES} FROM {LOGS_WITH_NAMES} {where} ORDER BY audit_logs.id {order} LIMIT ?",
+                (*params, limit)
             )
+            return [dict(row) for row in cur.fetchall()]
     except Exception as e:
-        log.error("Error al añadir un log a la base de datos.", exc_info=e)
+        log.error("Error al recuperar los logs de la base de datos.", exc_info=e)
+        return []
+
+def _to_fts_query(text: str) -> str:
+    """
+    Convierte el texto escrito por el usuario en una consulta FTS5 segura: cada palabra
+    se busca literalmente (todas deben aparecer) y la última admite prefijos.
+    """
+    terms = ['"' + term.replace('"', '""') + '"' for term in text.split()]
+    if terms:
+        terms[-1] += "*"
+    return " ".join(terms)
 
-def get_all_logs() -> list[dict]:
-    """Recupera todos los registros de la tabla de logs de auditoría."""
+def iter_logs(event_type: str = None, author_id: int = None, channel_id: int = None,
+              since: str = None, until: str = None, after_id: int = None, chunk_size: int = 1000):
+    """
+    Genera los logs que cumplen los filtros en orden ascendente de id, sin cargarlos todos en memoria.
+    Lee por bloques de `chunk_size` con paginación por clave: cada bloque usa una consulta corta,
+    así una exportación larga no mantiene abierta una lectura que impida los checkpoints de WAL.
+    Para reanudar una exportación basta con pasar como `after_id` el último id recibido.
+    """
+    conditions, params = _build_log_filters(event_type, author_id, channel_id, since, until)
+    where = "".join(f" AND {condition}" for condition in conditions)
+    last_id = after_id or 0
+    while True:
+        with connections.reader() as cur:
+            cur.execute(
+                f"SELECT * FROM audit_logs WHERE audit_logs.id > ?{where} ORDER BY audit_logs.id LIMIT ?",
+                (last_id, *params, chunk_size)
+            )
+            rows = cur.fetchall()
+        for row in rows:
+            yield dict(row)
+        if len(rows) < chunk_size:
+            return
+        last_id = rows[-1]['id']
+
+def new_snippet_markers() -> tuple[str, str]:
+    """
+    Marcadores aleatorios (inicio, fin) para delimitar los términos encontrados en los fragmentos
+    de una búsqueda. Son distintos en cada consulta, así que en la práctica ningún mensaje guardado los contiene.
+    Sólo usan caracteres alfanuméricos, que no cambian al escapar el fragmento como HTML.
+    """
+    token = secrets.token_hex(8)
+    return f"SNIPPETSTART{token}", f"SNIPPETEND{token}"
+
+def search_logs(text: str, event_type: str = None, author_id: int = None, channel_id: int = None,
+                since: str = None, until: str = None, limit: int = 50, offset: int = 0,
+                markers: tuple[str, str] = None) -> list[dict]:
+    """
+    Busca en el texto de los mensajes eliminados y editados usando el índice FTS5.
+    Devuelve los resultados ordenados por relevancia (bm25) con fragmentos en
+    `message_snippet` y `details_snippet`, donde los términos encontrados quedan
+    entre los dos `markers` (ver new_snippet_markers).
+    """
+    match = _to_fts_query(text)
+    if not match:
+        return []
+    conditions, params = _build_log_filters(event_type, author_id, channel_id, since, until)
+    where = "".join(f" AND {condition}" for condition in conditions)
+    markers = markers or new_snippet_markers()
     try:
-        with DatabaseConnection(DB_FILE) as cur:
-            cur.execute("SELECT * FROM audit_logs ORDER BY timestamp DESC")
+        with connections.reader() as cur:
+            cur.execute(
+                f"""SELECT {LOG_COLUMNS_WITH_NAMES},
+                           snippet(audit_logs_fts, 0, ?, ?, '…', 16) AS message_snippet,
+                           snippet(audit_logs_fts, 1, ?, ?, '…', 16) AS details_snippet
+                    FROM audit_logs_fts JOIN audit_logs ON audit_logs.id = audit_logs_fts.rowid {DIRECTORY_JOINS}
+                    WHERE audit_logs_fts MATCH ?{where}
+                    ORDER BY bm25(audit_logs_fts) LIMIT ? OFFSET ?""",
+                (*markers, *markers, match, *params, limit, offset)
+            )
             return [dict(row) for row in cur.fetchall()]
     except Exception as e:
-        log.error("Error al recuperar los logs de la base de datos.", exc_info=e)
+        log.error(f"Error al buscar '{text}' en los logs de la base de datos.", exc_info=e)
         return []
 
-# Inicializar la base de datos al cargar el módulo
-init_db()
\ No newline at end of file
+def get_user_activity(user_id: int, days: int = 7) -> dict | None:
+    """Resumen de voz y mensajes de un usuario en los últimos `days` días, leído de los agregados."""
+    now = datetime.now(timezone.utc)
+    since_day = (now - timedelta(days=days - 1)).date().isoformat()
+    try:
+        with connections.reader() as cur:
+            return activity.user_summary(cur, user_id, since_day, now)
+    except Exception as e:
+        log.error(f"Error al recuperar la actividad del usuario {user_id}.", exc_info=e)
+        return None
+
+def get_activity_leaderboard(days: int = 7, limit: int = 10) -> dict:
+    """Usuarios más activos en voz y con más mensajes eliminados/editados en los últimos `days` días."""
+    since_day = (datetime.now(timezone.utc) - timedelta(days=days - 1)).date().isoformat()
+    try:
+        with connections.reader() as cur:
+            return activity.leaderboard(cur, since_day, limit)
+    except Exception as e:
+        log.error("Error al recuperar el ranking de actividad.", exc_info=e)
+        return {'voice': [], 'messages': []}
+
+def _search_cache_fresh_after() -> float:
+    return time.time() - Config.SEARCH_CACHE_DAYS * 86400
+
+def get_cached_search(query: str) -> dict | None:
+    """Vídeo (metadatos y último stream) que devolvió antes la búsqueda normalizada `query`."""
+    try:
+        with connections.reader() as cur:
+            return search_cache.lookup_query(cur, query, _search_cache_fresh_after())
+    except Exception as e:
+        log.error(f"Error al leer la caché de búsquedas para '{query}'.", exc_info=e)
+        return None
+
+def get_cached_video(video_id: str) -> dict | None:
+    """Metadatos y último stream guardados de un vídeo."""
+    try:
+        with connections.reader() as cur:
+            return search_cache.lookup_video(cur, video_id, _search_cache_fresh_after())
+    except Exception as e:
+        log.error(f"Error al leer la caché de búsquedas para el vídeo {video_id}.", exc_info=e)
+        return None
+
+def cache_video(video: dict, query: str = None):
+    """
+    Encola el guardado de los metadatos y el stream de un vídeo y, si se indica,
+    de la búsqueda normalizada que lo devolvió.
+    """
+    now = time.time()
+    audit_writer.submit_write(search_cache.UPSERT_VIDEO_SQL, [(
+        video['id'], video['webpage_url'], video['title'], video['uploader'], video['duration'],
+        video['stream_url'], video['expires_at'], video.get('acodec'), now,
+    )])
+    if query:
+        audit_writer.submit_write(search_cache.UPSERT_SEARCH_SQL, [(query, video['id'], now)])
+
+def prune_search_cache() -> int:
+    """Borra de la caché de búsquedas lo que lleva más de Config.SEARCH_CACHE_DAYS sin actualizarse."""
+    with connections.writer() as cur:
+        return search_cache.prune(cur, _search_cache_fresh_after())
+
+def load_audio_cache_index() -> list[dict]:
+    """Entradas del índice de la caché de audio, de la menos a la más recientemente usada."""
+    with connections.reader() as cur:
+        return audio_cache.load_entries(cur)
+
+def save_audio_cache_entry(video_id: str, filename: str, size: int, sha256: str, codec: str, last_used: float):
+    audit_writer.submit_write(audio_cache.UPSERT_ENTRY_SQL, [(video_id, filename, size, sha256, codec, last_used)])
+
+def touch_audio_cache_entry(video_id: str, last_used: float):
+    audit_writer.submit_write(audio_cache.TOUCH_ENTRY_SQL, [(last_used, video_id)])
+
+def delete_audio_cache_entries(video_ids: list[str]):
+    if video_ids:
+        audit_writer.submit_write(audio_cache.DELETE_ENTRY_SQL, [(video_id,) for video_id in video_ids])
+
+# Al cerrar el proceso se vacía la cola de logs pendientes
+atexit.register(shutdown)
@@ -0,0 +1,164 @@
+import os
+import gzip
+import json
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+
+from config import Config
+from database import database_manager as db
+
+log = logging.getLogger(__name__)
+
+
+def _archive_file(month: str) -> str:
+    return os.path.join(Config.AUDIT_ARCHIVE_PATH, f"audit_logs-{month}.ndjson.gz")
+
+
+def _retention_days(event_type: str) -> int | None:
+    """Días que se conservan los logs de un tipo de evento (None = para siempre)."""
+    return Config.AUDIT_RETENTION_DAYS.get(event_type, Config.AUDIT_RETENTION_DEFAULT_DAYS)
+
+
+def _recover_archives():
+    """
+    Recorta lo que una pasada interrumpida añadió a los archivos sin llegar a borrar las
+    filas de la base de datos: esas filas se vuelven a archivar y no quedan duplicadas.
+    """
+    with db.connections.reader() as cur:
+        cur.execute("SELECT filename, size FROM audit_archive_journal")
+        journal = [(row['filename'], row['size']) for row in cur.fetchall()]
+    if not journal:
+        return
+    for filename, size in journal:
+        path = os.path.join(Config.AUDIT_ARCHIVE_PATH, filename)
+        if os.path.exists(path) and os.path.getsize(path) > size:
+            log.warning(f"Retención: se deshace un bloque sin terminar de {filename}.")
+            with open(path, "r+b") as f:
+                f.truncate(size)
+    with db.connections.writer() as cur:
+        cur.execute("DELETE FROM audit_archive_journal")
+
+
+def _append_to_archives(rows: list[dict]):
+    """Añade las filas a los archivos mensuales comprimidos (un miembro gzip por llamada)."""
+    by_month = {}
+    for row in rows:
+        by_month.setdefault(row['timestamp'][:7], []).append(row)
+    os.makedirs(Config.AUDIT_ARCHIVE_PATH, exist_ok=True)
+    # Antes de escribir se anota el tamaño de cada archivo, para poder deshacer el bloque
+    journal = []
+    for month in by_month:
+        path = _archive_file(month)
+        journal.append((os.path.basename(path), os.path.getsize(path) if os.path.exists(path) else 0))
+    with db.connections.writer() as cur:
+        cur.executemany("INSERT OR REPLACE INTO audit_archive_journal (filename, size) VALUES (?, ?)", journal)
+    for month, month_rows in by_month.items():
+        with gzip.open(_archive_file(month), "at", encoding="utf-8") as f:
+            for row in month_rows:
+                f.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+
+def _archive_event_type(event_type: str, cutoff: str) -> int:
+    """Archiva y borra, por bloques, los logs de un tipo más antiguos que `cutoff`."""
+    chunk_size = Config.AUDIT_RETENTION_CHUNK_SIZE
+    archived = 0
+    _recover_archives()
+    while True:
+        with db.connections.reader() as cur:
+            cur.execute(
+                f"""SELECT * FROM audit_logs
+                    WHERE event_type = ? AND id < COALESCE(({db.FIRST_ID_FROM_SQL}), {db.MAX_ROWID})
+                    ORDER BY id LIMIT ?""",
+                (event_type, cutoff, chunk_size)
+            )
+            rows = [dict(row) for row in cur.fetchall()]
+        if not rows:
+            return archived
+
+        # Primero se escribe el archivo; si el borrado falla, la fila sigue en la base de datos
+        # y la siguiente pasada recorta el bloque antes de volver a archivarla
+        _append_to_archives(rows)
+        ids = [row['id'] for row in rows]
+        with db.connections.writer() as cur:
+            cur.execute(f"DELETE FROM audit_logs WHERE id IN ({','.join('?' * len(ids))})", ids)
+            cur.execute("DELETE FROM audit_archive_journal")
+            # Devuelve al sistema las páginas liberadas sin bloquear la base de datos con un VACUUM completo
+            cur.execute(f"PRAGMA incremental_vacuum({int(Config.AUDIT_VACUUM_PAGES)})").fetchall()
+        archived += len(rows)
+
+
+def run_retention() -> int:
+    """
+    Aplica la política de retención: mueve los logs caducados a archivos NDJSON
+    comprimidos por mes y los borra de la base de datos. Devuelve el número de filas archivadas.
+    Es bloqueante; desde el bucle de eventos debe ejecutarse en un hilo aparte.
+    """
+    now = datetime.now(timezone.utc)
+    total = 0
+    for event_type in dict.fromkeys((*db.EVENT_TYPES, *Config.AUDIT_RETENTION_DAYS)):
+        days = _retention_days(event_type)
+        if days is None:
+            continue
+        cutoff = (now - timedelta(days=days)).isoformat()
+        try:
+            archived = _archive_event_type(event_type, cutoff)
+        except Exception as e:
+            log.error(f"Error al aplicar la retención a los logs de tipo {event_type}.", exc_info=e)
+            continue
+        if archived:
+            log.info(f"🗄️ Archivados {archived} logs de tipo {event_type} anteriores a {cutoff[:10]}.")
+        total += archived
+    try:
+        pruned = db.prune_search_cache()
+        if pruned:
+            log.info(f"🗄️ Borrados {pruned} vídeos antiguos de la caché de búsquedas de música.")
+    except Exception as e:
+        log.error("Error al limpiar la caché de búsquedas de música.", exc_info=e)
+    return total
+
+
+def list_archives() -> list[str]:
+    """Devuelve los meses (AAAA-MM) con archivo disponible, del más reciente al más antiguo."""
+    if not os.path.isdir(Config.AUDIT_ARCHIVE_PATH):
+        return []
+    months = [
+        name[len("audit_logs-"):-len(".ndjson.gz")]
+        for name in os.listdir(Config.AUDIT_ARCHIVE_PATH)
+        if name.startswith("audit_logs-") and name.endswith(".ndjson.gz")
+    ]
+    return sorted(months, reverse=True)
+
+
+def query_archive(month: str, event_type: str = None, author_id: int = None, channel_id: int = None,
+                  since: str = None, until: str = None, before_id: int = None, limit: int = 50) -> list[dict]:
+    """
+    Consulta bajo demanda el archivo de un mes con los mismos filtros que db.query_logs.
+    Recorre el archivo en streaming y conserva sólo los `limit` registros más recientes.
+    """
+    if month not in list_archives():
+        return []
+
+    def matching_rows():
+        with gzip.open(_archive_file(month), "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                if event_type and row['event_type'] != event_type:
+                    continue
+                if author_id is not None and row['author_id'] != author_id:
+                    continue
+                if channel_id is not None and row['channel_id'] != channel_id:
+                    continue
+                if since and row['timestamp'] < since:
+                    continue
+                if until and row['timestamp'] >= until:
+                    continue
+                if before_id is not None and row['id'] >= before_id:
+                    continue
+                yield row
+
+    try:
+        return heapq.nlargest(limit, matching_rows(), key=lambda row: row['id'])
+    except Exception as e:
+        log.error(f"Error al consultar el archivo de logs de {month}.", exc_info=e)
+        return []
@@ -0,0 +1,78 @@
+# Caché de búsquedas de música: qué vídeo devolvió cada búsqueda y los metadatos de cada
+# vídeo (duraderos), junto con su última URL de stream (de vida corta, con su caducidad).
+# Las funciones reciben un cursor; las escrituras se encolan en el escritor por lotes.
+
+VIDEO_COLUMNS = "video_id, webpage_url, title, uploader, duration, stream_url, stream_expires_at, acodec, fetched_at"
+
+UPSERT_VIDEO_SQL = """
+    INSERT INTO music_videos (video_id, webpage_url, title, uploader, duration, stream_url, stream_expires_at,
+                              acodec, fetched_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT (video_id) DO UPDATE SET
+        webpage_url = excluded.webpage_url,
+        title = excluded.title,
+        uploader = excluded.uploader,
+        duration = excluded.duration,
+        stream_url = excluded.stream_url,
+        stream_expires_at = excluded.stream_expires_at,
+        acodec = excluded.acodec,
+        fetched_at = excluded.fetched_at
+"""
+
+UPSERT_SEARCH_SQL = """
+    INSERT INTO music_searches (query, video_id, searched_at) VALUES (?, ?, ?)
+    ON CONFLICT (query) DO UPDATE SET video_id = excluded.video_id, searched_at = excluded.searched_at
+"""
+
+
+def create_tables(cur):
+    """Crea las tablas de la caché de búsquedas si no existen."""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS music_videos (
+            video_id TEXT PRIMARY KEY,
+            webpage_url TEXT NOT NULL,
+            title TEXT NOT NULL,
+            uploader TEXT,
+            duration INTEGER,
+            stream_url TEXT,
+            stream_expires_at REAL,
+            acodec TEXT,
+            fetched_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+    # Columnas añadidas después de crear la tabla
+    columns = {row[1] for row in cur.execute("PRAGMA table_info(music_videos)").fetchall()}
+    if 'acodec' not in columns:
+        cur.execute("ALTER TABLE music_videos ADD COLUMN acodec TEXT")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS music_searches (
+            query TEXT PRIMARY KEY,
+            video_id TEXT NOT NULL,
+            searched_at REAL NOT NULL
+        ) WITHOUT ROWID
+    """)
+
+
+def lookup_query(cur, query: str, fresh_after: float) -> dict | None:
+    """Vídeo que devolvió la búsqueda normalizada `query`, si la búsqueda y sus metadatos no son anteriores a `fresh_after`."""
+    cur.execute(f"""
+        SELECT {', '.join('v.' + c.strip() for c in VIDEO_COLUMNS.split(','))}
+        FROM music_searches s JOIN music_videos v ON v.video_id = s.video_id
+        WHERE s.query = ? AND s.searched_at >= ? AND v.fetched_at >= ?
+    """, (query, fresh_after, fresh_after))
+    row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def lookup_video(cur, video_id: str, fresh_after: float) -> dict | None:
+    cur.execute(f"SELECT {VIDEO_COLUMNS} FROM music_videos WHERE video_id = ? AND fetched_at >= ?",
+                (video_id, fresh_after))
+    row = cur.fetchone()
+    return dict(row) if row else None
+
+
+def prune(cur, cutoff: float) -> int:
+    """Borra las búsquedas y vídeos no actualizados desde `cutoff`. Devuelve los vídeos borrados."""
+    cur.execute("DELETE FROM music_searches WHERE searched_at < ?", (cutoff,))
+    cur.execute("DELETE FROM music_videos WHERE fetched_at < ?", (cutoff,))
+    return cur.rowcount
@@ -6,48 +6,50 @@ import logging
 
 # --- IMPORTACIONES LOCALES ---
 from config import Config
-from web.routes import setup_routes
-from utils.logger_setup import setup_logging
-from database.database_manager import init_db
-
-# --- CONFIGURACIÓN INICIAL ---
-# 1. Configura el sistema de logging para todo el proyecto
-setup_logging()
-# 2. Inicializa la base de datos y crea las tablas si no existen
-init_db()
-# 3. Obtiene un logger para este módulo
+
+# Nada con efectos (logging, base de datos, bot, panel web) se hace al importar este módulo:
+# con el método "spawn" (Windows) cada proceso de extracción de música lo vuelve a importar
+# como __mp_main__, y no debe abrir la base de datos ni montar el panel. Todo se prepara en main().
 log = logging.getLogger(__name__)
 
+
 # --- CONFIGURACIÓN DEL BOT DE DISCORD ---
-# Definimos los "Intents" (permisos) que nuestro bot necesita
-intents = discord.Intents.default()
-intents.guilds = True  # Para información del servidor (canales, etc.)
-intents.message_content = True  # Para leer el contenido de los mensajes
-intents.members = True  # Para eventos de miembros (unirse/salir)
+def create_bot() -> discord.Bot:
+    # Definimos los "Intents" (permisos) que nuestro bot necesita
+    intents = discord.Intents.default()
+    intents.guilds = True  # Para información del servidor (canales, etc.)
+    intents.message_content = True  # Para leer el contenido de los mensajes
+    intents.members = True  # Para eventos de miembros (unirse/salir)
 
-# Creamos la instancia del bot
-bot = discord.Bot(intents=intents)
+    # Creamos la instancia del bot
+    bot = discord.Bot(intents=intents)
 
+    @bot.event
+    async def on_ready():
+        """Se ejecuta cuando el bot se conecta exitosamente a Discord."""
+        log.info(f"✅ {bot.user} se ha conectado a Discord!")
+        log.info(f"🌍 Panel de control web disponible en http://127.0.0.1:{Config.WEB_PORT}")
 
-@bot.event
-async def on_ready():
-    """Se ejecuta cuando el bot se conecta exitosamente a Discord."""
-    log.info(f"✅ {bot.user} se ha conectado a Discord!")
-    log.info(f"🌍 Panel de control web disponible en http://127.0.0.1:5000")
+    return bot
 
 
 # --- CONFIGURACIÓN DEL SERVIDOR WEB FLASK ---
-# Le decimos a Flask dónde encontrar las plantillas y archivos estáticos
-app = Flask(__name__, template_folder='web/templates', static_folder='web/static')
-app.secret_key = Config.FLASK_SECRET_KEY
+def create_app(bot: discord.Bot) -> Flask:
+    from web.routes import setup_routes
 
-# Registramos las rutas definidas en web/routes.py
-web_routes = setup_routes(bot)
-app.register_blueprint(web_routes)
+    # Le decimos a Flask dónde encontrar las plantillas y archivos estáticos
+    app = Flask(__name__, template_folder='web/templates', static_folder='web/static')
+    app.secret_key = Config.FLASK_SECRET_KEY
+    app.config['MAX_CONTENT_LENGTH'] = Config.WEB_MAX_REQUEST_SIZE
+
+    # Registramos las rutas definidas en web/routes.py
+    web_routes = setup_routes(bot)
+    app.register_blueprint(web_routes)
+    return app
 
 
 # --- CARGA DE COGS Y EJECUCIÓN ---
-def load_cogs():
+def load_cogs(bot: discord.Bot):
     """Busca y carga todas las extensiones (Cogs) en la carpeta 'cogs'."""
     log.info("Cargando todos los cogs...")
     for filename in os.listdir('./cogs'):
@@ -60,17 +62,40 @@ def load_cogs():
                 log.error(f"🔥 Error al cargar el cog '{filename[:-3]}'", exc_info=e)
 
 
-if __name__ == "__main__":
+def main():
+    from utils.logger_setup import setup_logging
+    from database.database_manager import init_db
+    from web.async_server import AsyncWebPanel
+
+    # --- CONFIGURACIÓN INICIAL ---
+    # 1. Configura el sistema de logging para todo el proyecto
+    setup_logging()
+    # 2. Inicializa la base de datos y crea las tablas si no existen
+    init_db()
+
+    bot = create_bot()
+    app = create_app(bot)
+
     if not Config.TOKEN:
         log.critical("🚨 ¡ERROR CRÍTICO! El token de Discord no está configurado en el archivo .env")
-    else:
-        # Cargamos las extensiones antes de ejecutar el bot
-        load_cogs()
+        return
+
+    # Cargamos las extensiones antes de ejecutar el bot
+    load_cogs(bot)
 
+    if Config.WEB_SERVER_MODE == "async":
+        # El panel se sirve con aiohttp dentro del bucle del bot: las rutas esperan a Discord directamente
+        web_panel = AsyncWebPanel(bot)
+        bot.loop.create_task(web_panel.start(Config.WEB_HOST, Config.WEB_PORT))
+    else:
         # Iniciamos el servidor Flask en un hilo separado para que no bloquee al bot
-        flask_thread = threading.Thread(target=lambda: app.run(host='0.0.0.0', port=5000, debug=False))
+        flask_thread = threading.Thread(target=lambda: app.run(host=Config.WEB_HOST, port=Config.WEB_PORT, debug=False))
         flask_thread.daemon = True
         flask_thread.start()
 
-        # Iniciamos el bot de Discord
-        bot.run(Config.TOKEN)
\ No newline at end of file
+    # Iniciamos el bot de Discord
+    bot.run(Config.TOKEN)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import asyncio
+import hashlib
+import os
+import time
+import logging
+from collections import OrderedDict
+
+import aiohttp
+import discord
+
+from config import Config
+from database import database_manager as db
+from utils import downloader
+from utils import metrics
+
+log = logging.getLogger(__name__)
+
+# googlevideo limita la velocidad de las descargas de una sola petición; por rangos va a velocidad completa
+DOWNLOAD_CHUNK_SIZE = 10 * 1024 * 1024
+WRITE_CHUNK_SIZE = 64 * 1024
+# Lo recibido se acumula y se escribe en un hilo por tandas de este tamaño, no en el bucle de eventos
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class AudioCache:
+    """
+    Caché en disco del audio de las canciones, por id de vídeo, con un tamaño máximo y
+    expulsión de la menos usada (LRU). Se guarda el stream tal cual lo sirve YouTube
+    (normalmente Opus en WebM, que luego se reproduce sin transcodificar). El índice
+    (archivo, tamaño, SHA-256 y último uso) vive en la base de datos para sobrevivir a los
+    reinicios; se carga una vez, en un hilo (`load`), descartando las entradas sin archivo o
+    con otro tamaño y los archivos que no están en el índice. El hash de cada archivo se
+    comprueba una sola vez, en su primer uso tras la carga (los descargados ya se hashean al escribirlos).
+    Todo el acceso a disco (escrituras, renombrados y borrados) se hace en hilos. Si el índice
+    no se puede cargar, la caché se comporta como vacía y la música se reproduce desde YouTube.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, max_track_bytes: int, max_downloads: int = 2):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_track_bytes = max_track_bytes
+        self.total_bytes = 0
+        self._entries = None  # video_id -> entrada del índice, de la menos a la más recientemente usada
+        self._loading = None  # carga del índice en curso
+        self._verified = set()  # video_id cuyo archivo ya se comprobó con su hash
+        self._downloads = {}  # video_id -> tarea de descarga en curso
+        self._semaphore = asyncio.Semaphore(max_downloads)
+        self._session = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    async def load(self):
+        """Carga el índice en un hilo la primera vez; las llamadas concurrentes esperan a la misma carga."""
+        if self._entries is not None or not self.enabled:
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(asyncio.to_thread(self._load))
+        try:
+            await asyncio.shield(self._loading)
+        except Exception:
+            self._loading = None  # Se reintentará en el próximo uso
+            raise
+
+    async def _ready(self) -> bool:
+        """Carga el índice si hace falta; False si no se pudo (se registra y se sigue sin caché)."""
+        try:
+            await self.load()
+        except Exception as e:
+            log.error("Caché de audio: no se pudo cargar el índice; se sigue sin caché.", exc_info=e)
+        return self._entries is not None
+
+    def _load(self):
+        """Carga el índice y lo contrasta con la carpeta. Es bloqueante (lecturas de disco y de la base de datos)."""
+        os.makedirs(self.directory, exist_ok=True)
+        entries, stale, total_bytes = OrderedDict(), [], 0
+        for entry in db.load_audio_cache_index():
+            path = self.path(entry)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                size = None
+            if size != entry['size']:
+                stale.append(entry['video_id'])
+                self._remove_file(path)
+                continue
+            entries[entry['video_id']] = entry
+            total_bytes += size
+        db.delete_audio_cache_entries(stale)
+        # Archivos fuera del índice: descargas interrumpidas (.part) o entradas ya descartadas
+        known = {entry['filename'] for entry in entries.values()}
+        for name in os.listdir(self.directory):
+            if name not in known:
+                self._remove_file(os.path.join(self.directory, name))
+        self.total_bytes = total_bytes
+        self._entries = entries
+        log.info(f"💽 Caché de audio cargada: {len(entries)} canciones, {self.total_bytes / 1024 ** 2:.0f} MiB.")
+        if stale:
+            log.warning(f"Caché de audio: {len(stale)} entradas descartadas por no coincidir con su archivo.")
+        self._remove_files(self._evict())
+
+    def path(self, entry: dict) -> str:
+        return os.path.join(self.directory, entry['filename'])
+
+    def contains(self, video_id: str) -> bool:
+        """Si un vídeo está en la caché. No bloquea: mientras el índice no está cargado, responde False."""
+        if not self.enabled or not video_id or self._entries is None:
+            return False
+        return video_id in self._entries
+
+    async def get(self, video_id: str) -> dict | None:
+        """Entrada de la caché de un vídeo si está y su archivo está íntegro; cuenta como uso para el LRU."""
+        if not self.enabled or not video_id or not await self._ready():
+            return None
+        if not self.contains(video_id):
+            return None
+        entry = self._entries[video_id]
+        if video_id not in self._verified:
+            if not await asyncio.to_thread(self._verify, entry):
+                log.warning(f"Caché de audio: el archivo de {video_id} está dañado; se descarta.")
+                await self._remove_files_async(self._discard(video_id))
+                return None
+            if video_id not in self._entries:
+                # Expulsado mientras se comprobaba
+                return None
+            self._verified.add(video_id)
+        entry['last_used'] = time.time()
+        self._entries.move_to_end(video_id)
+        db.touch_audio_cache_entry(video_id, entry['last_used'])
+        return entry
+
+    def _verify(self, entry: dict) -> bool:
+        digest = hashlib.sha256()
+        try:
+            with open(self.path(entry), 'rb') as f:
+                while chunk := f.read(1024 * 1024):
+                    digest.update(chunk)
+        except OSError:
+            return False
+        return digest.hexdigest() == entry['sha256']
+
+    def source(self, entry: dict, bitrate: int = 128) -> discord.FFmpegOpusAudio:
+        """Fuente de audio desde el archivo de la caché (copiando los paquetes si es Opus)."""
+        return discord.FFmpegOpusAudio(self.path(entry), codec="opus" if entry['codec'] == "opus" else None,
+                                       bitrate=bitrate, options='-vn')
+
+    def store_in_background(self, video_id: str, stream_url: str, codec: str = None):
+        """Guarda una canción en la caché sin esperar (p. ej. mientras suena por primera vez)."""
+        if not self.enabled or not video_id or not stream_url or self.contains(video_id) \
+                or video_id in self._downloads:
+            return
+        self._start_download(video_id, stream_url, codec)
+
+    async def store(self, video_id: str, stream_url: str, codec: str = None) -> dict | None:
+        """Guarda una canción en la caché (o espera a que termine su descarga en curso) y devuelve su entrada."""
+        if not self.enabled:
+            return None
+        entry = await self.get(video_id)
+        if entry:
+            return entry
+        task = self._downloads.get(video_id) or self._start_download(video_id, stream_url, codec)
+        return await asyncio.shield(task)
+
+    async def fetch(self, url: str) -> dict | None:
+        """Entrada de la caché del vídeo de YouTube de `url`, descargándolo ahora si hace falta."""
+        video_id = downloader.youtube_video_id(url)
+        entry = await self.get(video_id) if video_id else None
+        if entry:
+            return entry
+        info = await asyncio.to_thread(downloader.search_youtube, url)
+        if not info or not info.get('id') or not info.get('stream_url'):
+            return None
+        return await self.store(info['id'], info['stream_url'], info.get('acodec'))
+
+    def _start_download(self, video_id: str, stream_url: str, codec: str) -> asyncio.Task:
+        task = asyncio.get_running_loop().create_task(self._download(video_id, stream_url, codec),
+                                                      name=f"audio-cache-{video_id}")
+        self._downloads[video_id] = task
+        task.add_done_callback(lambda t: self._downloads.pop(video_id, None))
+        return task
+
+    async def _download(self, video_id: str, stream_url: str, codec: str) -> dict | None:
+        async with self._semaphore:
+            if not await self._ready():
+                return None
+            if video_id in self._entries:
+                # Ya estaba en el índice (p. ej. se pidió antes de terminar de cargarlo)
+                return self._entries[video_id]
+            part_path = os.path.join(self.directory, f"{video_id}.part")
+            try:
+                size, sha256 = await self._download_to(stream_url, part_path)
+            except Exception as e:
+                log.warning(f"Caché de audio: no se pudo descargar {video_id}: {e}")
+                await self._remove_files_async([part_path])
+                return None
+            if size is None:
+                log.info(f"Caché de audio: {video_id} supera el tamaño máximo por canción; no se guarda.")
+                await self._remove_files_async([part_path])
+                return None
+
+            entry = {
+                'video_id': video_id,
+                'filename': f"{video_id}.{'webm' if codec == 'opus' else 'audio'}",
+                'size': size,
+                'sha256': sha256,
+                'codec': codec,
+                'last_used': time.time(),
+            }
+            await asyncio.to_thread(os.replace, part_path, self.path(entry))
+            self._entries[video_id] = entry
+            self._verified.add(video_id)  # El hash se calculó al escribirlo
+            self.total_bytes += size
+            db.save_audio_cache_entry(**entry)
+            log.info(f"💽 Guardado en la caché de audio: {video_id} ({size / 1024 ** 2:.1f} MiB).")
+            await self._remove_files_async(self._evict())
+            return self._entries.get(video_id)
+
+    async def _download_to(self, stream_url: str, path: str) -> tuple[int | None, str | None]:
+        """
+        Descarga el stream por rangos a `path`. Devuelve (tamaño, SHA-256), o (None, None) si es demasiado grande.
+        El archivo se abre, se escribe (por tandas de WRITE_BUFFER_SIZE) y se cierra en hilos.
+        """
+        session = self._get_session()
+        digest = hashlib.sha256()
+        size, total = 0, None
+        buffer = bytearray()
+        f = await asyncio.to_thread(open, path, 'wb')
+        try:
+            while total is None or size < total:
+                headers = {'Range': f"bytes={size}-{size + DOWNLOAD_CHUNK_SIZE - 1}"}
+                async with session.get(stream_url, headers=headers) as response:
+                    if response.status not in (200, 206):
+                        raise RuntimeError(f"respuesta HTTP {response.status}")
+                    if response.status == 200:
+                        # El servidor ignoró el rango: el cuerpo es el archivo entero
+                        total = response.content_length
+                    else:
+                        content_range = response.headers.get('Content-Range', '')
+                        total = int(content_range.rsplit('/', 1)[1]) if '/' in content_range \
+                            and not content_range.endswith('*') else None
+                    if total is not None and total > self.max_track_bytes:
+                        return None, None
+                    received = 0
+                    async for chunk in response.content.iter_chunked(WRITE_CHUNK_SIZE):
+                        received += len(chunk)
+                        size += len(chunk)
+                        if size > self.max_track_bytes:
+                            return None, None
+                        digest.update(chunk)
+                        buffer += chunk
+                        if len(buffer) >= WRITE_BUFFER_SIZE:
+                            await asyncio.to_thread(f.write, bytes(buffer))
+                            buffer.clear()
+                    if response.status == 200 or total is None:
+                        break
+                    if not received:
+                        raise RuntimeError("el servidor dejó de enviar datos antes de terminar")
+            if buffer:
+                await asyncio.to_thread(f.write, bytes(buffer))
+        finally:
+            await asyncio.to_thread(f.close)
+        return size, digest.hexdigest()
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(trace_configs=[metrics.http_trace_config()])
+        return self._session
+
+    def _evict(self) -> list[str]:
+        """
+        Expulsa del índice las canciones menos usadas hasta quedar por debajo del tamaño máximo.
+        Devuelve las rutas de sus archivos, que borra quien llama (en un hilo si está en el bucle).
+        """
+        evicted, paths = [], []
+        while self.total_bytes > self.max_bytes and self._entries:
+            video_id, entry = self._entries.popitem(last=False)
+            self.total_bytes -= entry['size']
+            self._verified.discard(video_id)
+            evicted.append(video_id)
+            paths.append(self.path(entry))
+        if evicted:
+            db.delete_audio_cache_entries(evicted)
+            log.info(f"💽 Caché de audio: expulsadas {len(evicted)} canciones por falta de espacio.")
+        return paths
+
+    def _discard(self, video_id: str) -> list[str]:
+        """Quita una canción del índice y devuelve la ruta de su archivo para borrarla, como `_evict`."""
+        entry = self._entries.pop(video_id, None)
+        if not entry:
+            return []
+        self.total_bytes -= entry['size']
+        self._verified.discard(video_id)
+        db.delete_audio_cache_entries([video_id])
+        return [self.path(entry)]
+
+    async def _remove_files_async(self, paths: list[str]):
+        if paths:
+            await asyncio.to_thread(self._remove_files, paths)
+
+    @classmethod
+    def _remove_files(cls, paths: list[str]):
+        for path in paths:
+            cls._remove_file(path)
+
+    @staticmethod
+    def _remove_file(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            # En Windows no se puede borrar un archivo que ffmpeg aún está leyendo
+            log.warning(f"Caché de audio: no se pudo borrar {path}: {e}")
+
+    async def close(self):
+        for task in list(self._downloads.values()):
+            task.cancel()
+        if self._session is not None:
+            await self._session.close()
+
+
+# Instancia compartida por el reproductor de música y el comando `audio` de la terminal
+audio_cache = AudioCache(Config.AUDIO_CACHE_PATH, Config.AUDIO_CACHE_MAX_BYTES,
+                         Config.AUDIO_CACHE_MAX_TRACK_BYTES, Config.AUDIO_CACHE_DOWNLOADS)
@@ -0,0 +1,114 @@
+import asyncio
+import random
+import time
+import logging
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Cubo de fichas: como mucho `rate` operaciones por segundo, con ráfagas de hasta `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def pause(self, seconds: float):
+        """Detiene el cubo para todos (p. ej. tras un 429 global) durante `seconds` segundos."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    async def acquire(self):
+        # El candado mantiene el orden de llegada: quien espera no pierde su turno
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class Broadcaster:
+    """
+    Envía el mismo contenido a muchos canales a la vez sin pasarse de los límites de Discord.
+    El cliente HTTP de py-cord ya serializa cada ruta (un cubo por canal) y reintenta los 429
+    unas cuantas veces; aquí se añade un ritmo global compartido por todas las difusiones,
+    un máximo de envíos simultáneos y reintentos con espera exponencial cuando py-cord se rinde.
+    """
+
+    def __init__(self, rate: float = 10, burst: int = 5, concurrency: int = 5, max_retries: int = 3):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def run(self, job, bot, channel_ids: list[int], content: str = None, embed: discord.Embed = None):
+        """Trabajo de difusión: cada canal añade su resultado al trabajo según termina."""
+        results = await asyncio.gather(*(self._send_to(job, bot, channel_id, content, embed)
+                                         for channel_id in channel_ids))
+        sent = sum(results)
+        log.info(f"Difusión {job.id} terminada: {sent}/{len(channel_ids)} canales.")
+        if sent == len(channel_ids):
+            return f"✅ Difusión enviada a {sent} canales.", "success"
+        return f"⚠️ Difusión enviada a {sent} de {len(channel_ids)} canales.", "error"
+
+    async def _send_to(self, job, bot, channel_id: int, content, embed) -> bool:
+        channel = bot.get_channel(channel_id)
+        result = {
+            'channel_id': str(channel_id),
+            'channel_name': getattr(channel, 'name', None),
+            'guild_name': getattr(getattr(channel, 'guild', None), 'name', None),
+            'attempts': 0,
+        }
+        if not isinstance(channel, discord.abc.Messageable):
+            job.add_result({**result, 'status': 'failed', 'error': "Canal no encontrado."})
+            return False
+
+        async with self._semaphore:
+            for attempt in range(1, self.max_retries + 2):
+                result['attempts'] = attempt
+                await self.bucket.acquire()
+                try:
+                    await channel.send(content=content or None, embed=embed)
+                    job.add_result({**result, 'status': 'sent'})
+                    return True
+                except discord.HTTPException as e:
+                    retryable = e.status == 429 or e.status >= 500
+                    if not retryable or attempt > self.max_retries:
+                        log.warning(f"Difusión {job.id}: fallo definitivo en el canal {channel_id} ({e.status}).")
+                        job.add_result({**result, 'status': 'failed', 'error': f"{e.status}: {e.text or e}"})
+                        return False
+                    delay = self._retry_delay(e, attempt)
+                    log.warning(f"Difusión {job.id}: {e.status} en el canal {channel_id}, reintento en {delay:.1f}s.")
+                    if e.status == 429 and self._is_global(e):
+                        self.bucket.pause(delay)
+                    await asyncio.sleep(delay)
+                except Exception as e:
+                    log.error(f"Difusión {job.id}: error al enviar al canal {channel_id}.", exc_info=e)
+                    job.add_result({**result, 'status': 'failed', 'error': str(e)})
+                    return False
+        return False
+
+    @staticmethod
+    def _retry_delay(error: discord.HTTPException, attempt: int) -> float:
+        """Lo que pida Discord en Retry-After o, si no lo dice, espera exponencial con algo de azar."""
+        retry_after = error.response.headers.get('Retry-After') if error.response is not None else None
+        try:
+            return float(retry_after) + random.uniform(0, 0.5)
+        except (TypeError, ValueError):
+            return min(2 ** attempt, 30) + random.uniform(0, 1)
+
+    @staticmethod
+    def _is_global(error: discord.HTTPException) -> bool:
+        headers = error.response.headers if error.response is not None else {}
+        return headers.get('X-RateLimit-Global') == 'true' or headers.get('X-RateLimit-Scope') == 'global'
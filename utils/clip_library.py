@@ -0,0 +1,133 @@
+import asyncio
+import io
+import os
+import random
+import subprocess
+import logging
+from array import array
+
+import discord
+from discord.oggparse import OggStream
+
+log = logging.getLogger(__name__)
+
+AUDIO_EXTENSIONS = ('.mp3', '.wav', '.ogg')
+
+
+class OpusClip:
+    """Clip ya codificado en Opus: todos sus paquetes seguidos en un único buffer y sus desplazamientos."""
+    __slots__ = ("name", "data", "offsets", "signature")
+
+    def __init__(self, name: str, data: bytes, offsets: array, signature: tuple):
+        self.name = name
+        self.data = data
+        # offsets[i]:offsets[i + 1] es el paquete i (20 ms de audio)
+        self.offsets = offsets
+        # (mtime, tamaño) del archivo del que salió, para saber si ha cambiado
+        self.signature = signature
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def duration(self) -> float:
+        return len(self) * 0.02
+
+
+class MemoryOpusAudio(discord.AudioSource):
+    """Reproduce un OpusClip desde memoria, paquete a paquete, sin procesos ni lecturas de disco."""
+
+    def __init__(self, clip: OpusClip):
+        self.clip = clip
+        self._index = 0
+
+    def read(self) -> bytes:
+        if self._index >= len(self.clip):
+            return b""
+        offsets = self.clip.offsets
+        packet = self.clip.data[offsets[self._index]:offsets[self._index + 1]]
+        self._index += 1
+        return packet
+
+    def is_opus(self) -> bool:
+        return True
+
+
+class ClipLibrary:
+    """
+    Biblioteca de clips de una carpeta, transcodificados a Opus una sola vez y guardados en
+    memoria. `refresh` compara la carpeta con lo cargado y sólo transcodifica los archivos
+    nuevos o modificados; `watch` lo repite periódicamente para seguir los cambios.
+    """
+
+    def __init__(self, directory: str, bitrate: int = 96, extensions=AUDIO_EXTENSIONS):
+        self.directory = directory
+        self.bitrate = bitrate
+        self.extensions = extensions
+        self._clips = {}  # nombre de archivo -> OpusClip
+        self._choices = ()
+        self._failed = {}  # nombre de archivo -> firma con la que falló (no se reintenta hasta que cambie)
+
+    def __len__(self) -> int:
+        return len(self._choices)
+
+    def random_clip(self) -> OpusClip | None:
+        return random.choice(self._choices) if self._choices else None
+
+    def refresh(self) -> bool:
+        """Sincroniza la biblioteca con la carpeta. Es bloqueante (lanza ffmpeg). Devuelve si cambió algo."""
+        try:
+            entries = {entry.name: (entry.stat().st_mtime_ns, entry.stat().st_size)
+                       for entry in os.scandir(self.directory)
+                       if entry.is_file() and entry.name.lower().endswith(self.extensions)}
+        except FileNotFoundError:
+            entries = {}
+
+        clips, changed = {}, False
+        for name, signature in entries.items():
+            clip = self._clips.get(name)
+            if clip is not None and clip.signature == signature:
+                clips[name] = clip
+                continue
+            if self._failed.get(name) == signature:
+                continue
+            changed = True
+            try:
+                clips[name] = self._transcode(name, signature)
+                self._failed.pop(name, None)
+            except Exception as e:
+                log.error(f"No se pudo preparar el clip '{name}'.", exc_info=e)
+                self._failed[name] = signature
+        changed = changed or clips.keys() != self._clips.keys()
+        if changed:
+            # Se sustituye de golpe: quien esté eligiendo un clip ve la biblioteca vieja o la nueva
+            self._clips = clips
+            self._choices = tuple(clips.values())
+            total = sum(len(clip.data) for clip in clips.values())
+            log.info(f"🔊 Biblioteca de clips actualizada: {len(clips)} clips, {total / 1024:.0f} KiB en memoria.")
+        return changed
+
+    def _transcode(self, name: str, signature: tuple) -> OpusClip:
+        path = os.path.join(self.directory, name)
+        result = subprocess.run(
+            ["ffmpeg", "-loglevel", "error", "-i", path, "-map_metadata", "-1", "-vn",
+             "-f", "opus", "-c:a", "libopus", "-ar", "48000", "-ac", "2", "-b:a", f"{self.bitrate}k", "pipe:1"],
+            stdin=subprocess.DEVNULL, capture_output=True, check=True,
+        )
+        data, offsets = bytearray(), array('I', [0])
+        for packet in OggStream(io.BytesIO(result.stdout)).iter_packets():
+            # Las cabeceras del contenedor no son audio
+            if packet.startswith((b"OpusHead", b"OpusTags")):
+                continue
+            data += packet
+            offsets.append(len(data))
+        return OpusClip(name, bytes(data), offsets, signature)
+
+    async def watch(self, interval: float):
+        """Carga la biblioteca y revisa la carpeta cada `interval` segundos."""
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except Exception as e:
+                log.error("Error al revisar la carpeta de clips.", exc_info=e)
+            await asyncio.sleep(interval)
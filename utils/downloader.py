@@ -1,36 +1,98 @@
 import yt_dlp
 import os
+import re
+import time
+from urllib.parse import urlparse, parse_qs
 from config import Config
+from database import database_manager as db
+from utils.extraction_worker import extract_song
 
+YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?(?:.*&)?v=|shorts/)|youtu\.be/)([\w-]{11})')
 
-def search_youtube(query: str) -> dict | None:
+
+def normalize_query(query: str) -> str:
+    """Clave de caché de una búsqueda: sin mayúsculas ni espacios de más (las URLs se dejan tal cual)."""
+    query = query.strip()
+    if query.startswith(('http://', 'https://')):
+        return query
+    return " ".join(query.casefold().split())
+
+
+def youtube_video_id(query: str) -> str | None:
+    """Id del vídeo si `query` es la URL de un vídeo de YouTube."""
+    match = YOUTUBE_ID_RE.search(query)
+    return match.group(1) if match else None
+
+
+def is_playlist_url(query: str) -> bool:
+    """Si `query` es la URL de una lista o un mix de YouTube (lleva el parámetro `list`)."""
+    query = query.strip()
+    if not query.startswith(('http://', 'https://')):
+        return False
+    parsed = urlparse(query)
+    return 'list' in parse_qs(parsed.query) or parsed.path.rstrip('/').endswith('/playlist')
+
+
+def stream_fresh(info: dict) -> bool:
+    """Si la URL de stream de `info` seguirá siendo válida durante toda la canción (más un margen)."""
+    return bool(info.get('stream_url')) and \
+        info.get('expires_at', 0) - (info.get('duration') or 0) - Config.STREAM_URL_MARGIN > time.time()
+
+
+def cached_song(query: str) -> dict | None:
     """
-    Busca un vídeo en YouTube y devuelve su información (título, URL, etc.) sin descargarlo.
+    Resultado guardado de una búsqueda o URL de YouTube, con su último stream (que puede
+    haber caducado: compruébese con stream_fresh). None si no está en la caché.
     """
-    YDL_OPTIONS = {
-        'format': 'bestaudio/best',
-        'noplaylist': True,
-        'default_search': 'ytsearch',
-        'quiet': True,
+    key = normalize_query(query)
+    video_id = youtube_video_id(key)
+    row = db.get_cached_video(video_id) if video_id else db.get_cached_search(key)
+    if not row:
+        return None
+    return {
+        'id': row['video_id'],
+        'webpage_url': row['webpage_url'],
+        'title': row['title'],
+        'stream_url': row['stream_url'],
+        'expires_at': row['stream_expires_at'] or 0,
+        'uploader': row['uploader'],
+        'duration': row['duration'] or 0,
+        'acodec': row['acodec']
     }
-    try:
-        with yt_dlp.YoutubeDL(YDL_OPTIONS) as ydl:
-            info = ydl.extract_info(query, download=False)
-            # Si es una búsqueda, toma el primer resultado
-            if 'entries' in info:
-                video = info['entries'][0]
-            else:
-                video = info
-
-            return {
-                'title': video.get('title', 'Título desconocido'),
-                'stream_url': video.get('url'),
-                'uploader': video.get('uploader', 'Artista desconocido'),
-                'duration': video.get('duration', 0)
-            }
-    except Exception as e:
-        print(f"Error buscando en YouTube: {e}")
+
+
+def remember_song(query: str, info: dict):
+    """Guarda en la caché el resultado de extraer `query` (y la búsqueda, si no era la URL de un vídeo)."""
+    if not info.get('id') or not info.get('webpage_url'):
+        return
+    key = normalize_query(query)
+    db.cache_video(info, None if youtube_video_id(key) else key)
+
+
+def extraction_target(query: str, cached: dict | None) -> str | None:
+    """
+    Qué hay que extraer para `query`: nada si la caché tiene un stream válido, la URL del
+    vídeo si sólo ha caducado el stream (sin búsqueda de por medio) o la búsqueda completa.
+    """
+    if cached and stream_fresh(cached):
         return None
+    return cached['webpage_url'] if cached else query
+
+
+def search_youtube(query: str) -> dict | None:
+    """
+    Busca un vídeo en YouTube y devuelve su información (título, URL, etc.) sin descargarlo.
+    Las búsquedas repetidas salen de la caché: si la URL de stream guardada sigue valiendo
+    no se consulta YouTube, y si ha caducado sólo se vuelve a extraer el vídeo, sin buscar.
+    """
+    cached = cached_song(query)
+    target = extraction_target(query, cached)
+    if target is None:
+        return cached
+    info = extract_song(target)
+    if info:
+        remember_song(query, info)
+    return info
 
 
 def download_video(url: str) -> str | None:
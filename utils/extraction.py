@@ -0,0 +1,169 @@
+import asyncio
+import multiprocessing
+import logging
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from utils import downloader
+from utils import extraction_worker
+
+log = logging.getLogger(__name__)
+
+
+class ExtractionCancelled(Exception):
+    """La extracción se canceló (p. ej. con /stop) antes de terminar."""
+
+
+class _Request:
+    __slots__ = ("guild_id", "func", "args", "future")
+
+    def __init__(self, guild_id: int, func, args: tuple, future: asyncio.Future):
+        self.guild_id = guild_id
+        self.func = func
+        self.args = args
+        self.future = future
+
+
+class ExtractionService:
+    """
+    Ejecuta las extracciones de yt-dlp en un pequeño pool de procesos, cada uno con su
+    YoutubeDL ya preparado, para que el trabajo de CPU no compita por el GIL con el bucle
+    del bot. Las peticiones esperan en una cola por servidor y se reparten por turnos entre
+    servidores, con como mucho `per_guild` en curso por servidor. Una petición que supera
+    `timeout` segundos (esperando o en curso) o que se cancela deja de esperarse; si ya
+    estaba en un proceso, éste termina su extracción y el resultado se descarta.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, workers: int = 2, per_guild: int = 2, timeout: float = 30):
+        self.loop = loop
+        self.workers = workers
+        self.per_guild = per_guild
+        self.timeout = timeout
+        self._executor = None
+        self._pending = OrderedDict()  # guild_id -> deque de peticiones, en orden de turno
+        self._running = {}  # guild_id -> peticiones de ese servidor que están en los procesos
+        self._running_total = 0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # El pool se crea al primer uso; los procesos arrancan según se necesitan
+        if self._executor is None:
+            if "forkserver" in multiprocessing.get_all_start_methods():
+                # Los procesos nacen de un servidor que ya tiene yt-dlp importado, sin cargar el bot
+                context = multiprocessing.get_context("forkserver")
+                context.set_forkserver_preload([extraction_worker.__name__])
+            else:
+                context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=context,
+                                                 initializer=extraction_worker.init_worker)
+        return self._executor
+
+    async def search(self, guild_id: int, query: str) -> dict | None:
+        """
+        Como downloader.search_youtube, pero sin bloquear el bucle: la caché se consulta
+        en un hilo y sólo lo que no está (o ha caducado) se extrae en los procesos.
+        """
+        cached = await asyncio.to_thread(downloader.cached_song, query)
+        target = downloader.extraction_target(query, cached)
+        if target is None:
+            return cached
+        info = await self.run(guild_id, extraction_worker.extract_song, target)
+        if info:
+            await asyncio.to_thread(downloader.remember_song, query, info)
+        return info
+
+    async def playlist_pages(self, guild_id: int, url: str, first_batch: int, batch: int, max_tracks: int):
+        """
+        Generador asíncrono de las páginas de una lista o mix, extraídas en plano según se piden:
+        una primera pequeña (para empezar a sonar cuanto antes) y las demás de `batch` entradas.
+        Cada página es {'title', 'entries'}; si una falla, el generador termina.
+        """
+        start, size = 1, first_batch
+        while start <= max_tracks:
+            end = min(start + size - 1, max_tracks)
+            page = await self.run(guild_id, extraction_worker.extract_playlist_page, url, start, end)
+            if not page or not page['size']:
+                return
+            yield page
+            if page['size'] < end - start + 1:
+                return
+            start, size = end + 1, batch
+
+    async def run(self, guild_id: int, func, *args):
+        """Ejecuta `func(*args)` (una función de extraction_worker) en un proceso, respetando el turno del servidor."""
+        request = _Request(guild_id, func, args, self.loop.create_future())
+        self._pending.setdefault(guild_id, deque()).append(request)
+        self._dispatch()
+        try:
+            return await asyncio.wait_for(request.future, self.timeout)
+        except asyncio.TimeoutError:
+            log.warning(f"[{guild_id}] La extracción de '{args[0]}' superó los {self.timeout}s.")
+            raise
+
+    def cancel_guild(self, guild_id: int):
+        """Cancela las extracciones pendientes y en curso de un servidor (p. ej. tras /stop)."""
+        requests = list(self._pending.pop(guild_id, ()))
+        for request in requests:
+            if not request.future.done():
+                request.future.set_exception(ExtractionCancelled())
+        # Las que ya están en un proceso no se pueden interrumpir, pero nadie esperará su resultado
+        for request in self._running.get(guild_id, ()):
+            if not request.future.done():
+                request.future.set_exception(ExtractionCancelled())
+
+    def shutdown(self):
+        for guild_id in list(self._pending):
+            self.cancel_guild(guild_id)
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+    def _next_request(self) -> _Request | None:
+        """Siguiente petición por turnos: el primer servidor con hueco pasa al final de la cola de turnos."""
+        for guild_id in list(self._pending):
+            if len(self._running.get(guild_id, ())) >= self.per_guild:
+                continue
+            requests = self._pending[guild_id]
+            request = requests.popleft()
+            if requests:
+                self._pending.move_to_end(guild_id)
+            else:
+                del self._pending[guild_id]
+            return request
+        return None
+
+    def _dispatch(self):
+        while self._running_total < self.workers:
+            request = self._next_request()
+            if request is None:
+                return
+            if request.future.done():
+                # Se canceló o caducó mientras esperaba turno
+                continue
+            try:
+                future = self.loop.run_in_executor(self._get_executor(), request.func, *request.args)
+            except BrokenProcessPool:
+                # Un proceso murió (p. ej. por falta de memoria): se sustituye el pool entero
+                log.warning("El pool de extracción estaba roto; se crea uno nuevo.")
+                self._executor = None
+                future = self.loop.run_in_executor(self._get_executor(), request.func, *request.args)
+            self._running.setdefault(request.guild_id, set()).add(request)
+            self._running_total += 1
+            future.add_done_callback(lambda f, r=request: self._finished(r, f))
+
+    def _finished(self, request: _Request, future: asyncio.Future):
+        self._running_total -= 1
+        running = self._running[request.guild_id]
+        running.discard(request)
+        if not running:
+            del self._running[request.guild_id]
+        if not future.cancelled() and isinstance(future.exception(), BrokenProcessPool):
+            self._executor = None
+        if not request.future.done():
+            if future.cancelled():
+                request.future.set_exception(ExtractionCancelled())
+            elif future.exception() is not None:
+                request.future.set_exception(future.exception())
+            else:
+                request.future.set_result(future.result())
+        self._dispatch()
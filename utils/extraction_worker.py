@@ -0,0 +1,119 @@
+import time
+from urllib.parse import urlparse, parse_qs
+
+import yt_dlp
+
+from config import Config
+
+# Este módulo se carga también en los procesos de extracción: no debe importar la base de datos ni el bot.
+
+YDL_AUDIO_OPTIONS = {
+    # Se prefiere Opus: es lo que envía Discord, así que ffmpeg sólo tiene que copiar los paquetes
+    'format': 'bestaudio[acodec=opus]/bestaudio/best',
+    'noplaylist': True,
+    'default_search': 'ytsearch',
+    'quiet': True,
+    'socket_timeout': 15,
+}
+
+# Listas y mixes: sólo los datos básicos de cada entrada, sin resolver sus streams
+YDL_PLAYLIST_OPTIONS = {
+    'extract_flat': 'in_playlist',
+    'noplaylist': False,
+    'quiet': True,
+    'socket_timeout': 15,
+}
+
+# Instancia de YoutubeDL del proceso de extracción, creada al arrancarlo (init_worker)
+_ydl = None
+
+
+def init_worker():
+    """
+    Inicializador de cada proceso de extracción: crea una instancia de YoutubeDL que se
+    reutiliza en todas sus extracciones, con los extractores ya cargados.
+    """
+    global _ydl
+    _ydl = yt_dlp.YoutubeDL(YDL_AUDIO_OPTIONS)
+
+
+def stream_expiry(stream_url: str) -> float:
+    """
+    Momento (epoch) en que caduca una URL de stream. Las de googlevideo lo llevan en el
+    parámetro `expire`; para el resto se supone Config.STREAM_URL_TTL desde ahora.
+    """
+    try:
+        return float(parse_qs(urlparse(stream_url).query)['expire'][0])
+    except (KeyError, IndexError, ValueError):
+        return time.time() + Config.STREAM_URL_TTL
+
+
+def song_info(video: dict) -> dict:
+    stream_url = video.get('url')
+    acodec = video.get('acodec')
+    return {
+        'id': video.get('id'),
+        'webpage_url': video.get('webpage_url') or video.get('original_url'),
+        'title': video.get('title', 'Título desconocido'),
+        'stream_url': stream_url,
+        'expires_at': stream_expiry(stream_url) if stream_url else 0,
+        'uploader': video.get('uploader', 'Artista desconocido'),
+        'duration': video.get('duration', 0),
+        # Códec de audio del formato elegido; None si yt-dlp no lo sabe (habrá que sondearlo)
+        'acodec': acodec if acodec and acodec != 'none' else None
+    }
+
+
+def extract_song(query: str) -> dict | None:
+    """
+    Extrae de YouTube la información de una búsqueda o URL (el primer resultado), sin caché.
+    En un proceso de extracción usa su instancia ya preparada; fuera de ellos, crea una.
+    """
+    try:
+        if _ydl is not None:
+            info = _ydl.extract_info(query, download=False)
+        else:
+            with yt_dlp.YoutubeDL(YDL_AUDIO_OPTIONS) as ydl:
+                info = ydl.extract_info(query, download=False)
+        # Si es una búsqueda, toma el primer resultado
+        if 'entries' in info:
+            entries = list(info['entries'])
+            if not entries:
+                return None
+            video = entries[0]
+        else:
+            video = info
+        return song_info(video)
+    except Exception as e:
+        print(f"Error buscando en YouTube: {e}")
+        return None
+
+
+def extract_playlist_page(url: str, start: int, end: int) -> dict | None:
+    """
+    Extrae en plano las entradas `start`..`end` (desde 1) de una lista o mix de YouTube.
+    Devuelve el título de la lista, sus entradas con la forma de song_info (sin stream)
+    y cuántas entradas trajo la página (incluidas las descartadas por no ser vídeos).
+    """
+    try:
+        with yt_dlp.YoutubeDL({**YDL_PLAYLIST_OPTIONS, 'playlist_items': f'{start}-{end}'}) as ydl:
+            info = ydl.extract_info(url, download=False)
+        raw_entries = list(info.get('entries') or ())
+        entries = []
+        for entry in raw_entries:
+            if not entry or not entry.get('id'):
+                continue
+            entries.append({
+                'id': entry['id'],
+                'webpage_url': entry.get('url') or f"https://www.youtube.com/watch?v={entry['id']}",
+                'title': entry.get('title') or 'Título desconocido',
+                'stream_url': None,
+                'expires_at': 0,
+                'uploader': entry.get('uploader') or entry.get('channel') or 'Artista desconocido',
+                'duration': entry.get('duration') or 0,
+                'acodec': None
+            })
+        return {'title': info.get('title') or 'Lista de reproducción', 'entries': entries, 'size': len(raw_entries)}
+    except Exception as e:
+        print(f"Error extrayendo la lista {url}: {e}")
+        return None
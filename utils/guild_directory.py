@@ -0,0 +1,175 @@
+import json
+import threading
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+CHANNEL_KINDS = ("text", "voice")
+
+
+class GuildEntry:
+    """Instantánea inmutable de un servidor: sus canales de texto y de voz ya ordenados."""
+    __slots__ = ("id", "name", "channels", "version", "_json")
+
+    def __init__(self, guild_id: int, name: str, channels: dict, version: int):
+        self.id = guild_id
+        self.name = name
+        # kind -> lista ordenada de tuplas (id, nombre, nombre en minúsculas para la búsqueda)
+        self.channels = channels
+        self.version = version
+        self._json = None
+
+    def summary(self) -> dict:
+        return {
+            'id': str(self.id),
+            'name': self.name,
+            **{f'{kind}_count': len(self.channels[kind]) for kind in CHANNEL_KINDS},
+        }
+
+    def to_json(self) -> str:
+        """JSON de la entrada completa, serializado una sola vez por versión."""
+        if self._json is None:
+            self._json = json.dumps({
+                **self.summary(),
+                **{kind: [{'id': str(cid), 'name': name} for cid, name, _ in channels]
+                   for kind, channels in self.channels.items()},
+            }, ensure_ascii=False)
+        return self._json
+
+
+class GuildDirectory:
+    """
+    Directorio en memoria de servidores y canales para los selectores del panel web.
+    Se reconstruye por servidor cuando llegan eventos del gateway (el bucle del bot es el
+    único que escribe) y las peticiones web sólo leen instantáneas ya ordenadas: cada
+    cambio sustituye la entrada del servidor afectado y sube la versión, que sirve de ETag.
+    """
+
+    def __init__(self):
+        self._guilds = {}
+        self._channel_guild = {}
+        self._version = 0
+        self._ordered = None
+        self._summaries_json = None
+        self._lock = threading.Lock()
+        # Distingue las versiones de distintos arranques del bot en las cachés del navegador
+        self._epoch = format(int(time.time()), "x")
+
+    # --- Escritura (desde los eventos del bot) ---
+    def rebuild(self, guilds):
+        # Se construye aparte y se sustituye de golpe, para no servir nunca un directorio a medias
+        new_guilds, new_channel_guild = {}, {}
+        with self._lock:
+            for guild in guilds:
+                self._store(guild, new_guilds, new_channel_guild)
+            self._guilds, self._channel_guild = new_guilds, new_channel_guild
+            self._bump()
+        log.info(f"📂 Directorio de canales del panel reconstruido con {len(self._guilds)} servidores.")
+
+    def update_guild(self, guild):
+        with self._lock:
+            self._drop(guild.id)
+            self._store(guild, self._guilds, self._channel_guild)
+
+    def remove_guild(self, guild_id: int):
+        with self._lock:
+            self._drop(guild_id)
+            self._bump()
+
+    def _store(self, guild, guilds: dict, channel_guild: dict):
+        version = self._bump()
+        channels = {
+            'text': self._sorted_channels(guild.text_channels),
+            'voice': self._sorted_channels(guild.voice_channels),
+        }
+        guilds[guild.id] = GuildEntry(guild.id, guild.name, channels, version)
+        for kind_channels in channels.values():
+            for channel_id, _, _ in kind_channels:
+                channel_guild[channel_id] = guild.id
+
+    def _drop(self, guild_id: int):
+        entry = self._guilds.pop(guild_id, None)
+        if entry:
+            for kind_channels in entry.channels.values():
+                for channel_id, _, _ in kind_channels:
+                    self._channel_guild.pop(channel_id, None)
+
+    def _bump(self) -> int:
+        self._version += 1
+        self._ordered = None
+        self._summaries_json = None
+        return self._version
+
+    @staticmethod
+    def _sorted_channels(channels) -> list[tuple]:
+        return sorted(((c.id, c.name, c.name.casefold()) for c in channels), key=lambda c: (c[1], c[0]))
+
+    # --- Lectura (desde las peticiones web) ---
+    @property
+    def etag(self) -> str:
+        return f'"{self._epoch}-{self._version}"'
+
+    def _guild_etag(self, entry: GuildEntry) -> str:
+        return f'"{self._epoch}-g{entry.version}"'
+
+    def is_empty(self) -> bool:
+        return not self._guilds
+
+    def _ordered_entries(self) -> list[GuildEntry]:
+        with self._lock:
+            return self._ordered_entries_locked()
+
+    def _ordered_entries_locked(self) -> list[GuildEntry]:
+        if self._ordered is None:
+            self._ordered = sorted(self._guilds.values(), key=lambda g: (g.name.casefold(), g.id))
+        return self._ordered
+
+    def guild_summaries(self) -> list[dict]:
+        return [entry.summary() for entry in self._ordered_entries()]
+
+    def guild_summaries_json(self) -> tuple[str, str]:
+        """
+        (JSON de la lista de servidores, su ETag). Se construye y se guarda bajo el cerrojo, así
+        que el cuerpo siempre corresponde a la versión de su ETag, aunque haya cambios a la vez.
+        """
+        with self._lock:
+            if self._summaries_json is None:
+                summaries = [entry.summary() for entry in self._ordered_entries_locked()]
+                self._summaries_json = json.dumps({'guilds': summaries}, ensure_ascii=False)
+            return self._summaries_json, self.etag
+
+    def guild_json(self, guild_id: int):
+        """(JSON de un servidor, su ETag), de la misma instantánea; (None, None) si no existe."""
+        entry = self._guilds.get(guild_id)
+        return (entry.to_json(), self._guild_etag(entry)) if entry else (None, None)
+
+    def guild_of(self, channel_id: int):
+        return self._channel_guild.get(channel_id)
+
+    def find_channel(self, name: str, kind: str):
+        """Primer canal (por orden de servidor) con ese nombre exacto, como (id servidor, id canal)."""
+        for entry in self._ordered_entries():
+            for channel_id, channel_name, _ in entry.channels[kind]:
+                if channel_name == name:
+                    return entry.id, channel_id
+        return None
+
+    def search(self, text: str, kind: str, limit: int = 50) -> list[dict]:
+        """Canales cuyo nombre contiene `text` (sin distinguir mayúsculas), agrupables por servidor."""
+        needle = text.casefold()
+        results = []
+        if not needle:
+            return results
+        for entry in self._ordered_entries():
+            for channel_id, name, folded in entry.channels[kind]:
+                if needle in folded:
+                    results.append({'id': str(channel_id), 'name': name,
+                                    'guild_id': str(entry.id), 'guild_name': entry.name})
+                    if len(results) >= limit:
+                        return results
+        return results
+
+
+# Instancia compartida entre el cog que la mantiene y los servidores web que la leen
+guild_directory = GuildDirectory()
@@ -0,0 +1,187 @@
+import asyncio
+import contextlib
+import functools
+import threading
+import time
+import uuid
+import logging
+from collections import OrderedDict
+
+log = logging.getLogger(__name__)
+
+
+class JobQueueFull(Exception):
+    """Hay demasiados trabajos pendientes; la petición debe reintentarse más tarde."""
+
+
+class ByteBudget:
+    """
+    Limita los bytes en vuelo (p. ej. de archivos subiéndose a Discord) en lugar del número
+    de tareas. Una reserva mayor que el total se admite cuando no queda nada más en vuelo.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.in_flight = 0
+        self._condition = asyncio.Condition()
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, size: int):
+        size = min(size, self.max_bytes)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight + size <= self.max_bytes)
+            self.in_flight += size
+        try:
+            yield
+        finally:
+            async with self._condition:
+                self.in_flight -= size
+                self._condition.notify_all()
+
+
+class Job:
+    """
+    Acción encolada desde el panel (envío, voz...) y su resultado, consultable por id.
+    Los trabajos con varias partes (p. ej. una difusión) van añadiendo a `results` el
+    resultado de cada una conforme terminan.
+    """
+    __slots__ = ("id", "kind", "description", "status", "message", "category", "results",
+                 "created_at", "started_at", "finished_at", "_changed", "_changed_async")
+
+    def __init__(self, job_id: str, kind: str, description: str):
+        self.id = job_id
+        self.kind = kind
+        self.description = description
+        self.status = "queued"
+        self.message = None
+        self.category = None
+        self.results = []
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._changed = threading.Condition()
+        self._changed_async = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.finished_at is not None
+
+    def add_result(self, result: dict):
+        """Registra el resultado de una parte del trabajo (desde el bucle del bot)."""
+        self.results.append(result)
+        self._notify()
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+        # Los que esperan en el bucle se quedan con el evento actual; se sustituye por uno nuevo
+        changed, self._changed_async = self._changed_async, asyncio.Event()
+        changed.set()
+
+    def _has_news(self, seen_results) -> bool:
+        return self.finished or (seen_results is not None and len(self.results) > seen_results)
+
+    def wait(self, timeout: float, seen_results: int = None) -> bool:
+        """
+        Espera (bloqueando el hilo) a que termine el trabajo o, si se indica `seen_results`,
+        a que tenga más resultados que esos. Devuelve si hay novedades.
+        """
+        with self._changed:
+            return self._changed.wait_for(lambda: self._has_news(seen_results), timeout)
+
+    async def wait_async(self, timeout: float, seen_results: int = None) -> bool:
+        """Como `wait`, pero sin bloquear el bucle del bot."""
+        deadline = time.monotonic() + timeout
+        while not self._has_news(seen_results):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            try:
+                await asyncio.wait_for(self._changed_async.wait(), remaining)
+            except asyncio.TimeoutError:
+                return False
+        return True
+
+    def to_dict(self, results_from: int = 0) -> dict:
+        return {
+            'id': self.id,
+            'kind': self.kind,
+            'description': self.description,
+            'status': self.status,
+            'message': self.message,
+            'category': self.category,
+            'results_total': len(self.results),
+            'results': self.results[results_from:],
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class JobManager:
+    """
+    Ejecuta en el bucle del bot las acciones lanzadas desde el panel web, sin que la
+    petición HTTP espere a Discord. Como mucho `concurrency` trabajos se ejecutan a la vez
+    y, si hay más de `max_pending` sin terminar, se rechazan los nuevos (JobQueueFull).
+    Los trabajos con `size` (bytes a subir) esperan además a que quepan en `max_upload_bytes`.
+    Se guardan los últimos `history_size` trabajos para consultar su estado.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, concurrency: int = 4, max_pending: int = 50,
+                 history_size: int = 200, max_upload_bytes: int = 64 * 1024 * 1024):
+        self.loop = loop
+        self.max_pending = max_pending
+        self.history_size = history_size
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.upload_budget = ByteBudget(max_upload_bytes)
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, description: str, coro_factory, size: int = 0, pass_job: bool = False) -> Job:
+        """
+        Encola `coro_factory()`, una corrutina que devuelve (mensaje, categoría); con `pass_job`
+        se llama como `coro_factory(job)` para que pueda ir informando de resultados parciales.
+        Se puede llamar desde cualquier hilo; la corrutina se crea ya dentro del bucle del bot.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"Hay {self._pending} trabajos pendientes.")
+            self._pending += 1
+            job = Job(uuid.uuid4().hex[:12], kind, description)
+            self._jobs[job.id] = job
+            while len(self._jobs) > self.history_size:
+                oldest_id, oldest = next(iter(self._jobs.items()))
+                if not oldest.finished:
+                    break
+                del self._jobs[oldest_id]
+        if pass_job:
+            coro_factory = functools.partial(coro_factory, job)
+        self.loop.call_soon_threadsafe(self._start, job, coro_factory, size)
+        log.info(f"Trabajo {job.id} encolado: {description}")
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self._jobs.get(job_id)
+
+    def _start(self, job: Job, coro_factory, size: int):
+        self.loop.create_task(self._run(job, coro_factory, size), name=f"web-job-{job.id}")
+
+    async def _run(self, job: Job, coro_factory, size: int):
+        try:
+            # Primero los bytes y después el hueco: una subida grande en espera no ocupa un hueco
+            async with self.upload_budget.reserve(size), self._semaphore:
+                job.status = "running"
+                job.started_at = time.time()
+                job._notify()
+                job.message, job.category = await coro_factory()
+                job.status = "done" if job.category != "error" else "failed"
+        except Exception as e:
+            log.error(f"Error en el trabajo {job.id} ({job.description}).", exc_info=e)
+            job.status = "failed"
+            job.message, job.category = f"🔥 Error al ejecutar la tarea: {e}", "error"
+        finally:
+            with self._lock:
+                self._pending -= 1
+            job.finished_at = time.time()
+            job._notify()
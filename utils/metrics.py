@@ -0,0 +1,217 @@
+import bisect
+import functools
+import threading
+import time
+import logging
+
+import aiohttp
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _format_labels(labelnames, values, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base de las métricas: nombre, ayuda, etiquetas y un valor por combinación de etiquetas."""
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), collect=None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        # Función opcional que devuelve {valores de etiquetas: valor} en el momento de la lectura
+        self._collect = collect
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set_collector(self, collect):
+        """Hace que la métrica se lea de `collect()` en cada consulta en lugar de guardar valores."""
+        self._collect = collect
+
+    def _key(self, labels) -> tuple:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera las etiquetas {self.labelnames}")
+        return tuple(str(value) for value in labels)
+
+    def _samples(self):
+        if self._collect is not None:
+            try:
+                values = self._collect()
+            except Exception as e:
+                log.error(f"Error al leer la métrica {self.name}.", exc_info=e)
+                return []
+            if not isinstance(values, dict):
+                values = {(): values}
+            return [(self.name, key if isinstance(key, tuple) else (key,), "", value) for key, value in values.items()]
+        with self._lock:
+            return [(self.name, key, "", value) for key, value in self._values.items()]
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for name, key, extra, value in self._samples():
+            lines.append(f"{name}{_format_labels(self.labelnames, key, extra)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def remove(self, *labels):
+        with self._lock:
+            self._values.pop(self._key(labels), None)
+
+
+class Histogram(_Metric):
+    """Histograma acumulativo con cubos fijos, como los de Prometheus."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, *labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Un contador por cubo (sin acumular) más el de +Inf, la suma y el total
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][bisect.bisect_left(self.buckets, value)] += 1
+            state[1] += value
+            state[2] += 1
+
+    def _samples(self):
+        samples = []
+        with self._lock:
+            items = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        for key, counts, total, count in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", key, f'le="{_format_value(bound)}"', cumulative))
+            samples.append((f"{self.name}_sum", key, "", total))
+            samples.append((f"{self.name}_count", key, "", count))
+        return samples
+
+
+class Registry:
+    """Conjunto de métricas que se sirven juntas en el formato de texto de Prometheus."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"La métrica {metric.name} ya está registrada")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, *args, **kwargs) -> Counter:
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs) -> Gauge:
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs) -> Histogram:
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self) -> str:
+        lines = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+registry = Registry()
+
+COMMAND_DURATION = registry.histogram(
+    "discord_command_duration_seconds", "Duración de los comandos de barra.", ("command", "outcome"))
+LISTENER_DURATION = registry.histogram(
+    "discord_listener_duration_seconds", "Duración de los listeners de eventos de los cogs.", ("cog", "event"))
+HTTP_CLIENT_DURATION = registry.histogram(
+    "http_client_request_duration_seconds", "Duración de las peticiones HTTP salientes de los cogs.",
+    ("host", "method", "status"))
+AUDIT_LOGS_WRITTEN = registry.counter(
+    "audit_logs_written_total", "Logs de auditoría guardados en la base de datos.")
+# Estas se leen en el momento de la consulta; quien conoce el dato registra su función con set_collector
+AUDIT_LOGS_DROPPED = registry.counter(
+    "audit_logs_dropped_total", "Logs de auditoría descartados por tener la cola llena.")
+DB_WRITES_DROPPED = registry.counter(
+    "db_writes_dropped_total", "Escrituras de directorio y cachés descartadas para dejar sitio a los logs.")
+AUDIT_QUEUE_DEPTH = registry.gauge(
+    "audit_log_queue_depth", "Logs de auditoría en cola pendientes de escribir.")
+GATEWAY_LATENCY = registry.gauge(
+    "discord_gateway_latency_seconds", "Latencia del heartbeat del gateway de Discord.")
+MUSIC_QUEUE_DEPTH = registry.gauge(
+    "music_queue_depth", "Canciones en cola por servidor.", ("guild",))
+
+
+def timed_listener(func):
+    """
+    Mide la duración de un listener de un cog. Se coloca debajo de @commands.Cog.listener()
+    y conserva el nombre de la función, del que py-cord deduce el evento.
+    """
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return await func(self, *args, **kwargs)
+        finally:
+            LISTENER_DURATION.observe(time.perf_counter() - started, type(self).__name__, func.__name__)
+    return wrapper
+
+
+def http_trace_config() -> aiohttp.TraceConfig:
+    """TraceConfig para las sesiones de aiohttp de los cogs: mide cada petición saliente."""
+    trace_config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        HTTP_CLIENT_DURATION.observe(time.perf_counter() - context.started,
+                                     params.url.host, params.method, params.response.status)
+
+    async def on_request_exception(session, context, params):
+        HTTP_CLIENT_DURATION.observe(time.perf_counter() - context.started,
+                                     params.url.host, params.method, "error")
+
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
@@ -0,0 +1,111 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+
+import discord
+
+log = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """Caché LRU de tamaño fijo cuyas entradas caducan tras `ttl` segundos."""
+    _MISSING = object()
+
+    def __init__(self, max_size: int, ttl: float):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()
+
+    def get(self, key, default=None):
+        entry = self._data.get(key, self._MISSING)
+        if entry is self._MISSING:
+            return default
+        value, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self._data[key] = (value, time.monotonic() + self.ttl)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def __len__(self):
+        return len(self._data)
+
+
+class NameResolver:
+    """
+    Resuelve IDs de usuarios y canales a nombres para las vistas web.
+    Para cada página elimina IDs duplicados, consulta primero la caché propia y las cachés
+    del bot (usuarios y miembros) y sólo pide a la API REST los que faltan, con concurrencia limitada.
+    """
+
+    def __init__(self, bot: discord.Bot, max_size: int = 10000, ttl: float = 3600, concurrency: int = 5):
+        self.bot = bot
+        self.users = TTLCache(max_size, ttl)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self.rest_calls = 0
+
+    def _cached_user_name(self, user_id: int) -> str | None:
+        # Un nombre vacío indica un usuario que Discord ya no encuentra
+        name = self.users.get(user_id)
+        if name is not None:
+            return name
+        user = self.bot.get_user(user_id)
+        if user is None:
+            for guild in self.bot.guilds:
+                user = guild.get_member(user_id)
+                if user is not None:
+                    break
+        if user is not None:
+            self.users.set(user_id, user.name)
+            return user.name
+        return None
+
+    async def _fetch_user_name(self, user_id: int) -> str:
+        async with self._semaphore:
+            self.rest_calls += 1
+            try:
+                user = await self.bot.fetch_user(user_id)
+            except discord.NotFound:
+                name = ""
+            except discord.HTTPException as e:
+                # Error transitorio: no se guarda en caché para reintentar en la próxima petición
+                log.warning(f"No se pudo obtener el usuario {user_id}: {e}")
+                return ""
+            else:
+                name = user.name
+        self.users.set(user_id, name)
+        return name
+
+    async def resolve_users(self, user_ids) -> dict[int, str]:
+        """
+        Devuelve un diccionario {id: nombre} con los IDs que se pudieron resolver
+        (sin repetir peticiones). Los usuarios desconocidos no aparecen en el resultado.
+        """
+        names = {}
+        misses = []
+        for user_id in set(filter(None, user_ids)):
+            name = self._cached_user_name(user_id)
+            if name is None:
+                misses.append(user_id)
+            elif name:
+                names[user_id] = name
+        if misses:
+            fetched = await asyncio.gather(*(self._fetch_user_name(user_id) for user_id in misses))
+            names.update((user_id, name) for user_id, name in zip(misses, fetched) if name)
+        return names
+
+    def resolve_channels(self, channel_ids) -> dict[int, str]:
+        """Devuelve un diccionario {id: nombre} de los canales presentes en la caché del bot."""
+        names = {}
+        for channel_id in set(filter(None, channel_ids)):
+            channel = self.bot.get_channel(channel_id)
+            if channel:
+                names[channel_id] = channel.name
+        return names
@@ -0,0 +1,81 @@
+import asyncio
+import math
+import time
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class TimerWheel:
+    """
+    Rueda de temporizadores (hashed timer wheel) para muchos plazos con clave, p. ej. la
+    inactividad de cada servidor. Programar, reprogramar y cancelar son O(1) y no crean
+    tareas: cada plazo es una entrada en la casilla de su tick. Una sola corrutina (`run`)
+    avanza tick a tick y llama a `callback(key)` al vencer cada plazo; la precisión es de
+    `resolution` segundos. Con la rueda vacía, la corrutina duerme hasta el próximo plazo.
+    """
+
+    def __init__(self, resolution: float = 0.5, slots: int = 512):
+        self.resolution = resolution
+        self._slots = [{} for _ in range(slots)]  # por casilla: key -> (tick de vencimiento, callback)
+        self._where = {}  # key -> casilla en la que está
+        self._origin = time.monotonic()
+        self._processed = self._current_tick()  # último tick ya revisado
+        self._wakeup = asyncio.Event()
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key) -> bool:
+        return key in self._where
+
+    def _current_tick(self) -> int:
+        return int((time.monotonic() - self._origin) / self.resolution)
+
+    def schedule(self, key, delay: float, callback):
+        """Programa (o reprograma) el plazo de `key` para dentro de `delay` segundos."""
+        self.cancel(key)
+        deadline = max(math.ceil((time.monotonic() - self._origin + delay) / self.resolution), self._processed + 1)
+        slot = deadline % len(self._slots)
+        self._slots[slot][key] = (deadline, callback)
+        self._where[key] = slot
+        self._wakeup.set()
+
+    def cancel(self, key) -> bool:
+        slot = self._where.pop(key, None)
+        if slot is None:
+            return False
+        del self._slots[slot][key]
+        return True
+
+    def _advance(self, now_tick: int):
+        # Si se ha retrasado más de una vuelta, basta con revisar cada casilla una vez
+        first = max(self._processed + 1, now_tick - len(self._slots) + 1)
+        for tick in range(first, now_tick + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if not slot:
+                continue
+            # Las entradas con vencimiento posterior son de vueltas siguientes de la rueda
+            expired = [(key, callback) for key, (deadline, callback) in slot.items() if deadline <= now_tick]
+            for key, callback in expired:
+                del slot[key]
+                del self._where[key]
+                try:
+                    callback(key)
+                except Exception as e:
+                    log.error(f"Error en el temporizador de {key}.", exc_info=e)
+        self._processed = now_tick
+
+    async def run(self):
+        """Corrutina que hace avanzar la rueda; debe ejecutarse una sola vez por rueda."""
+        while True:
+            if not self._where:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                # Nada pudo vencer mientras estaba vacía
+                self._processed = max(self._processed, self._current_tick() - 1)
+            next_tick_at = self._origin + (self._processed + 1) * self.resolution
+            delay = next_tick_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._advance(self._current_tick())
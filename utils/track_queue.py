@@ -0,0 +1,206 @@
+import random
+
+
+class _Node:
+    __slots__ = ("track", "priority", "size", "duration", "left", "right")
+
+    def __init__(self, track):
+        self.track = track
+        self.priority = random.random()
+        self.size = 1
+        self.duration = track.duration
+        self.left = None
+        self.right = None
+
+
+def _size(node) -> int:
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1
+    node.duration = node.track.duration
+    if node.left:
+        node.size += node.left.size
+        node.duration += node.left.duration
+    if node.right:
+        node.size += node.right.size
+        node.duration += node.right.duration
+
+
+def _split(node, count: int):
+    """Divide el árbol en (las primeras `count` canciones, el resto)."""
+    if node is None:
+        return None, None
+    if _size(node.left) >= count:
+        left, node.left = _split(node.left, count)
+        _update(node)
+        return left, node
+    node.right, right = _split(node.right, count - _size(node.left) - 1)
+    _update(node)
+    return node, right
+
+
+def _merge(left, right):
+    """Une dos árboles (todas las canciones de `left` van antes que las de `right`)."""
+    if left is None or right is None:
+        return left or right
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+def _build(tracks):
+    """Construye en O(n) un árbol con las canciones en orden (árbol cartesiano por prioridad)."""
+    stack = []
+    for track in tracks:
+        node = _Node(track)
+        last = None
+        while stack and stack[-1].priority < node.priority:
+            last = stack.pop()
+        node.left = last
+        if stack:
+            stack[-1].right = node
+        stack.append(node)
+    if not stack:
+        return None
+    root = stack[0]
+    # Tamaños y duraciones de abajo arriba (recorrido en postorden sin recursión)
+    pending, ordered = [root], []
+    while pending:
+        node = pending.pop()
+        ordered.append(node)
+        if node.left:
+            pending.append(node.left)
+        if node.right:
+            pending.append(node.right)
+    for node in reversed(ordered):
+        _update(node)
+    return root
+
+
+class TrackQueue:
+    """
+    Cola de reproducción indexada (treap implícito): insertar, quitar o mover una canción
+    en cualquier posición, saltar hasta ella y leer una página cuestan O(log n), también
+    con miles de canciones en cola. Guarda además la duración total de la cola.
+    Las posiciones empiezan en 0; los comandos las muestran desde 1.
+    """
+
+    def __init__(self, tracks=()):
+        self._root = _build(tracks)
+
+    def __len__(self) -> int:
+        return _size(self._root)
+
+    def __iter__(self):
+        stack, node = [], self._root
+        while stack or node:
+            while node:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            yield node.track
+            node = node.right
+
+    def __getitem__(self, index: int):
+        index = self._check_index(index)
+        node = self._root
+        while True:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.track
+            else:
+                index -= left_size + 1
+                node = node.right
+
+    @property
+    def total_duration(self) -> int:
+        return self._root.duration if self._root else 0
+
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("posición fuera de la cola")
+        return index
+
+    def append(self, track):
+        self._root = _merge(self._root, _Node(track))
+
+    def extend(self, tracks):
+        self._root = _merge(self._root, _build(tracks))
+
+    def insert(self, index: int, track):
+        left, right = _split(self._root, max(0, index))
+        self._root = _merge(_merge(left, _Node(track)), right)
+
+    def pop(self, index: int = 0):
+        """Quita y devuelve la canción de la posición `index`."""
+        index = self._check_index(index)
+        left, rest = _split(self._root, index)
+        node, right = _split(rest, 1)
+        self._root = _merge(left, right)
+        return node.track
+
+    def popleft(self):
+        return self.pop(0)
+
+    def move(self, source: int, target: int):
+        """Mueve la canción de `source` a la posición `target` (contada tras quitarla)."""
+        track = self.pop(source)
+        self.insert(target, track)
+        return track
+
+    def drop_front(self, count: int) -> list:
+        """Quita y devuelve las primeras `count` canciones (p. ej. para saltar hasta una posición)."""
+        dropped, self._root = _split(self._root, count)
+        return list(TrackQueue._from_root(dropped))
+
+    def slice(self, start: int, stop: int) -> list:
+        """Canciones de las posiciones [start, stop), sin copiar el resto de la cola: O(log n + k)."""
+        start, stop = max(0, start), min(stop, len(self))
+        if start >= stop:
+            return []
+        # Se recorre en orden desde `start`, bajando por el árbol una sola vez
+        stack, node, index = [], self._root, start
+        while node:
+            left_size = _size(node.left)
+            if index < left_size:
+                stack.append(node)
+                node = node.left
+            elif index == left_size:
+                stack.append(node)
+                break
+            else:
+                index -= left_size + 1
+                node = node.right
+        result = []
+        while stack and len(result) < stop - start:
+            node = stack.pop()
+            result.append(node.track)
+            node = node.right
+            while node:
+                stack.append(node)
+                node = node.left
+        return result
+
+    def shuffle(self):
+        tracks = list(self)
+        random.shuffle(tracks)
+        self._root = _build(tracks)
+
+    def clear(self):
+        self._root = None
+
+    @classmethod
+    def _from_root(cls, root) -> "TrackQueue":
+        queue = cls()
+        queue._root = root
+        return queue
@@ -0,0 +1,138 @@
+import asyncio
+import time
+import logging
+
+import discord
+
+log = logging.getLogger(__name__)
+
+FFMPEG_OPTIONS = {'before_options': '-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5',
+                  'options': '-vn'}
+
+
+class Track:
+    """
+    Referencia ligera a una canción de la cola. Lo que caduca (la URL de stream) y lo que
+    puede costar obtener (el códec, si yt-dlp no lo indica) se rellena justo a tiempo.
+    """
+    __slots__ = ("video_id", "url", "title", "uploader", "duration",
+                 "stream_url", "expires_at", "codec")
+
+    def __init__(self, video_id: str, url: str, title: str, uploader: str, duration: int):
+        self.video_id = video_id
+        self.url = url
+        self.title = title
+        self.uploader = uploader
+        self.duration = duration or 0
+        self.stream_url = None
+        self.expires_at = 0.0
+        # Códec de audio del stream: None = desconocido (se sondea), "" = no se pudo saber
+        self.codec = None
+
+    @classmethod
+    def from_info(cls, info: dict) -> "Track":
+        """Crea la referencia a partir del resultado de search_youtube, conservando su stream."""
+        track = cls(info.get('id'), info.get('webpage_url'), info['title'], info['uploader'], info.get('duration'))
+        track.set_stream(info.get('stream_url'), info.get('expires_at', 0), info.get('acodec'))
+        return track
+
+    def set_stream(self, stream_url: str, expires_at: float, codec: str = None):
+        self.stream_url = stream_url
+        self.expires_at = expires_at or 0.0
+        if codec:
+            self.codec = codec
+
+    @property
+    def passthrough(self) -> bool:
+        """Si el stream ya es Opus y basta con copiar sus paquetes, sin decodificar ni codificar."""
+        return self.codec == "opus"
+
+    def stream_fresh(self, margin: float) -> bool:
+        """Si la URL de stream seguirá siendo válida durante toda la canción (más un margen)."""
+        return bool(self.stream_url) and self.expires_at - self.duration - margin > time.time()
+
+
+class StreamResolver:
+    """
+    Prepara las próximas canciones de cada cola mientras suena la actual: renueva las URLs
+    de stream caducadas o a punto de caducar y sondea el códec con ffprobe, de modo que al
+    empezar la canción sólo queda arrancar ffmpeg. El códec lo da yt-dlp casi siempre; sólo si
+    no lo indica se sondea el stream con ffprobe. Cada canción se resuelve una sola vez
+    aunque se pida a la vez desde la precarga y desde el reproductor.
+    `resolve(guild_id, url)` es la corrutina que devuelve la información nueva de un vídeo.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, resolve, lookahead: int = 2, margin: float = 600,
+                 transcode_bitrate: int = 128):
+        self.loop = loop
+        self.resolve = resolve
+        self.lookahead = lookahead
+        self.margin = margin
+        self.transcode_bitrate = transcode_bitrate
+        self._tasks = {}  # Track -> tarea de resolución en curso
+
+    def prefetch(self, guild_id: int, tracks):
+        """Lanza en segundo plano la resolución de las primeras `lookahead` canciones de `tracks`."""
+        for i, track in enumerate(tracks):
+            if i >= self.lookahead:
+                break
+            if track not in self._tasks and not self._ready(track):
+                self._start(guild_id, track)
+
+    async def prepare(self, guild_id: int, track: Track) -> discord.FFmpegOpusAudio:
+        """Devuelve la fuente de audio de la canción, resolviéndola ahora si la precarga no llegó a tiempo."""
+        task = self._tasks.get(track)
+        if task is None and not self._ready(track):
+            task = self._start(guild_id, track)
+        if task is not None:
+            # shield: si se cancela quien espera, la resolución compartida sigue su curso
+            await asyncio.shield(task)
+        if not track.stream_url:
+            raise RuntimeError(f"No se pudo obtener el stream de '{track.title}'")
+        # Con codec="opus", FFmpegOpusAudio usa "-c:a copy": ffmpeg sólo reempaqueta de WebM a Ogg.
+        # Con cualquier otro códec transcodifica a Opus (y entonces sí importa el bitrate).
+        if track.passthrough:
+            log.debug(f"'{track.title}': copia directa de Opus.")
+        else:
+            log.debug(f"'{track.title}': transcodificación a Opus desde '{track.codec or 'desconocido'}'.")
+        return discord.FFmpegOpusAudio(track.stream_url, codec="opus" if track.passthrough else None,
+                                       bitrate=self.transcode_bitrate, **FFMPEG_OPTIONS)
+
+    def discard(self, tracks):
+        """Cancela la resolución pendiente de canciones que ya no se van a reproducir (p. ej. tras /stop)."""
+        for track in tracks:
+            task = self._tasks.pop(track, None)
+            if task is not None:
+                task.cancel()
+
+    def _ready(self, track: Track) -> bool:
+        return track.stream_fresh(self.margin) and track.codec is not None
+
+    def _start(self, guild_id: int, track: Track) -> asyncio.Task:
+        task = self.loop.create_task(self._resolve(guild_id, track), name=f"resolve-{track.video_id}")
+        self._tasks[track] = task
+        task.add_done_callback(lambda t: self._tasks.pop(track, None) if self._tasks.get(track) is t else None)
+        return task
+
+    async def _resolve(self, guild_id: int, track: Track):
+        try:
+            if not track.stream_fresh(self.margin):
+                if not track.url:
+                    return
+                log.info(f"Renovando la URL de stream de '{track.title}'.")
+                info = await self.resolve(guild_id, track.url)
+                if not info or not info.get('stream_url'):
+                    track.set_stream(None, 0)
+                    return
+                track.set_stream(info['stream_url'], info['expires_at'], info.get('acodec'))
+            if track.codec is None:
+                # yt-dlp no indicó el códec: se sondea una vez (el formato no cambia al renovar la URL)
+                codec, _ = await discord.FFmpegOpusAudio.probe(track.stream_url)
+                track.codec = codec or ""
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Sin códec conocido se transcodifica a Opus: más CPU, pero la canción suena igual
+            log.warning(f"No se pudo preparar '{track.title}' por adelantado: {e}")
+            if track.codec is None:
+                track.codec = ""
@@ -0,0 +1,308 @@
+import asyncio
+import base64
+import json
+import logging
+import os
+import re
+from urllib.parse import quote, urlencode
+
+from aiohttp import web
+from jinja2 import Environment, FileSystemLoader, select_autoescape
+
+from config import Config
+from database import database_manager as db
+from utils import metrics
+from web import routes
+
+log = logging.getLogger(__name__)
+
+WEB_DIR = os.path.dirname(os.path.abspath(__file__))
+FLASH_COOKIE = "flash"
+
+# Rutas equivalentes a los endpoints del blueprint de Flask, para que las plantillas sirvan sin cambios
+ENDPOINTS = {
+    'web.index': '/',
+    'web.enviar': '/enviar',
+    'web.control_voz': '/control-voz',
+    'web.view_logs': '/logs',
+    'web.export_logs': '/logs/export',
+    'web.stream_logs': '/logs/stream',
+    'web.api_search_logs': '/api/logs/search',
+    'web.view_stats': '/stats',
+    'web.view_metrics': '/metrics',
+    'web.api_directory': '/api/directory',
+    'web.api_directory_search': '/api/directory/search',
+    'web.difusion': '/difusion',
+    'web.api_job': '/api/jobs/{job_id}',
+}
+
+
+def url_for(endpoint: str, **values) -> str:
+    if endpoint == 'static':
+        return f"/static/{values.pop('filename')}"
+    path = ENDPOINTS[endpoint]
+    for name in re.findall(r"{(\w+)}", path):
+        path = path.replace(f"{{{name}}}", quote(str(values.pop(name)), safe=""))
+    query = {k: v for k, v in values.items() if v is not None}
+    return f"{path}?{urlencode(query)}" if query else path
+
+
+class AsyncWebPanel:
+    """
+    Panel web servido con aiohttp dentro del bucle de eventos del bot.
+    Expone las mismas páginas que el blueprint de Flask, pero cada petición espera
+    directamente las llamadas a Discord en lugar de bloquear un hilo con .result().
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.name_resolver = routes.create_name_resolver(bot)
+        self.jobs = routes.create_job_manager(bot)
+        self.broadcaster = routes.create_broadcaster()
+        self.runner = None
+        self.templates = Environment(
+            loader=FileSystemLoader(os.path.join(WEB_DIR, 'templates')),
+            autoescape=select_autoescape(['html']),
+        )
+        self.templates.globals['url_for'] = url_for
+        self.app = web.Application(client_max_size=Config.WEB_MAX_REQUEST_SIZE)
+        self.app.add_routes([
+            web.get('/', self.index),
+            web.post('/enviar', self.enviar),
+            web.post('/control-voz', self.control_voz),
+            web.post('/difusion', self.difusion),
+            web.get('/api/jobs/{job_id}', self.api_job),
+            web.get('/logs', self.view_logs),
+            web.get('/logs/export', self.export_logs),
+            web.get('/logs/stream', self.stream_logs),
+            web.get('/api/logs/search', self.api_search_logs),
+            web.get('/stats', self.view_stats),
+            web.get('/metrics', self.view_metrics),
+            web.get('/api/directory', self.api_directory),
+            web.get('/api/directory/search', self.api_directory_search),
+            web.get(r'/api/directory/{guild_id:\d+}', self.api_directory),
+            web.static('/static', os.path.join(WEB_DIR, 'static')),
+        ])
+
+    async def start(self, host: str, port: int):
+        self.runner = web.AppRunner(self.app, access_log=None)
+        await self.runner.setup()
+        await web.TCPSite(self.runner, host, port).start()
+        log.info(f"🌍 Panel web asíncrono escuchando en http://{host}:{port}")
+
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+    # --- Mensajes flash (guardados en una cookie hasta la siguiente página renderizada) ---
+    @staticmethod
+    def _flash(response: web.StreamResponse, request: web.Request, message: str, category: str):
+        messages = AsyncWebPanel._read_flashes(request) + [[category, message]]
+        encoded = base64.urlsafe_b64encode(json.dumps(messages).encode("utf-8")).decode("ascii")
+        response.set_cookie(FLASH_COOKIE, encoded, httponly=True, samesite="Lax")
+
+    @staticmethod
+    def _read_flashes(request: web.Request) -> list:
+        raw = request.cookies.get(FLASH_COOKIE)
+        if not raw:
+            return []
+        try:
+            return json.loads(base64.urlsafe_b64decode(raw.encode("ascii")))
+        except ValueError:
+            return []
+
+    def _redirect(self, request: web.Request, location: str, message: str = None, category: str = None):
+        response = web.Response(status=302, headers={'Location': location})
+        if message:
+            self._flash(response, request, message, category)
+        return response
+
+    def render(self, request: web.Request, template: str, **context) -> web.Response:
+        flashes = self._read_flashes(request)
+
+        def get_flashed_messages(with_categories=False):
+            return [tuple(f) for f in flashes] if with_categories else [f[1] for f in flashes]
+
+        html = self.templates.get_template(template).render(get_flashed_messages=get_flashed_messages, **context)
+        response = web.Response(text=html, content_type='text/html')
+        if flashes:
+            response.del_cookie(FLASH_COOKIE)
+        return response
+
+    # --- Páginas ---
+    async def index(self, request: web.Request):
+        return self.render(request, 'index.html', **routes.load_index_context(request.query))
+
+    async def api_directory(self, request: web.Request):
+        guild_id = request.match_info.get('guild_id')
+        body, etag = routes.directory_json(int(guild_id) if guild_id else None)
+        return self._directory_response(request, body, etag)
+
+    async def api_directory_search(self, request: web.Request):
+        body, etag = routes.search_directory_json(request.query)
+        return self._directory_response(request, body, etag)
+
+    @staticmethod
+    def _directory_response(request: web.Request, body, etag):
+        if body is None:
+            return web.json_response({'error': "Servidor no encontrado."}, status=404)
+        headers = {'ETag': etag, 'Cache-Control': routes.DIRECTORY_CACHE_CONTROL}
+        if routes.etag_matches(request.headers.get('If-None-Match'), etag):
+            return web.Response(status=304, headers=headers)
+        return web.Response(text=body, content_type='application/json', headers=headers)
+
+    async def enviar(self, request: web.Request):
+        try:
+            form, upload = await self._read_send_form(request)
+        except web.HTTPRequestEntityTooLarge:
+            return self._job_response(request, None, ("❌ El archivo es demasiado grande.", 413), url_for('web.index'))
+        channel_id = form.get('channel_id')
+        log.info(f"Petición web /enviar recibida. Tipo: {form.get('submit_type', 'simple')}, Canal: {channel_id}")
+        job, error = routes.submit_send_job(self.jobs, self.bot, form, upload)
+        return self._job_response(request, job, error, url_for('web.index', last_text_channel=channel_id))
+
+    @staticmethod
+    async def _read_send_form(request: web.Request):
+        """
+        Lee el formulario de /enviar volcando el archivo por bloques a un SpooledUpload,
+        sin cargarlo entero en memoria. Devuelve (campos, archivo o None).
+        """
+        if request.content_type != 'multipart/form-data':
+            return await request.post(), None
+        form, upload = {}, None
+        reader = await request.multipart()
+        try:
+            while (part := await reader.next()) is not None:
+                if not part.filename:
+                    form[part.name] = await part.text()
+                    continue
+                upload = routes.SpooledUpload(part.filename)
+                while chunk := await part.read_chunk(routes.UPLOAD_CHUNK_SIZE):
+                    upload.write(chunk)
+                    if upload.size > Config.WEB_MAX_REQUEST_SIZE:
+                        raise web.HTTPRequestEntityTooLarge(Config.WEB_MAX_REQUEST_SIZE, upload.size)
+                if not upload.size:
+                    # Campo de archivo vacío (no se eligió ninguno)
+                    upload.close()
+                    upload = None
+        except Exception:
+            if upload:
+                upload.close()
+            raise
+        return form, upload.finish() if upload else None
+
+    async def control_voz(self, request: web.Request):
+        form = await request.post()
+        channel_id = form.get('channel_id')
+        action = form.get('action')
+        log.info(f"Petición web /control-voz recibida. Acción: {action}, Canal: {channel_id}")
+        job, error = routes.submit_voice_job(self.jobs, self.bot, action, channel_id)
+        return self._job_response(request, job, error, url_for('web.index', last_voice_channel=channel_id))
+
+    async def difusion(self, request: web.Request):
+        form = await request.post()
+        channel_ids = form.getall('broadcast_channel_id', [])
+        log.info(f"Petición web /difusion recibida. Canales: {len(channel_ids)}")
+        job, error = routes.submit_broadcast_job(self.jobs, self.broadcaster, self.bot, form, channel_ids)
+        return self._job_response(request, job, error, url_for('web.index'))
+
+    async def api_job(self, request: web.Request):
+        job = self.jobs.get(request.match_info['job_id'])
+        if job is None:
+            return web.json_response({'error': "Trabajo no encontrado."}, status=404)
+        wait, seen = routes.parse_job_poll(request.query)
+        if wait:
+            await job.wait_async(wait, seen)
+        return web.json_response(job.to_dict(results_from=seen or 0))
+
+    def _job_response(self, request: web.Request, job, error, back_url: str):
+        if routes.wants_json(request.headers.get('Accept')):
+            if error:
+                return web.json_response({'error': error[0]}, status=error[1])
+            return web.json_response(routes.job_json(job, url_for('web.api_job', job_id=job.id)), status=202)
+        if error:
+            return self._redirect(request, back_url, error[0], "error")
+        return self._redirect(request, routes.append_query(back_url, job=job.id))
+
+    async def view_logs(self, request: web.Request):
+        log.info("Petición web /logs recibida.")
+        try:
+            # La lectura de SQLite es bloqueante: se hace en un hilo para no frenar el gateway
+            context = await asyncio.to_thread(routes.load_logs_page, request.query)
+            context['logs'] = await routes.process_logs_for_display(self.name_resolver, context['logs'])
+        except Exception as e:
+            log.error("Error al procesar logs para la vista web.", exc_info=e)
+            return self._redirect(request, url_for('web.index'),
+                                  "🔥 No se pudieron cargar los logs de la base de datos.", "error")
+        return self.render(request, 'logs.html', **context)
+
+    async def export_logs(self, request: web.Request):
+        try:
+            chunks, mimetype, filename = routes.open_export(request.query)
+        except ValueError as e:
+            return web.json_response({'error': str(e)}, status=400)
+        response = web.StreamResponse(headers={
+            'Content-Type': mimetype,
+            'Content-Disposition': f'attachment; filename="{filename}"',
+        })
+        await response.prepare(request)
+        try:
+            while True:
+                # Cada bloque se genera en un hilo (lee de SQLite) y se envía desde el bucle
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                await response.write(chunk)
+        finally:
+            chunks.close()
+        await response.write_eof()
+        return response
+
+    async def stream_logs(self, request: web.Request):
+        filters = routes.parse_live_tail_filters(request.query)
+        last_id = routes.parse_last_event_id(request.headers, request.query)
+        subscription = db.audit_feed.subscribe(loop=asyncio.get_running_loop())
+        response = web.StreamResponse(headers={'Content-Type': 'text/event-stream', **routes.SSE_HEADERS})
+        try:
+            await response.prepare(request)
+            await response.write(f"retry: {Config.LIVE_TAIL_KEEPALIVE * 1000}\n\n".encode("utf-8"))
+            if last_id is not None:
+                pages = routes.replay_missed_logs(filters, last_id)
+                # Cada página se lee en un hilo; se sigue hasta ponerse al día
+                while (page := await asyncio.to_thread(next, pages, None)) is not None:
+                    for row in page:
+                        last_id = row['id']
+                        await response.write(routes.sse_log_event(row).encode("utf-8"))
+            while not subscription.overflowed:
+                rows = await subscription.wait(timeout=Config.LIVE_TAIL_KEEPALIVE)
+                if not rows:
+                    await response.write(b": keep-alive\n\n")
+                    continue
+                for row in rows:
+                    if (last_id is None or row['id'] > last_id) and routes.matches_log_filters(row, filters):
+                        last_id = row['id']
+                        await response.write(routes.sse_log_event(row).encode("utf-8"))
+        except ConnectionResetError:
+            pass  # El navegador cerró la pestaña o se desconectó
+        finally:
+            db.audit_feed.unsubscribe(subscription)
+        return response
+
+    async def view_metrics(self, request: web.Request):
+        return web.Response(body=metrics.registry.render().encode("utf-8"),
+                            headers={'Content-Type': metrics.CONTENT_TYPE})
+
+    async def api_search_logs(self, request: web.Request):
+        return web.json_response(await asyncio.to_thread(routes.search_logs_json, request.query))
+
+    async def view_stats(self, request: web.Request):
+        log.info("Petición web /stats recibida.")
+        days = routes.parse_stats_days(request.query)
+        try:
+            leaderboard = await asyncio.to_thread(db.get_activity_leaderboard, days)
+            leaderboard = await routes.process_stats_for_display(self.name_resolver, leaderboard)
+        except Exception as e:
+            log.error("Error al procesar las estadísticas para la vista web.", exc_info=e)
+            return self._redirect(request, url_for('web.index'), "🔥 No se pudieron cargar las estadísticas.", "error")
+        return self.render(request, 'stats.html', days=days, **leaderboard)
@@ -1,114 +1,671 @@
-from flask import Blueprint, render_template, request, flash, redirect, url_for
+from flask import Blueprint, render_template, request, flash, redirect, url_for, jsonify, Response, stream_with_context
+from markupsafe import Markup, escape
 import asyncio
+import csv
+import datetime
+import functools
+import io
+import json
+import os
 import re
+import tempfile
+import zlib
+from urllib.parse import urlencode
 import discord
 import logging
 from utils.downloader import download_video
+from utils.broadcast import Broadcaster
+from utils.guild_directory import guild_directory, CHANNEL_KINDS
+from utils import metrics
+from utils.jobs import JobManager, JobQueueFull
+from utils.name_resolver import NameResolver
 from database import database_manager as db
+from database import retention
+from config import Config
 
 log = logging.getLogger(__name__)
 web_blueprint = Blueprint('web', __name__, static_folder='static', template_folder='templates')
 
 
+def create_name_resolver(bot):
+    """Caché de nombres compartida entre todas las peticiones del panel."""
+    return NameResolver(
+        bot,
+        max_size=Config.NAME_CACHE_SIZE,
+        ttl=Config.NAME_CACHE_TTL,
+        concurrency=Config.NAME_RESOLVER_CONCURRENCY,
+    )
+
+
+def create_job_manager(bot):
+    """Cola de trabajos del panel: los envíos y acciones de voz se ejecutan en el bucle del bot."""
+    return JobManager(
+        bot.loop,
+        concurrency=Config.WEB_JOB_CONCURRENCY,
+        max_pending=Config.WEB_JOB_MAX_PENDING,
+        history_size=Config.WEB_JOB_HISTORY_SIZE,
+        max_upload_bytes=Config.WEB_UPLOAD_MAX_IN_FLIGHT,
+    )
+
+
+def create_broadcaster():
+    """Difusiones del panel: comparten un único ritmo global de envíos."""
+    return Broadcaster(
+        rate=Config.BROADCAST_RATE,
+        burst=Config.BROADCAST_BURST,
+        concurrency=Config.BROADCAST_CONCURRENCY,
+        max_retries=Config.BROADCAST_MAX_RETRIES,
+    )
+
+
 def setup_routes(bot):
+    name_resolver = create_name_resolver(bot)
+    jobs = create_job_manager(bot)
+    broadcaster = create_broadcaster()
+
     @web_blueprint.route('/')
     def index():
-        last_text_channel = request.args.get('last_text_channel')
-        last_voice_channel = request.args.get('last_voice_channel')
-        guilds_data = []
-        if bot.is_ready():
-            for guild in bot.guilds:
-                guild_info = {
-                    "guild_name": guild.name,
-                    "channels": sorted(guild.text_channels, key=lambda c: c.name),
-                    "voice_channels": sorted(guild.voice_channels, key=lambda c: c.name)
-                }
-                guilds_data.append(guild_info)
-        return render_template(
-            'index.html',
-            guilds_data=guilds_data,
-            last_text_channel=last_text_channel,
-            last_voice_channel=last_voice_channel
-        )
+        return render_template('index.html', **load_index_context(request.args))
+
+    @web_blueprint.route('/api/directory')
+    @web_blueprint.route('/api/directory/<int:guild_id>')
+    def api_directory(guild_id=None):
+        """Servidores del bot (o los canales de uno), revalidables con If-None-Match."""
+        body, etag = directory_json(guild_id)
+        return _directory_response(body, etag)
+
+    @web_blueprint.route('/api/directory/search')
+    def api_directory_search():
+        body, etag = search_directory_json(request.args)
+        return _directory_response(body, etag)
+
+    def _directory_response(body, etag):
+        if body is None:
+            return jsonify(error="Servidor no encontrado."), 404
+        headers = {'ETag': etag, 'Cache-Control': DIRECTORY_CACHE_CONTROL}
+        if etag_matches(request.headers.get('If-None-Match'), etag):
+            return Response(status=304, headers=headers)
+        return Response(body, mimetype='application/json', headers=headers)
 
     @web_blueprint.route('/enviar', methods=['POST'])
     def enviar():
-        submit_type = request.form.get('submit_type', 'simple')
-        channel_id = request.form['channel_id']
-        log.info(f"Petición web /enviar recibida. Tipo: {submit_type}, Canal: {channel_id}")
-
-        if submit_type == 'embed':
-            try:
-                title = request.form.get('embed_title', '')
-                description = request.form.get('embed_description', '')
-                color_hex = request.form.get('embed_color', '#000000').lstrip('#')
-                color = discord.Color(int(color_hex, 16))
-                embed = discord.Embed(title=title, description=description, color=color)
-                future = asyncio.run_coroutine_threadsafe(send_embed_to_discord(bot, channel_id, embed), bot.loop)
-                future.result()
-                flash("✅ Embed enviado con éxito.", "success")
-            except Exception as e:
-                log.error(f"Error al procesar el envío de embed desde la web.", exc_info=e)
-                flash(f"🔥 Error al enviar el embed: {e}", "error")
-        else:  # Mensaje simple
-            message_content = request.form.get('message', '')
-            file = request.files.get('file')
-            if not message_content and not file:
-                flash("❌ Debes incluir un mensaje o un archivo.", "error")
-                return redirect(url_for('web.index', last_text_channel=channel_id))
-
-            future = asyncio.run_coroutine_threadsafe(send_to_discord_channel(bot, channel_id, message_content, file),
-                                                      bot.loop)
-            try:
-                result_message, status = future.result()
-                flash(result_message, status)
-            except Exception as e:
-                log.error(f"Error en la tarea de envío de mensaje desde la web.", exc_info=e)
-                flash(f"🔥 Error al ejecutar la tarea: {e}", "error")
-        return redirect(url_for('web.index', last_text_channel=channel_id))
+        channel_id = request.form.get('channel_id')
+        log.info(f"Petición web /enviar recibida. Tipo: {request.form.get('submit_type', 'simple')}, Canal: {channel_id}")
+        file = request.files.get('file')
+        upload = SpooledUpload.from_file_storage(file) if file and file.filename else None
+        job, error = submit_send_job(jobs, bot, request.form, upload)
+        return _job_response(job, error, url_for('web.index', last_text_channel=channel_id))
 
     @web_blueprint.route('/control-voz', methods=['POST'])
     def control_voz():
         channel_id = request.form.get('channel_id')
         action = request.form.get('action')
         log.info(f"Petición web /control-voz recibida. Acción: {action}, Canal: {channel_id}")
+        job, error = submit_voice_job(jobs, bot, action, channel_id)
+        return _job_response(job, error, url_for('web.index', last_voice_channel=channel_id))
 
-        if not channel_id:
-            flash("❌ Debes seleccionar un canal de voz.", "error")
-            return redirect(url_for('web.index'))
+    @web_blueprint.route('/difusion', methods=['POST'])
+    def difusion():
+        channel_ids = request.form.getlist('broadcast_channel_id')
+        log.info(f"Petición web /difusion recibida. Canales: {len(channel_ids)}")
+        job, error = submit_broadcast_job(jobs, broadcaster, bot, request.form, channel_ids)
+        return _job_response(job, error, url_for('web.index'))
 
-        if action == 'join':
-            future = asyncio.run_coroutine_threadsafe(join_voice_channel(bot, channel_id), bot.loop)
-        elif action == 'leave':
-            future = asyncio.run_coroutine_threadsafe(leave_voice_channel(bot), bot.loop)
-        else:
-            log.warning(f"Acción de voz no reconocida: {action}")
-            flash("Acción de voz no reconocida.", "error")
-            return redirect(url_for('web.index'))
+    @web_blueprint.route('/api/jobs/<job_id>')
+    def api_job(job_id):
+        """
+        Estado de un trabajo. Con `wait=N` espera hasta N segundos a que termine (long polling);
+        con `seen=K`, a que tenga más de K resultados parciales, y sólo devuelve los nuevos.
+        """
+        job = jobs.get(job_id)
+        if job is None:
+            return jsonify(error="Trabajo no encontrado."), 404
+        wait, seen = parse_job_poll(request.args)
+        if wait:
+            job.wait(wait, seen)
+        return jsonify(job.to_dict(results_from=seen or 0))
 
-        try:
-            msg, status = future.result()
-            flash(msg, status)
-        except Exception as e:
-            log.error(f"Error en la acción de voz desde la web.", exc_info=e)
-            flash(f"🔥 Error en la acción de voz: {e}", "error")
-        return redirect(url_for('web.index', last_voice_channel=channel_id))
+    def _job_response(job, error, back_url):
+        """Responde a un formulario encolado: 202 en JSON para fetch, o redirección con aviso para el HTML."""
+        if wants_json(request.headers.get('Accept')):
+            if error:
+                return jsonify(error=error[0]), error[1]
+            return jsonify(job_json(job, url_for('web.api_job', job_id=job.id))), 202
+        if error:
+            flash(error[0], "error")
+            return redirect(back_url)
+        return redirect(append_query(back_url, job=job.id))
 
     @web_blueprint.route('/logs')
     def view_logs():
         log.info("Petición web /logs recibida.")
-        future = asyncio.run_coroutine_threadsafe(process_logs_for_display(bot), bot.loop)
+        context = load_logs_page(request.args)
+        future = asyncio.run_coroutine_threadsafe(process_logs_for_display(name_resolver, context['logs']), bot.loop)
         try:
-            processed_logs = future.result()
-            return render_template('logs.html', logs=processed_logs)
+            context['logs'] = future.result()
+            return render_template('logs.html', **context)
         except Exception as e:
             log.error("Error al procesar logs para la vista web.", exc_info=e)
             flash("🔥 No se pudieron cargar los logs de la base de datos.", "error")
             return redirect(url_for('web.index'))
 
+    @web_blueprint.route('/logs/export')
+    def export_logs():
+        """
+        Exporta en streaming los logs filtrados, en NDJSON o CSV y opcionalmente comprimidos con gzip.
+        Los registros salen en orden ascendente de id; `after` reanuda una exportación interrumpida.
+        """
+        try:
+            chunks, mimetype, filename = open_export(request.args)
+        except ValueError as e:
+            return jsonify(error=str(e)), 400
+        return Response(
+            stream_with_context(chunks),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
+
+    @web_blueprint.route('/logs/stream')
+    def stream_logs():
+        """
+        Visor en vivo: emite como Server-Sent Events los logs nuevos que cumplen los filtros.
+        Al reconectar, el navegador envía Last-Event-ID y se recuperan antes los logs perdidos.
+        """
+        filters = parse_live_tail_filters(request.args)
+        last_id = parse_last_event_id(request.headers, request.args)
+        subscription = db.audit_feed.subscribe()
+
+        def events():
+            try:
+                yield from live_tail_events(subscription, filters, last_id)
+            finally:
+                db.audit_feed.unsubscribe(subscription)
+
+        return Response(events(), mimetype='text/event-stream', headers=SSE_HEADERS)
+
+    @web_blueprint.route('/metrics')
+    def view_metrics():
+        """Métricas del bot y del panel en el formato de texto de Prometheus."""
+        return Response(metrics.registry.render(), content_type=metrics.CONTENT_TYPE)
+
+    @web_blueprint.route('/api/logs/search')
+    def api_search_logs():
+        """Búsqueda de texto completo en JSON, con los términos encontrados marcados con <mark>."""
+        return jsonify(search_logs_json(request.args))
+
+    @web_blueprint.route('/stats')
+    def view_stats():
+        log.info("Petición web /stats recibida.")
+        days = parse_stats_days(request.args)
+        leaderboard = db.get_activity_leaderboard(days)
+        future = asyncio.run_coroutine_threadsafe(process_stats_for_display(name_resolver, leaderboard), bot.loop)
+        try:
+            return render_template('stats.html', days=days, **future.result())
+        except Exception as e:
+            log.error("Error al procesar las estadísticas para la vista web.", exc_info=e)
+            flash("🔥 No se pudieron cargar las estadísticas.", "error")
+            return redirect(url_for('web.index'))
+
     return web_blueprint
 
 
+# --- Funciones de Ayuda ---
+def _parse_int(value):
+    """Convierte un parámetro de la petición a entero, o None si está vacío o no es válido."""
+    try:
+        return int(value) if value else None
+    except ValueError:
+        return None
+
+
+def parse_log_filters(args) -> dict:
+    """Extrae de los parámetros de la petición los filtros admitidos por db.query_logs."""
+    event_type = args.get('event_type') or None
+    return {
+        'event_type': event_type if event_type in db.EVENT_TYPES else None,
+        'author_id': _parse_int(args.get('author_id')),
+        'channel_id': _parse_int(args.get('channel_id')),
+        'since': args.get('since') or None,
+        'until': args.get('until') or None,
+    }
+
+
+def parse_stats_days(args) -> int:
+    return min(max(_parse_int(args.get('days')) or 7, 1), 365)
+
+
+# --- Lógica de las páginas, compartida por el servidor Flask y el servidor asíncrono ---
+DEFAULT_TEXT_CHANNEL = 'general-gay'
+# El navegador guarda las respuestas del directorio, pero las revalida siempre con su ETag
+DIRECTORY_CACHE_CONTROL = 'no-cache'
+
+
+def load_index_context(args) -> dict:
+    """
+    Contexto de index.html: sólo la lista de servidores y la selección inicial de cada
+    selector. Los canales de cada servidor los pide el navegador a /api/directory/<id>.
+    """
+    last_text_channel = _parse_int(args.get('last_text_channel'))
+    last_voice_channel = _parse_int(args.get('last_voice_channel'))
+    if last_text_channel and guild_directory.guild_of(last_text_channel):
+        text_selection = (guild_directory.guild_of(last_text_channel), last_text_channel)
+    else:
+        text_selection = guild_directory.find_channel(DEFAULT_TEXT_CHANNEL, 'text') or (None, None)
+    voice_selection = (guild_directory.guild_of(last_voice_channel), last_voice_channel)
+    return {
+        'job_id': args.get('job') or None,
+        'guilds': guild_directory.guild_summaries(),
+        'text_selection': [str(value) if value else '' for value in text_selection],
+        'voice_selection': [str(value) if value else '' for value in voice_selection],
+    }
+
+
+def directory_json(guild_id=None):
+    """Devuelve (json, etag) de la lista de servidores o de un servidor; (None, None) si no existe."""
+    if guild_id is None:
+        return guild_directory.guild_summaries_json()
+    return guild_directory.guild_json(guild_id)
+
+
+def search_directory_json(args):
+    kind = args.get('kind') if args.get('kind') in CHANNEL_KINDS else 'text'
+    search_text = args.get('q', '').strip()
+    limit = min(_parse_int(args.get('limit')) or 50, 200)
+    # El resultado sólo cambia con la versión del directorio, así que comparte su ETag
+    etag = guild_directory.etag
+    results = guild_directory.search(search_text, kind, limit)
+    return json.dumps({'query': search_text, 'kind': kind, 'results': results}, ensure_ascii=False), etag
+
+
+def etag_matches(if_none_match, etag) -> bool:
+    """Comparación débil de If-None-Match, como pide la RFC 9110 para peticiones GET."""
+    if not if_none_match or not etag:
+        return False
+    candidates = [tag.strip().removeprefix('W/') for tag in if_none_match.split(',')]
+    return '*' in candidates or etag.removeprefix('W/') in candidates
+
+
+def build_embed(form) -> discord.Embed:
+    title = form.get('embed_title', '')
+    description = form.get('embed_description', '')
+    color_hex = form.get('embed_color', '#000000').lstrip('#')
+    color = discord.Color(int(color_hex, 16))
+    return discord.Embed(title=title, description=description, color=color)
+
+
+def voice_action(bot, action, channel_id):
+    """Devuelve la acción de voz pedida, lista para ejecutarse, o None si la acción no existe."""
+    if action == 'join':
+        return functools.partial(join_voice_channel, bot, channel_id)
+    if action == 'leave':
+        return functools.partial(leave_voice_channel, bot)
+    return None
+
+
+# --- Trabajos encolados (envíos y acciones de voz) ---
+JOBS_BUSY_MESSAGE = "⏳ Hay demasiadas tareas en curso; inténtalo de nuevo en unos segundos."
+
+
+class SpooledUpload:
+    """
+    Archivo subido, guardado en un SpooledTemporaryFile: en memoria hasta
+    WEB_UPLOAD_SPOOL_SIZE bytes y en disco a partir de ahí. Sobrevive a la petición HTTP
+    y se envía a Discord leyéndolo por bloques.
+    """
+    __slots__ = ("filename", "stream", "size")
+
+    def __init__(self, filename: str, stream=None, size: int = 0):
+        self.filename = filename
+        self.stream = stream if stream is not None else tempfile.SpooledTemporaryFile(max_size=Config.WEB_UPLOAD_SPOOL_SIZE)
+        self.size = size
+
+    @classmethod
+    def from_file_storage(cls, file_storage):
+        """
+        Reutiliza el archivo temporal en el que Werkzeug ya volcó la subida, sin copiarlo: el
+        tamaño sale de buscar el final, así que el límite del servidor se comprueba sin leerlo.
+        Se separa del FileStorage para que Flask no lo cierre al terminar la petición.
+        """
+        stream = file_storage.stream
+        size = stream.seek(0, os.SEEK_END)
+        file_storage.stream = io.BytesIO()
+        return cls(file_storage.filename, stream, size).finish()
+
+    def write(self, chunk: bytes):
+        self.stream.write(chunk)
+        self.size += len(chunk)
+
+    def finish(self):
+        self.stream.seek(0)
+        return self
+
+    def close(self):
+        self.stream.close()
+
+
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# Límite de Discord para canales que no están en la caché del bot (el de un servidor sin mejoras)
+DEFAULT_UPLOAD_LIMIT = 25 * 1024 * 1024
+
+
+def upload_limit(bot, channel_id: int) -> int:
+    """Tamaño máximo de archivo que admite el servidor del canal, según la caché del bot."""
+    guild = getattr(bot.get_channel(channel_id), 'guild', None)
+    return guild.filesize_limit if guild else DEFAULT_UPLOAD_LIMIT
+
+
+def submit_send_job(jobs, bot, form, upload):
+    """
+    Valida el formulario de /enviar y encola el envío. `upload` es un SpooledUpload (o None)
+    que pasa a ser del trabajo; si no se llega a encolar, se cierra aquí.
+    Devuelve (trabajo, None) o (None, (mensaje de error, código HTTP)).
+    """
+    job, error = None, None
+    try:
+        job, error = _submit_send_job(jobs, bot, form, upload)
+    finally:
+        # Un embed no lleva adjunto: si se subió un archivo, tampoco se usa
+        if upload and (job is None or job.kind != 'message'):
+            upload.close()
+    return job, error
+
+
+def _submit_send_job(jobs, bot, form, upload):
+    submit_type = form.get('submit_type', 'simple')
+    channel_id = _parse_int(form.get('channel_id'))
+    if not channel_id:
+        return None, ("❌ Debes seleccionar un canal.", 400)
+    try:
+        if submit_type == 'embed':
+            try:
+                embed = build_embed(form)
+            except ValueError as e:
+                return None, (f"🔥 Error al preparar el embed: {e}", 400)
+            return jobs.submit('embed', "Envío de embed",
+                               functools.partial(send_embed_to_discord, bot, channel_id, embed)), None
+
+        message_content = form.get('message', '')
+        if not message_content and not upload:
+            return None, ("❌ Debes incluir un mensaje o un archivo.", 400)
+        if upload:
+            # Se comprueba antes de llamar a Discord para no subir en balde un archivo que va a rechazar
+            limit = upload_limit(bot, channel_id)
+            if upload.size > limit:
+                return None, (f"❌ El archivo ocupa {upload.size / 2**20:.1f} MB y el límite del servidor "
+                              f"es de {limit / 2**20:.0f} MB.", 413)
+        return jobs.submit('message', "Envío de mensaje",
+                           functools.partial(send_to_discord_channel, bot, channel_id, message_content, upload),
+                           size=upload.size if upload else 0), None
+    except JobQueueFull:
+        return None, (JOBS_BUSY_MESSAGE, 503)
+
+
+def submit_voice_job(jobs, bot, action, channel_id):
+    """Como submit_send_job, para /control-voz."""
+    if not channel_id:
+        return None, ("❌ Debes seleccionar un canal de voz.", 400)
+    run_action = voice_action(bot, action, channel_id)
+    if run_action is None:
+        log.warning(f"Acción de voz no reconocida: {action}")
+        return None, ("Acción de voz no reconocida.", 400)
+    try:
+        return jobs.submit('voice', "Acción de voz", functools.partial(_guard_voice_action, run_action)), None
+    except JobQueueFull:
+        return None, (JOBS_BUSY_MESSAGE, 503)
+
+
+async def _guard_voice_action(run_action):
+    try:
+        return await run_action()
+    except Exception as e:
+        log.error(f"Error en la acción de voz desde la web.", exc_info=e)
+        return f"🔥 Error en la acción de voz: {e}", "error"
+
+
+def submit_broadcast_job(jobs, broadcaster, bot, form, channel_ids):
+    """Valida el formulario de /difusion y encola la difusión, como submit_send_job."""
+    channel_ids = list(dict.fromkeys(filter(None, map(_parse_int, channel_ids))))
+    if not channel_ids:
+        return None, ("❌ Debes elegir al menos un canal.", 400)
+    if len(channel_ids) > Config.BROADCAST_MAX_CHANNELS:
+        return None, (f"❌ Como máximo se puede difundir a {Config.BROADCAST_MAX_CHANNELS} canales.", 400)
+    content = form.get('message', '').strip()
+    embed = None
+    if form.get('embed_title') or form.get('embed_description'):
+        try:
+            embed = build_embed(form)
+        except ValueError as e:
+            return None, (f"🔥 Error al preparar el embed: {e}", 400)
+    if not content and not embed:
+        return None, ("❌ Debes incluir un mensaje o un embed.", 400)
+    try:
+        run = functools.partial(broadcaster.run, bot=bot, channel_ids=channel_ids, content=content, embed=embed)
+        return jobs.submit('broadcast', f"Difusión a {len(channel_ids)} canales", run, pass_job=True), None
+    except JobQueueFull:
+        return None, (JOBS_BUSY_MESSAGE, 503)
+
+
+def parse_job_poll(args):
+    """Devuelve (segundos de espera, resultados ya vistos o None) de una consulta a /api/jobs/<id>."""
+    wait = min(max(_parse_int(args.get('wait')) or 0, 0), Config.WEB_JOB_MAX_WAIT)
+    seen = _parse_int(args.get('seen'))
+    return wait, max(seen, 0) if seen is not None else None
+
+
+def job_json(job, status_url) -> dict:
+    return {**job.to_dict(), 'status_url': status_url}
+
+
+def wants_json(accept) -> bool:
+    """Los formularios enviados con fetch piden JSON; los del navegador, HTML."""
+    return bool(accept) and 'application/json' in accept and 'text/html' not in accept
+
+
+def append_query(url, **params) -> str:
+    return f"{url}{'&' if '?' in url else '?'}{urlencode(params)}"
+
+
+def load_logs_page(args) -> dict:
+    """
+    Lee de la base de datos (o de un archivo mensual) la página de logs pedida y devuelve el
+    contexto para logs.html. Es bloqueante; los nombres se completan después con process_logs_for_display.
+    """
+    filters = parse_log_filters(args)
+    search_text = args.get('q', '').strip()
+    archive_month = args.get('archive') or None
+    page_size = Config.LOGS_PAGE_SIZE
+    page_args = {k: v for k, v in {**filters, 'archive': archive_month}.items() if v is not None}
+    next_args = None
+
+    # Se pide un registro de más para saber si existe una página siguiente
+    if search_text:
+        page_args = {k: v for k, v in {**filters, 'q': search_text}.items() if v is not None}
+        page = _parse_int(args.get('page')) or 1
+        markers = db.new_snippet_markers()
+        raw_logs = db.search_logs(search_text, **filters, limit=page_size + 1, offset=(page - 1) * page_size,
+                                  markers=markers)
+        for log_entry in raw_logs:
+            log_entry['message'] = highlight_snippet(log_entry['message_snippet'], markers)
+            log_entry['details'] = highlight_snippet(log_entry['details_snippet'], markers)
+        if len(raw_logs) > page_size:
+            next_args = {**page_args, 'page': page + 1}
+        is_first_page = page == 1
+    else:
+        before_id = _parse_int(args.get('before'))
+        if archive_month:
+            raw_logs = retention.query_archive(archive_month, **filters, before_id=before_id, limit=page_size + 1)
+        else:
+            raw_logs = db.query_logs(**filters, before_id=before_id, limit=page_size + 1)
+        if len(raw_logs) > page_size:
+            next_args = {**page_args, 'before': raw_logs[page_size - 1]['id']}
+        is_first_page = before_id is None
+
+    return {
+        'logs': raw_logs[:page_size],
+        'event_types': db.EVENT_TYPES,
+        'archives': retention.list_archives(),
+        'filters': page_args,
+        'search_text': search_text,
+        'is_first_page': is_first_page,
+        'next_args': next_args,
+    }
+
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+
+def parse_live_tail_filters(args) -> dict:
+    """El visor en vivo solo admite los filtros que se pueden comprobar sobre cada log nuevo."""
+    filters = parse_log_filters(args)
+    return {key: filters[key] for key in ('event_type', 'author_id', 'channel_id')}
+
+
+def parse_last_event_id(headers, args):
+    return _parse_int(headers.get('Last-Event-ID')) or _parse_int(args.get('last_id'))
+
+
+def matches_log_filters(row, filters) -> bool:
+    return all(value is None or row[key] == value for key, value in filters.items())
+
+
+def replay_missed_logs(filters, last_id):
+    """
+    Genera, por páginas y en orden ascendente, los logs guardados después de `last_id` (el último
+    que recibió el cliente antes de reconectar), hasta ponerse al día: no se salta ninguno.
+    """
+    while True:
+        page = db.query_logs(**filters, after_id=last_id, limit=Config.LOGS_PAGE_SIZE)
+        if page:
+            yield page
+        if len(page) < Config.LOGS_PAGE_SIZE:
+            return
+        last_id = page[-1]['id']
+
+
+def sse_log_event(row) -> str:
+    """Serializa un log como evento SSE, con los nombres que haya en el directorio."""
+    payload = {column: row[column] for column in EXPORT_COLUMNS}
+    payload['author_name'] = row.get('author_name') or (f"ID: {row['author_id']}" if row['author_id'] else "N/A")
+    channel_name = row.get('channel_name')
+    if channel_name and row.get('channel_deleted'):
+        channel_name += " (eliminado)"
+    payload['channel_name'] = channel_name or (f"ID: {row['channel_id']}" if row['channel_id'] else "N/A")
+    return f"id: {row['id']}\nevent: log\ndata: {json.dumps(payload, ensure_ascii=False)}\n\n"
+
+
+def live_tail_events(subscription, filters, last_id):
+    """
+    Genera el flujo SSE para un hilo del servidor Flask. La suscripción ya debe estar
+    activa, así nada se pierde entre la recuperación y la escucha; los duplicados se
+    descartan por id. Si el cliente se queda atrás, se cierra el flujo para que reconecte.
+    """
+    yield f"retry: {Config.LIVE_TAIL_KEEPALIVE * 1000}\n\n"
+    if last_id is not None:
+        for page in replay_missed_logs(filters, last_id):
+            for row in page:
+                last_id = row['id']
+                yield sse_log_event(row)
+    while not subscription.overflowed:
+        rows = subscription.get(timeout=Config.LIVE_TAIL_KEEPALIVE)
+        if not rows:
+            yield ": keep-alive\n\n"
+            continue
+        for row in rows:
+            if (last_id is None or row['id'] > last_id) and matches_log_filters(row, filters):
+                last_id = row['id']
+                yield sse_log_event(row)
+
+
+def search_logs_json(args) -> dict:
+    search_text = args.get('q', '').strip()
+    limit = min(_parse_int(args.get('limit')) or Config.LOGS_PAGE_SIZE, Config.LOGS_PAGE_SIZE)
+    offset = _parse_int(args.get('offset')) or 0
+    markers = db.new_snippet_markers()
+    results = db.search_logs(search_text, **parse_log_filters(args), limit=limit, offset=offset, markers=markers)
+    for result in results:
+        for key in ('message_snippet', 'details_snippet'):
+            snippet = highlight_snippet(result[key], markers)
+            result[key] = str(snippet) if snippet else None
+    return {'query': search_text, 'results': results}
+
+
+def open_export(args):
+    """
+    Prepara una exportación: devuelve (generador de bloques de bytes, mimetype, nombre de archivo).
+    Lanza ValueError si el formato no está soportado.
+    """
+    export_format = args.get('format', 'ndjson')
+    if export_format not in EXPORT_FORMATS:
+        raise ValueError(f"Formato no soportado: {export_format}")
+    use_gzip = args.get('gzip') in ('1', 'true')
+    after_id = _parse_int(args.get('after'))
+    log.info(f"Petición web /logs/export recibida. Formato: {export_format}, gzip: {use_gzip}, desde id: {after_id}")
+
+    rows = db.iter_logs(**parse_log_filters(args), after_id=after_id, chunk_size=Config.EXPORT_CHUNK_SIZE)
+    chunks = EXPORT_FORMATS[export_format]['writer'](rows)
+    mimetype = EXPORT_FORMATS[export_format]['mimetype']
+    filename = f"audit_logs.{export_format}"
+    if use_gzip:
+        chunks = _gzip_chunks(chunks)
+        mimetype = 'application/gzip'
+        filename += '.gz'
+    return chunks, mimetype, filename
+
+
+EXPORT_COLUMNS = ('id', 'timestamp', 'event_type', 'author_id', 'channel_id', 'message', 'details')
+
+
+def _ndjson_chunks(rows, rows_per_chunk=500):
+    """Serializa los registros como NDJSON, agrupando varias líneas por bloque enviado."""
+    buffer = []
+    for row in rows:
+        buffer.append(json.dumps(row, ensure_ascii=False) + "\n")
+        if len(buffer) >= rows_per_chunk:
+            yield "".join(buffer).encode("utf-8")
+            buffer.clear()
+    if buffer:
+        yield "".join(buffer).encode("utf-8")
+
+
+def _csv_chunks(rows, rows_per_chunk=500):
+    """Serializa los registros como CSV (con cabecera), agrupando varias filas por bloque enviado."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, start=1):
+        writer.writerow([row[column] for column in EXPORT_COLUMNS])
+        if count % rows_per_chunk == 0:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.getvalue():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _gzip_chunks(chunks):
+    """Comprime al vuelo un flujo de bloques de bytes en formato gzip."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabecera y cola gzip
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+EXPORT_FORMATS = {
+    'ndjson': {'writer': _ndjson_chunks, 'mimetype': 'application/x-ndjson'},
+    'csv': {'writer': _csv_chunks, 'mimetype': 'text/csv'},
+}
+
+
+def highlight_snippet(snippet, markers: tuple[str, str]):
+    """Escapa un fragmento de búsqueda y convierte sus marcadores (los de esa consulta) en etiquetas <mark>."""
+    if not snippet:
+        return None
+    start, end = markers
+    return Markup(str(escape(snippet)).replace(start, "<mark>").replace(end, "</mark>"))
+
+
 # --- Funciones Asíncronas de Ayuda ---
 async def join_voice_channel(bot, channel_id):
     channel = bot.get_channel(int(channel_id))
@@ -127,12 +684,13 @@ async def leave_voice_channel(bot):
     return ("🤷 No estoy en ningún canal de voz.", "error")
 
 
-async def send_to_discord_channel(bot, channel_id, message, file_storage):
+async def send_to_discord_channel(bot, channel_id, message, upload):
     try:
-        channel = await bot.fetch_channel(int(channel_id))
+        channel = bot.get_channel(int(channel_id)) or await bot.fetch_channel(int(channel_id))
         discord_file = None
-        if file_storage and file_storage.filename != '':
-            discord_file = discord.File(file_storage.stream, filename=file_storage.filename)
+        if upload:
+            # discord.File no copia el contenido: aiohttp lo lee del archivo temporal por bloques al enviarlo
+            discord_file = discord.File(upload.stream, filename=upload.filename)
         sent_message = await channel.send(content=message, file=discord_file)
         match = re.search(r'https?://(twitter|x)\.com/\w+/status/\d+', message)
         if match:
@@ -143,29 +701,53 @@ async def send_to_discord_channel(bot, channel_id, message, file_storage):
     except Exception as e:
         log.error(f"No se pudo enviar el mensaje web al canal {channel_id}", exc_info=e)
         return f"🔥 No se pudo enviar el mensaje: {e}", "error"
+    finally:
+        if upload:
+            upload.close()
 
 
 async def send_embed_to_discord(bot, channel_id, embed):
-    channel = await bot.fetch_channel(int(channel_id))
-    await channel.send(embed=embed)
+    try:
+        channel = await bot.fetch_channel(int(channel_id))
+        await channel.send(embed=embed)
+        return "✅ Embed enviado con éxito.", "success"
+    except Exception as e:
+        log.error(f"Error al procesar el envío de embed desde la web.", exc_info=e)
+        return f"🔥 Error al enviar el embed: {e}", "error"
 
 
-async def process_logs_for_display(bot):
-    raw_logs = db.get_all_logs()
-    enriched_logs = []
+async def process_logs_for_display(name_resolver, raw_logs):
+    missing_users = {e['author_id'] for e in raw_logs if e['author_id'] and not e.get('author_name')}
+    missing_channels = {e['channel_id'] for e in raw_logs if e['channel_id'] and not e.get('channel_name')}
+    user_names = await name_resolver.resolve_users(missing_users) if missing_users else {}
+    channel_names = name_resolver.resolve_channels(missing_channels)
+    db.update_directory(
+        [(user_id, 'user', None, name) for user_id, name in user_names.items()]
+        + [(channel_id, 'channel', None, name) for channel_id, name in channel_names.items()]
+    )
+
     for log_entry in raw_logs:
-        if log_entry['author_id']:
-            try:
-                user = await bot.fetch_user(log_entry['author_id'])
-                log_entry['author_name'] = user.name
-            except discord.NotFound:
-                log_entry['author_name'] = f"ID: {log_entry['author_id']}"
-        else:
+        if not log_entry['author_id']:
             log_entry['author_name'] = "N/A"
-        if log_entry['channel_id']:
-            channel = bot.get_channel(log_entry['channel_id'])
-            log_entry['channel_name'] = channel.name if channel else f"ID: {log_entry['channel_id']}"
-        else:
+        elif not log_entry.get('author_name'):
+            log_entry['author_name'] = user_names.get(log_entry['author_id'], f"ID: {log_entry['author_id']}")
+        if not log_entry['channel_id']:
             log_entry['channel_name'] = "N/A"
-        enriched_logs.append(log_entry)
-    return enriched_logs
\ No newline at end of file
+        elif not log_entry.get('channel_name'):
+            log_entry['channel_name'] = channel_names.get(log_entry['channel_id'], f"ID: {log_entry['channel_id']}")
+        elif log_entry.get('channel_deleted'):
+            log_entry['channel_name'] += " (eliminado)"
+    return raw_logs
+
+
+async def process_stats_for_display(name_resolver, leaderboard):
+    entries = leaderboard['voice'] + leaderboard['messages']
+    missing_users = {entry['user_id'] for entry in entries if not entry.get('user_name')}
+    user_names = await name_resolver.resolve_users(missing_users) if missing_users else {}
+    db.update_directory([(user_id, 'user', None, name) for user_id, name in user_names.items()])
+    for entry in entries:
+        if not entry.get('user_name'):
+            entry['user_name'] = user_names.get(entry['user_id'], f"ID: {entry['user_id']}")
+    for entry in leaderboard['voice']:
+        entry['voice_time'] = str(datetime.timedelta(seconds=entry['voice_seconds']))
+    return leaderboard
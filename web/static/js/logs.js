@@ -0,0 +1,61 @@
+document.addEventListener('DOMContentLoaded', () => {
+
+    // Visor en vivo: solo en la primera página de la base de datos, sin búsqueda ni fecha límite
+    const logsBody = document.getElementById('logs-body');
+    const liveStatus = document.getElementById('live-status');
+    if (!logsBody || !logsBody.dataset.streamUrl || !window.EventSource) {
+        return;
+    }
+
+    const maxRows = Math.max(logsBody.rows.length, 100);
+    const source = new EventSource(logsBody.dataset.streamUrl);
+
+    const cell = (text) => {
+        const td = document.createElement('td');
+        td.textContent = text;
+        return td;
+    };
+
+    const labelled = (td, label, text) => {
+        const strong = document.createElement('strong');
+        strong.textContent = label;
+        td.append(strong, ' ' + text);
+    };
+
+    source.addEventListener('open', () => {
+        liveStatus.textContent = '> EN VIVO: conectado';
+    });
+
+    source.addEventListener('error', () => {
+        liveStatus.textContent = '> EN VIVO: reconectando...';
+    });
+
+    source.addEventListener('log', (event) => {
+        const log = JSON.parse(event.data);
+        const row = document.createElement('tr');
+        const content = document.createElement('td');
+        if (log.message) {
+            labelled(content, 'Mensaje:', log.message);
+            content.append(document.createElement('br'));
+        }
+        if (log.details) {
+            labelled(content, 'Detalles:', log.details);
+        }
+        row.append(
+            cell(log.timestamp.split('.')[0].replace('T', ' ')),
+            cell(log.event_type),
+            cell(log.author_name),
+            cell('#' + log.channel_name),
+            content,
+        );
+
+        const emptyRow = logsBody.querySelector('.empty-row');
+        if (emptyRow) {
+            emptyRow.remove();
+        }
+        logsBody.prepend(row);
+        while (logsBody.rows.length > maxRows) {
+            logsBody.lastElementChild.remove();
+        }
+    });
+});
@@ -8,7 +8,7 @@ document.addEventListener('DOMContentLoaded', () => {
         });
     });
 
-    document.querySelectorAll('.flashed-message').forEach(message => {
+    document.querySelectorAll('.flashed-message:not(#job-status)').forEach(message => {
         setTimeout(() => {
             message.style.opacity = '0';
             setTimeout(() => { message.style.display = 'none'; }, 500);
@@ -44,4 +44,171 @@ document.addEventListener('DOMContentLoaded', () => {
         colorInput.addEventListener('input', updateColorPreview);
         updateColorPreview();
     }
-});
\ No newline at end of file
+
+    // Selectores de canal: los canales de cada servidor se cargan bajo demanda desde el directorio
+    document.querySelectorAll('.channel-picker').forEach(picker => {
+        const kind = picker.dataset.kind;
+        const guildSelect = picker.querySelector('.guild-select');
+        const channelSelect = picker.querySelector('.channel-select');
+        const searchInput = picker.querySelector('.channel-search');
+        const prefix = kind === 'text' ? '#' : '';
+        let selected = picker.dataset.selected;
+        let searchTimer = null;
+
+        const channelOption = (channel) => {
+            const option = document.createElement('option');
+            option.value = channel.id;
+            option.textContent = prefix + channel.name;
+            option.selected = channel.id === selected;
+            return option;
+        };
+
+        const showMessage = (text) => {
+            const option = document.createElement('option');
+            option.disabled = true;
+            option.textContent = text;
+            channelSelect.replaceChildren(option);
+        };
+
+        const fetchJson = async (url) => {
+            // El navegador revalida con If-None-Match y reutiliza su copia si recibe un 304
+            const response = await fetch(url);
+            if (!response.ok) {
+                throw new Error(`HTTP ${response.status}`);
+            }
+            return response.json();
+        };
+
+        const loadGuild = async (guildId) => {
+            if (!guildId) {
+                return;
+            }
+            try {
+                const guild = await fetchJson(`${picker.dataset.directoryUrl}/${guildId}`);
+                if (guild[kind].length === 0) {
+                    showMessage('No se encontraron canales.');
+                } else {
+                    channelSelect.replaceChildren(...guild[kind].map(channelOption));
+                }
+            } catch (error) {
+                showMessage('Error al cargar los canales.');
+            }
+        };
+
+        const searchChannels = async (text) => {
+            const params = new URLSearchParams({ q: text, kind: kind });
+            try {
+                const { results } = await fetchJson(`${picker.dataset.searchUrl}?${params}`);
+                if (results.length === 0) {
+                    showMessage('Sin coincidencias.');
+                    return;
+                }
+                const groups = new Map();
+                results.forEach(channel => {
+                    if (!groups.has(channel.guild_id)) {
+                        const group = document.createElement('optgroup');
+                        group.label = `-- ${channel.guild_name} --`;
+                        groups.set(channel.guild_id, group);
+                    }
+                    groups.get(channel.guild_id).append(channelOption(channel));
+                });
+                channelSelect.replaceChildren(...groups.values());
+            } catch (error) {
+                showMessage('Error al buscar canales.');
+            }
+        };
+
+        guildSelect.addEventListener('change', () => {
+            searchInput.value = '';
+            loadGuild(guildSelect.value);
+        });
+
+        channelSelect.addEventListener('change', () => {
+            selected = channelSelect.value;
+        });
+
+        searchInput.addEventListener('input', () => {
+            clearTimeout(searchTimer);
+            searchTimer = setTimeout(() => {
+                const text = searchInput.value.trim();
+                if (text) {
+                    searchChannels(text);
+                } else {
+                    loadGuild(guildSelect.value);
+                }
+            }, 250);
+        });
+
+        loadGuild(guildSelect.value);
+    });
+
+    // Resultado de un envío, difusión o acción de voz encolado: se consulta con long polling hasta que termina
+    const jobStatus = document.getElementById('job-status');
+    if (jobStatus) {
+        const jobMessage = jobStatus.querySelector('.job-message');
+        const jobResults = jobStatus.querySelector('.job-results');
+        let seen = 0;
+
+        const showResult = (result) => {
+            const item = document.createElement('li');
+            const place = result.guild_name ? `${result.guild_name} / #${result.channel_name}` : `ID: ${result.channel_id}`;
+            item.textContent = result.status === 'sent' ? `✅ ${place}` : `❌ ${place}: ${result.error}`;
+            item.className = result.status;
+            jobResults.append(item);
+        };
+
+        const pollJob = async () => {
+            try {
+                const params = new URLSearchParams({ wait: 25, seen: seen });
+                const response = await fetch(`${jobStatus.dataset.jobUrl}?${params}`, { headers: { Accept: 'application/json' } });
+                if (!response.ok) {
+                    throw new Error(`HTTP ${response.status}`);
+                }
+                const job = await response.json();
+                job.results.forEach(showResult);
+                seen = job.results_total;
+                if (!job.finished_at) {
+                    jobMessage.textContent = job.status === 'running'
+                        ? `Ejecutando la tarea...${seen ? ` (${seen} completados)` : ''}`
+                        : 'Tarea en cola...';
+                    pollJob();
+                    return;
+                }
+                jobStatus.classList.replace('pending', job.category === 'success' ? 'success' : 'error');
+                jobMessage.textContent = job.message;
+            } catch (error) {
+                jobStatus.classList.replace('pending', 'error');
+                jobMessage.textContent = 'No se pudo consultar el estado de la tarea.';
+            }
+        };
+        pollJob();
+    }
+
+    // Difusión: los canales elegidos se añaden a la lista como campos ocultos del formulario
+    const broadcastForm = document.getElementById('broadcast-form');
+    if (broadcastForm) {
+        const targets = document.getElementById('broadcast-targets');
+        const channelSelect = broadcastForm.querySelector('.channel-select');
+
+        document.getElementById('broadcast-add').addEventListener('click', () => {
+            const option = channelSelect.selectedOptions[0];
+            if (!option || option.disabled || targets.querySelector(`input[value="${option.value}"]`)) {
+                return;
+            }
+            const group = option.parentElement.tagName === 'OPTGROUP'
+                ? option.parentElement.label.replace(/^-- | --$/g, '')
+                : broadcastForm.querySelector('.guild-select').selectedOptions[0].textContent;
+            const item = document.createElement('li');
+            const input = document.createElement('input');
+            input.type = 'hidden';
+            input.name = 'broadcast_channel_id';
+            input.value = option.value;
+            const remove = document.createElement('button');
+            remove.type = 'button';
+            remove.textContent = 'x';
+            remove.addEventListener('click', () => item.remove());
+            item.append(input, `${group} / ${option.textContent}`, remove);
+            targets.append(item);
+        });
+    }
+});